@@ -1,16 +1,25 @@
 import os
 import io
-import json
 import secrets
 import mimetypes
-from datetime import datetime
-from flask import Flask, render_template, request, send_file, redirect, url_for, jsonify, make_response
+import itertools
+import tempfile
+import json
+import shutil
+import zipfile
+import time
+from flask import Flask, Request, Response, g, render_template, request, send_file, redirect, url_for, jsonify, make_response, stream_with_context
 from werkzeug.utils import secure_filename
 
-from stegano.crypto import encrypt_with_aes, decrypt_with_aes, encrypt_with_rsa_public_key, decrypt_with_rsa_private_key
-from stegano.image_lsb import embed_in_image, extract_from_image
-from stegano.audio_lsb import embed_in_wav, extract_from_wav
-from stegano.video_lsb import embed_in_video, extract_from_video
+from stegano import metrics
+from stegano.crypto import configure_key_cache_from_env, scatter_key
+from stegano.capacity import estimate_capacity
+from stegano.container import ContainerError, seal_key
+from stegano.jobs import QueueFull, manager_from_env
+from stegano.reaper import Quota, Reaper, quota_from_env
+from stegano.pipeline import UnsupportedMedia, build_container, check_media_depth, embed_container, embed_job, extract_job, infer_media_kind, locate_container, open_secret, stream_embed
+from stegano.streams import ChunkSink, IterReader
+from stegano.media import BACKENDS, backend, find_ffmpeg, loaded, output_options, preload_kinds, warm_up
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_DIR = os.path.join(BASE_DIR, 'uploads')
@@ -20,22 +29,103 @@ TEMP_DIR = os.path.join(BASE_DIR, 'temp')
 for d in [UPLOAD_DIR, OUTPUT_DIR, TEMP_DIR]:
 	os.makedirs(d, exist_ok=True)
 
-ALLOWED_COVER_EXTS = {'.png', '.bmp', '.wav', '.mp3', '.mp4', '.avi', '.mov', '.mkv', '.jpg', '.jpeg'}
+ALLOWED_COVER_EXTS = {'.png', '.bmp', '.webp', '.tif', '.tiff', '.wav', '.mp3', '.mp4', '.avi', '.mov', '.mkv', '.jpg', '.jpeg'}
 ALLOWED_SECRET_EXTS = None  # accept any
 
+# Uploads up to this size stay in memory; larger ones spill to TEMP_DIR
+UPLOAD_SPOOL_SIZE = int(os.environ.get('STEGANO_UPLOAD_SPOOL', str(32 * 1024 * 1024)))
+
+# With STEGANO_PROFILING=1 a request sent with 'X-Stegano-Profile: cpu,memory' is profiled into PROFILE_DIR
+PROFILING = os.environ.get('STEGANO_PROFILING', '').lower() in ('1', 'true', 'yes')
+PROFILE_DIR = os.path.join(TEMP_DIR, 'profiles')
+
+
+class SpooledRequest(Request):
+	def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+		return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE, mode='rb+', dir=TEMP_DIR)
+
+
 app = Flask(__name__)
+app.request_class = SpooledRequest
 app.config['MAX_CONTENT_LENGTH'] = 1024 * 1024 * 1024 * 2  # 2 GB
 
+# Opt-in PBKDF2 key cache, e.g. STEGANO_KEY_CACHE=256 STEGANO_KEY_CACHE_TTL=600
+configure_key_cache_from_env()
+
+# Background embed/extract jobs, e.g. STEGANO_JOB_WORKERS=4 STEGANO_JOB_LIMIT_EMBED=2 STEGANO_JOB_QUEUE=32
+jobs = manager_from_env()
+
+# Keep the scratch directories bounded, e.g. STEGANO_OUTPUTS_MAX_AGE=3600 STEGANO_OUTPUTS_MAX_BYTES=1000000000
+reaper = Reaper({
+	UPLOAD_DIR: quota_from_env('STEGANO_UPLOADS', Quota(max_age=3600, max_bytes=2 * 1024 ** 3)),
+	OUTPUT_DIR: quota_from_env('STEGANO_OUTPUTS', Quota(max_age=24 * 3600, max_bytes=5 * 1024 ** 3)),
+	TEMP_DIR: quota_from_env('STEGANO_TEMP', Quota(max_age=3600, max_bytes=2 * 1024 ** 3)),
+}, interval=float(os.environ.get('STEGANO_REAP_INTERVAL', '60')))
+# Holds are visible across processes, so each gunicorn worker may reap; the dev server's
+# reloader watcher only restarts the server and doesn't
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+	reaper.start()
+
+
+@app.before_request
+def _start_request():
+	g.started = time.perf_counter()
+	g.trace = metrics.start_trace()
+	g.profile = None
+	modes = request.headers.get('X-Stegano-Profile', '') if PROFILING else ''
+	if modes:
+		g.profile = metrics.RequestProfile(m.strip().lower() for m in modes.split(','))
+		g.profile.start()
+	if request.content_length:
+		metrics.inc('stegano_bytes_total', request.content_length, direction='in', endpoint=request.endpoint or 'unknown')
+	if request.mimetype == 'multipart/form-data':
+		# Parse (and spool) the upload here so it is timed as a stage of its own
+		with metrics.stage('upload'):
+			request.files
+
+
+def _count_sent(chunks, endpoint: str):
+	sent = 0
+	try:
+		for chunk in chunks:
+			sent += len(chunk)
+			yield chunk
+	finally:
+		if hasattr(chunks, 'close'):
+			chunks.close()
+		metrics.inc('stegano_bytes_total', sent, direction='out', endpoint=endpoint)
+
+
+@app.after_request
+def _finish_request(response):
+	if 'started' not in g:
+		return response
+	elapsed = time.perf_counter() - g.started
+	endpoint = request.endpoint or 'unknown'
+	trace = metrics.end_trace(g.trace)
+	metrics.inc('stegano_requests_total', endpoint=endpoint, method=request.method, status=str(response.status_code))
+	metrics.observe('stegano_request_seconds', elapsed, endpoint=endpoint)
+	timing = metrics.server_timing(trace, elapsed)
+	if g.profile is not None:
+		name = f'{endpoint}-{time.strftime("%Y%m%d-%H%M%S")}-{secrets.token_hex(3)}'
+		response.headers['X-Stegano-Profile'] = ', '.join(g.profile.stop(PROFILE_DIR, name))
+		if g.profile.peak_bytes is not None:
+			timing += f', alloc;desc="peak {g.profile.peak_bytes / 1e6:.1f} MB"'
+	response.headers['Server-Timing'] = timing
+	if response.content_length is not None:
+		metrics.inc('stegano_bytes_total', response.content_length, direction='out', endpoint=endpoint)
+	elif response.is_streamed:
+		# Streamed bodies are counted as they are sent; sized ones (files) keep their sendfile path
+		response.response = _count_sent(response.response, endpoint)
+	return response
 
-def infer_media_kind(filename: str) -> str:
-	name = filename.lower()
-	if name.endswith(('.png', '.bmp', '.jpg', '.jpeg')):
-		return 'image'
-	if name.endswith(('.wav',)):
-		return 'audio'
-	if name.endswith(('.mp4', '.avi', '.mov', '.mkv')):
-		return 'video'
-	return 'unknown'
+
+@app.teardown_request
+def _drop_scratch(exc):
+	# Runs once a streamed response has been sent, too (stream_with_context keeps the request open)
+	scratch = g.pop('scratch', None)
+	if scratch:
+		_release(scratch)
 
 
 @app.route('/')
@@ -70,8 +160,12 @@ def extract_view():
 	return render_template('extract.html')
 
 
-@app.post('/api/embed')
-def api_embed():
+# Image output formats for image_format=auto, by MIME type in the order PNG is preferred
+NEGOTIATED_IMAGE_FORMATS = {'image/png': 'png-fast', 'image/webp': 'webp', 'image/tiff': 'tiff', 'image/bmp': 'bmp'}
+
+
+def _embed_options(require_secret: bool = True):
+	"""Validate the embed form; returns (options, None) or (None, error response)."""
 	cover = request.files.get('cover')
 	secret_file = request.files.get('secret')
 	secret_text = request.form.get('secret_text', '')
@@ -79,73 +173,135 @@ def api_embed():
 	password = request.form.get('password') or ''
 	rsa_public_pem = request.form.get('rsa_public_pem') or ''
 
-	if not cover:
+	if require_secret and not (secret_file and secret_file.filename) and not secret_text:
+		return None, (jsonify({'error': 'Provide a secret text or file'}), 400)
+	use_rsa = algo == 'rsa' and rsa_public_pem.strip()
+	if not use_rsa and not password:
+		return None, (jsonify({'error': 'Password is required for AES encryption'}), 400)
+	# Low bits used per sample: 1-4 for images and video, 1-8 for audio
+	try:
+		depth = int(request.form.get('depth') or 1)
+		check_media_depth(cover.filename if cover else '', depth)
+	except ValueError as e:
+		return None, (jsonify({'error': f'Invalid depth: {e}'}), 400)
+	# Keyed placement spreads the bits over the whole cover; its key comes from the same credentials
+	scatter = None
+	if request.form.get('scatter') in ('1', 'true', 'on'):
+		try:
+			scatter = scatter_key(password=None if use_rsa else password, public_pem=rsa_public_pem if use_rsa else None)
+		except ValueError as e:
+			return None, (jsonify({'error': f'Invalid RSA public key: {e}'}), 400)
+	# Lossless encoding of image output; 'auto' takes the client's preferred type from Accept
+	image_format = request.form.get('image_format') or 'png'
+	if image_format == 'auto':
+		image_format = NEGOTIATED_IMAGE_FORMATS[request.accept_mimetypes.best_match(NEGOTIATED_IMAGE_FORMATS, 'image/png')]
+	try:
+		compress_level = request.form.get('compress_level')
+		compress_level = int(compress_level) if compress_level else None
+		output_options(image_format, compress_level)
+	except ValueError as e:
+		return None, (jsonify({'error': f'Invalid image output options: {e}'}), 400)
+
+	return {
+		'cover': cover,
+		'secret_file': secret_file if secret_file and secret_file.filename else None,
+		'secret_text': secret_text,
+		'password': None if use_rsa else password,
+		'public_pem': rsa_public_pem if use_rsa else None,
+		# 'reencode' (AVI, the default), 'remux' (MKV keeping the cover's tracks; needs ffmpeg) or 'auto' (remux if ffmpeg is found)
+		'video_mode': request.form.get('video_mode') or 'reencode',
+		'compression': request.form.get('compression', 'auto'),  # 'auto', 'none', 'zlib', 'lzma' or 'zstd'
+		'depth': depth,
+		'scatter': scatter,
+		'image_format': image_format,
+		'compress_level': compress_level,
+	}, None
+
+
+@app.post('/api/embed')
+def api_embed():
+	if not request.files.get('cover'):
 		return jsonify({'error': 'Cover file is required'}), 400
+	opts, error = _embed_options()
+	if error:
+		return error
 
-	cover_filename = secure_filename(cover.filename or f'cover_{secrets.token_hex(4)}')
-	cover_path = os.path.join(UPLOAD_DIR, cover_filename)
-	cover.save(cover_path)
+	# The cover is read straight from the upload stream (in memory, or spooled to TEMP_DIR)
+	cover = opts['cover']
+	cover_filename = secure_filename(cover.filename or '') or f'cover_{secrets.token_hex(4)}'
 
-	if secret_file and secret_file.filename:
+	secret_file = opts['secret_file']
+	if secret_file:
 		secret_filename = secure_filename(secret_file.filename)
-		secret_bytes = secret_file.read()
-		secret_meta = {'filename': secret_filename, 'type': 'file'}
-	elif secret_text:
-		secret_bytes = secret_text.encode('utf-8')
-		secret_meta = {'filename': 'secret.txt', 'type': 'text'}
+		# Werkzeug spools uploads to a seekable file; encrypt straight from it rather than read() it
+		secret_stream = secret_file.stream
+		secret_stream.seek(0, os.SEEK_END)
+		secret_size = secret_stream.tell()
+		secret_stream.seek(0)
+		secret_kind = 'file'
 	else:
-		return jsonify({'error': 'Provide a secret text or file'}), 400
-
-	# Encrypt
-	if algo == 'rsa' and rsa_public_pem.strip():
-		payload = encrypt_with_rsa_public_key(secret_bytes, rsa_public_pem)
-		enc_meta = {'scheme': 'rsa-hybrid'}
-	else:
-		if not password:
-			return jsonify({'error': 'Password is required for AES encryption'}), 400
-		payload = encrypt_with_aes(secret_bytes, password)
-		enc_meta = {'scheme': 'aes-gcm'}
-
-	head = {
-		'version': 1,
-		'ts': datetime.utcnow().isoformat() + 'Z',
-		'secret_meta': secret_meta,
-		'encryption': enc_meta,
-	}
-	container = json.dumps(head).encode('utf-8') + b'\n\n' + payload
-
-	media_kind = infer_media_kind(cover_filename)
-	stego_name = None
-	stego_bytes = None
-	stego_path = None
-
+		secret_bytes = opts['secret_text'].encode('utf-8')
+		secret_stream = io.BytesIO(secret_bytes)
+		secret_size = len(secret_bytes)
+		secret_filename = 'secret.txt'
+		secret_kind = 'text'
+
+	# Compress before encrypting (skipped when it doesn't pay off), then encrypt lazily,
+	# one AEAD segment at a time, as the embedder pulls the container
 	try:
-		if media_kind == 'image':
-			stego_bytes = embed_in_image(cover_path, container)
-			stego_name = os.path.splitext(cover_filename)[0] + '_stego.png'
-			stego_path = os.path.join(OUTPUT_DIR, stego_name)
-			with open(stego_path, 'wb') as f:
-				f.write(stego_bytes)
-		elif media_kind == 'audio':
-			stego_bytes = embed_in_wav(cover_path, container)
-			stego_name = os.path.splitext(cover_filename)[0] + '_stego.wav'
-			stego_path = os.path.join(OUTPUT_DIR, stego_name)
-			with open(stego_path, 'wb') as f:
-				f.write(stego_bytes)
-		elif media_kind == 'video':
-			# Prefer AVI container to reduce lossy compression issues that break LSBs
-			stego_path = os.path.join(OUTPUT_DIR, os.path.splitext(cover_filename)[0] + '_stego.avi')
-			embed_in_video(cover_path, container, stego_path)
-			stego_name = os.path.basename(stego_path)
-		else:
-			return jsonify({'error': 'Unsupported cover file type'}), 400
+		container = build_container(
+			secret_stream, secret_size, secret_filename, secret_kind,
+			password=opts['password'], public_pem=opts['public_pem'],
+			compression=opts['compression'], spool_dir=TEMP_DIR,
+		)
+	except ValueError as e:
+		return jsonify({'error': str(e)}), 400
+
+	if request.form.get('delivery') == 'stream':
+		# Send the stego file in this response instead of storing it for /download
+		try:
+			stego_name, chunks, length = stream_embed(
+				cover.stream, container, cover_filename, opts['video_mode'], _scratch_dir(),
+				opts['depth'], opts['scatter'], opts['image_format'], opts['compress_level'],
+			)
+		except UnsupportedMedia as e:
+			return jsonify({'error': str(e)}), 400
+		except Exception as e:
+			return jsonify({'error': f'Embedding failed: {e}'}), 500
+		# PNG and WebP are still being encoded as they are sent, so they go out chunked;
+		# audio, video, TIFF and BMP have a length
+		headers = {'Content-Disposition': f'attachment; filename="{stego_name}"'}
+		if length is not None:
+			headers['Content-Length'] = str(length)
+		return Response(
+			stream_with_context(chunks),
+			mimetype=mimetypes.guess_type(stego_name)[0] or 'application/octet-stream',
+			headers=headers,
+			direct_passthrough=True,
+		)
+
+	# Written in the request's held scratch directory, then moved into OUTPUT_DIR whole; the
+	# reaper's grace period (min_age) covers it until the client downloads it
+	try:
+		stego_path, stats = embed_container(
+			cover.stream, container, _scratch_dir(),
+			video_mode=opts['video_mode'], cover_name=cover_filename, spool_dir=_scratch_dir(), depth=opts['depth'], scatter=opts['scatter'],
+			image_format=opts['image_format'], compress_level=opts['compress_level'],
+		)
+	except UnsupportedMedia as e:
+		return jsonify({'error': str(e)}), 400
 	except Exception as e:
 		return jsonify({'error': f'Embedding failed: {e}'}), 500
 
-	return jsonify({
+	stego_name = os.path.basename(stego_path)
+	shutil.move(stego_path, os.path.join(OUTPUT_DIR, stego_name))
+	response = {
 		'filename': stego_name,
 		'download_url': url_for('download_file', name=stego_name, _external=True)
-	})
+	}
+	if stats:
+		response['stats'] = stats
+	return jsonify(response)
 
 
 @app.post('/api/extract')
@@ -157,60 +313,386 @@ def api_extract():
 	if not stego:
 		return jsonify({'error': 'Stego file is required'}), 400
 
-	stego_filename = secure_filename(stego.filename or f'stego_{secrets.token_hex(4)}')
-	stego_path = os.path.join(UPLOAD_DIR, stego_filename)
-	stego.save(stego_path)
-
-	media_kind = infer_media_kind(stego_filename)
-
 	try:
-		if media_kind == 'image':
-			container = extract_from_image(stego_path)
-		elif media_kind == 'audio':
-			container = extract_from_wav(stego_path)
-		elif media_kind == 'video':
-			container = extract_from_video(stego_path)
-		else:
-			return jsonify({'error': 'Unsupported stego file type'}), 400
+		container = locate_container(
+			stego.stream, password or None, rsa_private_pem.strip() or None,
+			spool_dir=_scratch_dir(), stego_name=stego.filename or '',
+		)
+	except (UnsupportedMedia, ValueError) as e:
+		# No payload, a corrupted one, or the wrong key for a scattered one
+		return jsonify({'error': str(e)}), 400
 	except Exception as e:
 		return jsonify({'error': f'Extraction failed: {e}'}), 500
 
 	try:
-		# Validate container format before splitting to provide clearer errors
-		if b'\n\n' not in container:
-			return jsonify({'error': 'No embedded payload found in the provided file. Make sure you uploaded a stego file generated by this app.'}), 400
-		head_raw, payload = container.split(b'\n\n', 1)
-		head = json.loads(head_raw.decode('utf-8'))
-		scheme = head.get('encryption', {}).get('scheme')
-		if scheme == 'rsa-hybrid':
-			if not rsa_private_pem.strip():
-				return jsonify({'error': 'RSA private key is required for RSA-encrypted payloads'}), 400
-			plaintext = decrypt_with_rsa_private_key(payload, rsa_private_pem)
-		else:
-			if not password:
-				return jsonify({'error': 'Password is required for AES decryption'}), 400
-			plaintext = decrypt_with_aes(payload, password)
-		filename = head.get('secret_meta', {}).get('filename', 'secret.bin')
+		head, chunks = open_secret(container, password=password or None, private_pem=rsa_private_pem.strip() or None)
+		# Decrypt the first segment now so a wrong key is still a clean 400; the rest streams out
+		first = next(chunks, b'')
+		plaintext = IterReader(itertools.chain([first], chunks), on_close=container.close)
+		filename = head.filename
+	except ContainerError as e:
+		container.close()
+		return jsonify({'error': str(e)}), 400
 	except Exception as e:
+		container.close()
 		return jsonify({'error': f'Decryption failed: {e}'}), 400
 
 	return send_file(
-		io.BytesIO(plaintext),
+		plaintext,
 		as_attachment=True,
 		download_name=filename
 	)
 
 
+@app.post('/api/embed/batch')
+def api_embed_batch():
+	# covers: many files; secrets: optional, one per cover in the same order; otherwise the
+	# shared secret / secret_text is hidden in every cover
+	covers = [f for f in request.files.getlist('covers') if f and f.filename]
+	cover_secrets = [f for f in request.files.getlist('secrets') if f and f.filename]
+	if not covers:
+		return jsonify({'error': 'At least one cover file is required'}), 400
+	if cover_secrets and len(cover_secrets) != len(covers):
+		return jsonify({'error': f'Got {len(cover_secrets)} secrets for {len(covers)} covers'}), 400
+	unsupported = [f.filename for f in covers if infer_media_kind(f.filename) == 'unknown']
+	if unsupported:
+		return jsonify({'error': f'Unsupported cover file type: {", ".join(unsupported)}'}), 400
+	opts, error = _embed_options(require_secret=not cover_secrets)
+	if error:
+		return error
+	try:
+		for cover in covers:
+			check_media_depth(cover.filename, opts['depth'])
+	except ValueError as e:
+		return jsonify({'error': f'Invalid depth for {cover.filename}: {e}'}), 400
+
+	# One KDF run (or RSA wrap) for the whole batch; every container still gets its own nonce prefix
+	try:
+		key = seal_key(opts['password'], opts['public_pem'])
+	except ValueError as e:
+		return jsonify({'error': str(e)}), 400
+
+	batch_dir = _held_dir(OUTPUT_DIR, 'batch_')
+	scratch = _held_dir(TEMP_DIR, 'batch_')
+	uploads = []
+	shared_secret = None
+	if not cover_secrets and opts['secret_file']:
+		shared_secret = _save_upload(opts['secret_file'], 'secret')
+		uploads.append(shared_secret)
+
+	stems = set()
+	kwargs_list = []
+	for i, cover in enumerate(covers):
+		stem = os.path.splitext(secure_filename(cover.filename) or f'cover_{i}')[0] + '_stego'
+		while stem in stems:
+			stem += f'_{i}'
+		stems.add(stem)
+		cover_path = _save_upload(cover, 'cover')
+		secret_path = _save_upload(cover_secrets[i], 'secret') if cover_secrets else shared_secret
+		uploads.append(cover_path)
+		if cover_secrets:
+			uploads.append(secret_path)
+		secret_name = cover_secrets[i].filename if cover_secrets else (opts['secret_file'].filename if shared_secret else None)
+		kwargs_list.append({
+			'cover_path': cover_path,
+			'output_dir': batch_dir,
+			'secret_path': secret_path,
+			'secret_text': None if secret_path else opts['secret_text'],
+			'secret_filename': secure_filename(secret_name) if secret_name else None,
+			'compression': opts['compression'],
+			'video_mode': opts['video_mode'],
+			'spool_dir': scratch,
+			'key': key,
+			'stego_stem': stem,
+			'depth': opts['depth'],
+			'scatter': opts['scatter'],
+			'image_format': opts['image_format'],
+			'compress_level': opts['compress_level'],
+		})
+
+	def cleanup():
+		_release(batch_dir, scratch, *uploads)
+
+	try:
+		batch = jobs.submit_many('embed', embed_job, kwargs_list, labels=[cover.filename for cover in covers])
+	except QueueFull as e:
+		cleanup()
+		return jsonify({'error': str(e)}), 429, {'Retry-After': '5'}
+
+	def generate():
+		# Each stego file is copied into the ZIP as soon as its job finishes
+		sink = ChunkSink()
+		manifest = []
+		try:
+			with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as zf:
+				for job in jobs.as_completed(batch):
+					cover_name = job.label
+					if job.status != 'done':
+						manifest.append({'cover': cover_name, 'status': job.status, 'error': job.error})
+						continue
+					result = job.result
+					with open(result['path'], 'rb') as src, zf.open(result['filename'], 'w', force_zip64=True) as dst:
+						for chunk in iter(lambda: src.read(1024 * 1024), b''):
+							dst.write(chunk)
+							data = sink.drain()
+							if data:
+								yield data
+					os.remove(result['path'])
+					entry = {'cover': cover_name, 'status': 'done', 'filename': result['filename']}
+					if result.get('stats'):
+						entry['stats'] = result['stats']
+					manifest.append(entry)
+				zf.writestr('manifest.json', json.dumps(manifest, indent=2))
+			yield sink.drain()
+		finally:
+			cleanup()
+
+	return Response(
+		generate(),
+		mimetype='application/zip',
+		headers={'Content-Disposition': 'attachment; filename=stego_batch.zip'},
+	)
+
+
+def _save_upload(upload, prefix: str) -> str:
+	"""Save an upload for a job; the reaper leaves it alone until it is released."""
+	# Queued jobs outlive the request, so every upload gets its own name
+	name = secure_filename(upload.filename or '') or 'upload'
+	path = os.path.join(UPLOAD_DIR, f'{prefix}_{secrets.token_hex(6)}_{name}')
+	reaper.hold(path)
+	upload.save(path)
+	return path
+
+
+def _held_dir(parent: str, prefix: str) -> str:
+	"""A new directory under ``parent`` that the reaper skips, with its contents, until released."""
+	path = tempfile.mkdtemp(prefix=prefix, dir=parent)
+	reaper.hold(path)
+	return path
+
+
+def _scratch_dir() -> str:
+	# Spool directory of the current request; removed when the request ends
+	if 'scratch' not in g:
+		g.scratch = _held_dir(TEMP_DIR, 'req_')
+	return g.scratch
+
+
+def _release(*paths: str) -> None:
+	"""Delete files or directories held from the reaper, and drop the holds."""
+	for path in paths:
+		if os.path.isdir(path):
+			shutil.rmtree(path, ignore_errors=True)
+		elif os.path.exists(path):
+			os.remove(path)
+		reaper.release(path)
+
+
+def _job_accepted(job):
+	body = job.to_dict()
+	body['status_url'] = url_for('api_job_status', job_id=job.id, _external=True)
+	body['result_url'] = url_for('api_job_result', job_id=job.id, _external=True)
+	return jsonify(body), 202
+
+
+@app.post('/api/jobs/embed')
+def api_job_embed():
+	if not request.files.get('cover'):
+		return jsonify({'error': 'Cover file is required'}), 400
+	opts, error = _embed_options()
+	if error:
+		return error
+	if infer_media_kind(opts['cover'].filename or '') == 'unknown':
+		return jsonify({'error': 'Unsupported cover file type'}), 400
+
+	cover_path = _save_upload(opts['cover'], 'cover')
+	secret_path = _save_upload(opts['secret_file'], 'secret') if opts['secret_file'] else None
+	inputs = [path for path in (cover_path, secret_path) if path]
+	# Named after the uploaded cover, as /api/embed does, not the prefixed upload path
+	stego_stem = os.path.splitext(secure_filename(opts['cover'].filename or '') or 'cover')[0] + '_stego'
+	scratch = _held_dir(TEMP_DIR, 'job_')
+	try:
+		job = jobs.submit(
+			'embed', embed_job,
+			cover_path=cover_path,
+			output_dir=OUTPUT_DIR,
+			secret_path=secret_path,
+			secret_text=None if secret_path else opts['secret_text'],
+			secret_filename=secure_filename(opts['secret_file'].filename) if secret_path else None,
+			password=opts['password'],
+			public_pem=opts['public_pem'],
+			compression=opts['compression'],
+			video_mode=opts['video_mode'],
+			spool_dir=scratch,
+			stego_stem=stego_stem,
+			depth=opts['depth'],
+			scatter=opts['scatter'],
+			image_format=opts['image_format'],
+			compress_level=opts['compress_level'],
+		)
+	except QueueFull as e:
+		_release(scratch, *inputs)
+		return jsonify({'error': str(e)}), 429, {'Retry-After': '5'}
+	job.add_done_callback(lambda job: _release(scratch, *inputs))
+	return _job_accepted(job)
+
+
+@app.post('/api/jobs/extract')
+def api_job_extract():
+	stego = request.files.get('stego')
+	password = request.form.get('password') or ''
+	rsa_private_pem = request.form.get('rsa_private_pem') or ''
+
+	if not stego:
+		return jsonify({'error': 'Stego file is required'}), 400
+	if infer_media_kind(stego.filename or '') == 'unknown':
+		return jsonify({'error': 'Unsupported stego file type'}), 400
+	if not password and not rsa_private_pem.strip():
+		return jsonify({'error': 'A password or an RSA private key is required'}), 400
+
+	stego_path = _save_upload(stego, 'stego')
+	output_path = os.path.join(TEMP_DIR, f'extract_{secrets.token_hex(8)}.bin')
+	scratch = _held_dir(TEMP_DIR, 'job_')
+	reaper.hold(output_path)
+	try:
+		job = jobs.submit(
+			'extract', extract_job,
+			stego_path=stego_path,
+			output_path=output_path,
+			password=password or None,
+			private_pem=rsa_private_pem.strip() or None,
+			spool_dir=scratch,
+		)
+	except QueueFull as e:
+		_release(scratch, stego_path, output_path)
+		return jsonify({'error': str(e)}), 429, {'Retry-After': '5'}
+
+	def done(job):
+		_release(scratch, stego_path)
+		# The plaintext waits for /result, which deletes it once sent; the reaper ages out unclaimed ones
+		if job.status == 'done':
+			reaper.release(output_path)
+		else:
+			_release(output_path)
+
+	job.add_done_callback(done)
+	return _job_accepted(job)
+
+
+@app.get('/api/jobs/<job_id>')
+def api_job_status(job_id: str):
+	job = jobs.get(job_id)
+	if job is None:
+		return jsonify({'error': 'Unknown job'}), 404
+	return jsonify(job.to_dict())
+
+
+@app.get('/api/jobs/<job_id>/result')
+def api_job_result(job_id: str):
+	job = jobs.get(job_id)
+	if job is None:
+		return jsonify({'error': 'Unknown job'}), 404
+	if job.status == 'failed':
+		return jsonify(job.to_dict()), 400
+	if job.status != 'done':
+		return jsonify(job.to_dict()), 409
+
+	result = job.result
+	path = result['path']
+	if not os.path.exists(path):
+		# Already fetched (extracted secrets are served once) or removed by the reaper
+		return jsonify({'error': 'Result is no longer available'}), 410
+	if job.kind == 'extract':
+		# The plaintext is served once and deleted when the response closes
+		size = os.path.getsize(path)
+		f = open(path, 'rb')
+
+		def close():
+			f.close()
+			_release(path)
+
+		response = send_file(IterReader(iter(lambda: f.read(1024 * 1024), b''), on_close=close), as_attachment=True, download_name=result['filename'])
+		response.content_length = size
+		return response
+	response = {
+		'filename': result['filename'],
+		'download_url': url_for('download_file', name=result['filename'], _external=True)
+	}
+	if result.get('stats'):
+		response['stats'] = result['stats']
+	return jsonify(response)
+
+
+@app.post('/api/capacity')
+def api_capacity():
+	# Answers from the cover's headers, so a client can check a secret fits before embedding
+	cover = request.files.get('cover')
+	if not cover:
+		return jsonify({'error': 'Cover file is required'}), 400
+	secret_file = request.files.get('secret')
+	secret_name = request.form.get('secret_name') or 'secret.bin'
+	secret_size = request.form.get('secret_size')
+	if secret_file and secret_file.filename:
+		secret_name = secure_filename(secret_file.filename)
+		secret_size = secret_file.stream.seek(0, os.SEEK_END)
+	elif request.form.get('secret_text'):
+		secret_name = 'secret.txt'
+		secret_size = len(request.form['secret_text'].encode('utf-8'))
+	try:
+		info = estimate_capacity(
+			cover.stream,
+			cover_name=cover.filename or '',
+			algo='rsa' if request.form.get('algo') == 'rsa' else 'aes',
+			public_pem=(request.form.get('rsa_public_pem') or '').strip() or None,
+			secret_name=secret_name,
+			secret_size=int(secret_size) if secret_size is not None else None,
+			spool_dir=_scratch_dir(),
+			depth=int(request.form.get('depth') or 1),
+			scatter=request.form.get('scatter') in ('1', 'true', 'on'),
+		)
+	except ValueError as e:
+		return jsonify({'error': str(e)}), 400
+	return jsonify(info)
+
+
+@app.get('/api/health')
+def api_health():
+	return jsonify({
+		'status': 'ok',
+		# Codecs are probed when the video backend loads (at startup with STEGANO_PRELOAD, or on first use)
+		'video_codecs': backend('video').codec_report() if loaded('video') else {},
+		'ffmpeg': bool(find_ffmpeg()),
+		'media_loaded': [kind for kind in BACKENDS if loaded(kind)],
+		'jobs': jobs.stats(),
+	})
+
+
+@app.get('/metrics')
+def prometheus_metrics():
+	for kind, info in jobs.stats()['kinds'].items():
+		metrics.set_gauge('stegano_jobs_queued', info['queued'], kind=kind)
+		metrics.set_gauge('stegano_jobs_running', info['running'], kind=kind)
+	return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.get('/download/<path:name>')
 def download_file(name: str):
 	path = os.path.join(OUTPUT_DIR, secure_filename(name))
 	if not os.path.exists(path):
 		return 'Not found', 404
-	return send_file(path, as_attachment=True)
+	# send_file answers Range / If-Range / If-None-Match (206, 304) by default, so clients can resume
+	response = send_file(path, as_attachment=True)
+	response.headers['Accept-Ranges'] = 'bytes'
+	return response
 
 
 if __name__ == '__main__':
 	port = int(os.environ.get('PORT', '5000'))
+	# Load the media backends in STEGANO_PRELOAD (default: all) and probe the video codecs before serving.
+	# Synchronous, and only in the reloader's serving child: a daemon thread still inside OpenCV when
+	# the interpreter exits aborts the process.
+	if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+		warm_up(preload_kinds())
 	ssl_context = None
 	
 	# Check if SSL certificates exist
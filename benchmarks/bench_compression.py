@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Measure what the compression stage buys per secret type: container size, LSBs saved
+and end-to-end embed latency (compress + seal + image embed) for each codec.
+
+Usage: python benchmarks/bench_compression.py [--size 1048576]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stegano.compress import CODEC_NAMES, available_codecs, compress_stream
+from stegano.container import seal
+from stegano.image_lsb import embed_in_image
+
+WORDS = 'secret report quarterly figures meeting agenda steganography payload cover image audio video key password'.split()
+
+
+def _text(size: int) -> bytes:
+	rng = random.Random(0)
+	out = []
+	total = 0
+	while total < size:
+		line = ' '.join(rng.choice(WORDS) for _ in range(12)) + '.\n'
+		out.append(line)
+		total += len(line)
+	return ''.join(out).encode('utf-8')[:size]
+
+
+def _json(size: int) -> bytes:
+	rng = random.Random(1)
+	rows = []
+	total = 0
+	while total < size:
+		row = json.dumps({'id': len(rows), 'name': rng.choice(WORDS), 'score': rng.random(), 'tags': rng.sample(WORDS, 3)})
+		rows.append(row)
+		total += len(row) + 2
+	return ('[' + ',\n'.join(rows) + ']').encode('utf-8')[:size]
+
+
+def _csv(size: int) -> bytes:
+	rng = random.Random(2)
+	lines = ['date,region,units,revenue']
+	total = 0
+	while total < size:
+		line = f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d},{rng.choice(WORDS)},{rng.randint(0, 999)},{rng.random() * 1e4:.2f}'
+		lines.append(line)
+		total += len(line) + 1
+	return '\n'.join(lines).encode('utf-8')[:size]
+
+
+SECRET_TYPES = {
+	'text': _text,
+	'json': _json,
+	'csv': _csv,
+	'random': lambda size: os.urandom(size),
+	'precompressed': lambda size: zlib.compress(_text(size * 8), 9)[:size],
+}
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('--size', type=int, default=256 * 1024, help='secret size in bytes')
+	args = parser.parse_args()
+
+	codecs = ['none'] + [CODEC_NAMES[c] for c in available_codecs()] + ['auto']
+	with tempfile.TemporaryDirectory() as tmp:
+		# A cover large enough for an uncompressed secret of this size
+		side = int(((args.size + 4096) * 8 / 3) ** 0.5) + 1
+		cover_path = os.path.join(tmp, 'cover.png')
+		Image.fromarray(np.random.default_rng(0).integers(0, 256, (side, side, 3), dtype=np.uint8)).save(cover_path)
+
+		print(f"{'secret':>14} {'codec':>6} {'chosen':>6} {'container':>10} {'ratio':>6} {'compress':>9} {'embed':>8}")
+		for kind, make in SECRET_TYPES.items():
+			secret = make(args.size)
+			for codec in codecs:
+				start = time.perf_counter()
+				cid, stream, size = compress_stream(io.BytesIO(secret), len(secret), codec)
+				t_compress = time.perf_counter() - start
+				container = seal(stream, size, 'secret.bin', password='bench').read()
+				embed_in_image(cover_path, container)
+				t_total = time.perf_counter() - start
+				ratio = len(secret) / len(container)
+				print(f'{kind:>14} {codec:>6} {CODEC_NAMES[cid]:>6} {len(container):>10} {ratio:>5.1f}x {t_compress * 1000:>7.1f}ms {t_total * 1000:>6.0f}ms')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Throughput, capacity and distortion (PSNR) per LSB depth for image and audio covers.
+
+Every depth embeds the same payload, so the PSNR column shows the cost of packing it
+into fewer, noisier samples. Covers are synthetic: a smooth RGB gradient with mild
+noise and a 16-bit stereo tone.
+
+Usage: python benchmarks/bench_depth.py [--size 1920x1080] [--seconds 60] [--payload 65536]
+"""
+import argparse
+import io
+import os
+import sys
+import wave
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks._common import best_time, photo, png, wav
+from stegano.audio_lsb import MAX_DEPTH as AUDIO_MAX_DEPTH
+from stegano.audio_lsb import embed_in_wav, extract_from_wav, wav_capacity
+from stegano.image_lsb import MAX_DEPTH as IMAGE_MAX_DEPTH
+from stegano.image_lsb import embed_in_image, extract_from_image, image_capacity
+
+
+def _psnr(a: np.ndarray, b: np.ndarray, peak: float) -> float:
+	mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+	return float('inf') if mse == 0 else 10 * np.log10(peak ** 2 / mse)
+
+
+def _wav_cover(seconds: int, rate: int = 44100) -> bytes:
+	t = np.arange(seconds * rate) / rate
+	tone = (np.sin(2 * np.pi * 440 * t) * 12000).astype(np.int16)
+	return wav(np.repeat(tone, 2), rate)
+
+
+def _row(media: str, depth: int, capacity: int, payload: bytes, t_embed: float, t_extract: float, psnr: float) -> None:
+	mb = len(payload) / 1e6
+	print(f'{media:>6} {depth:>5} {capacity:>12} {mb / t_embed:>9.1f} {mb / t_extract:>9.1f} {psnr:>7.2f}')
+
+
+def bench_image(cover: bytes, payload: bytes) -> None:
+	original = np.asarray(Image.open(io.BytesIO(cover)).convert('RGB'))
+	for depth in range(1, IMAGE_MAX_DEPTH + 1):
+		capacity = image_capacity(cover, depth)['capacity_bytes']
+		if len(payload) > capacity:
+			print(f'{"image":>6} {depth:>5} {capacity:>12} {"payload does not fit":>27}')
+			continue
+		t_embed, stego = best_time(lambda: embed_in_image(cover, payload, depth=depth))
+		t_extract, out = best_time(lambda: extract_from_image(stego))
+		assert out == payload
+		psnr = _psnr(original, np.asarray(Image.open(io.BytesIO(stego))), 255)
+		_row('image', depth, capacity, payload, t_embed, t_extract, psnr)
+
+
+def bench_audio(cover: bytes, payload: bytes) -> None:
+	with wave.open(io.BytesIO(cover)) as w:
+		original = np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16)
+	for depth in range(1, AUDIO_MAX_DEPTH + 1):
+		capacity = wav_capacity(cover, depth)['capacity_bytes']
+		if len(payload) > capacity:
+			print(f'{"audio":>6} {depth:>5} {capacity:>12} {"payload does not fit":>27}')
+			continue
+		t_embed, stego = best_time(lambda: embed_in_wav(cover, payload, depth=depth))
+		t_extract, out = best_time(lambda: extract_from_wav(stego))
+		assert out == payload
+		with wave.open(io.BytesIO(bytes(stego))) as w:
+			samples = np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16)
+		_row('audio', depth, capacity, payload, t_embed, t_extract, _psnr(original, samples, 32767))
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('--size', default='1920x1080', help='image cover size, WxH')
+	parser.add_argument('--seconds', type=int, default=60, help='audio cover length')
+	parser.add_argument('--payload', type=int, default=64 * 1024, help='payload size in bytes')
+	args = parser.parse_args()
+
+	width, height = (int(v) for v in args.size.split('x'))
+	payload = os.urandom(args.payload)
+	print(f"{'media':>6} {'depth':>5} {'capacity':>12} {'emb MB/s':>9} {'ext MB/s':>9} {'PSNR dB':>7}")
+	bench_image(png(photo(width, height)), payload)
+	bench_audio(_wav_cover(args.seconds), payload)
+
+
+if __name__ == '__main__':
+	main()
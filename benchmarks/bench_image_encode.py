@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Encode time versus output size for every lossless image output format.
+
+Each cover carries a payload in its LSBs, as real stego output does, so its low bits
+are noise. The 'first chunk' column is the time until ``iter_embed_image`` hands out
+its first piece, i.e. when a streamed response can start sending. PNG is also timed at
+every zlib level. Covers are synthetic: a noisy photo-like gradient and a flat
+screenshot-like image.
+
+Usage: python benchmarks/bench_image_encode.py [--size 1920x1080] [--payload 65536]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks._common import best_time, photo, png, screenshot
+from stegano.image_lsb import embed_in_image, extract_from_image, iter_embed_image
+from stegano.media import OUTPUT_FORMATS, output_options
+
+
+def _first_chunk(cover: bytes, payload: bytes, image_format: str, compress_level=None) -> float:
+	start = time.perf_counter()
+	chunks = iter_embed_image(cover, payload, image_format=image_format, compress_level=compress_level)
+	next(chunks)
+	elapsed = time.perf_counter() - start
+	chunks.close()
+	return elapsed
+
+
+def bench_cover(name: str, pixels: np.ndarray, payload: bytes) -> None:
+	cover = png(pixels, compress_level=1)
+	raw = pixels.nbytes
+	t_embed, _ = best_time(lambda: embed_in_image(cover, payload, output=io.BytesIO(), image_format='bmp'))
+	print(f'\n{name} {pixels.shape[1]}x{pixels.shape[0]} (embed + BMP encode {t_embed * 1000:.0f}ms)')
+	print(f"{'format':>12} {'level':>5} {'total':>8} {'first chunk':>11} {'size KiB':>9} {'ratio':>6}")
+	runs = [(fmt, None) for fmt in OUTPUT_FORMATS] + [('png', level) for level in range(10)]
+	for image_format, level in runs:
+		t_total, out = best_time(lambda: embed_in_image(cover, payload, image_format=image_format, compress_level=level))
+		assert extract_from_image(out) == payload
+		t_first = min(_first_chunk(cover, payload, image_format, level) for _ in range(3))
+		options = output_options(image_format, level)[2]
+		shown = options.get('compress_level', '-')
+		print(f'{image_format:>12} {shown:>5} {t_total * 1000:>6.0f}ms {t_first * 1000:>9.0f}ms {len(out) // 1024:>9} {len(out) / raw:>6.2f}')
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('--size', default='1920x1080', help='cover size, WxH')
+	parser.add_argument('--payload', type=int, default=64 * 1024, help='payload size in bytes')
+	args = parser.parse_args()
+
+	width, height = (int(v) for v in args.size.split('x'))
+	payload = os.urandom(args.payload)
+	bench_cover('photo', photo(width, height), payload)
+	bench_cover('screenshot', screenshot(width, height), payload)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Compare the NumPy image LSB engine against the original per-pixel loop.
+
+Usage: python benchmarks/bench_image_lsb.py [--sizes 256x256,1024x768,...]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stegano.image_lsb import embed_in_image, extract_from_image
+
+
+def _legacy_bits(data: bytes):
+	for byte in data:
+		for i in range(8):
+			yield (byte >> (7 - i)) & 1
+
+
+def legacy_embed(image_path: str, payload: bytes) -> bytes:
+	img = Image.open(image_path).convert('RGB')
+	pixels = list(img.getdata())
+	width, height = img.size
+	bits_iter = _legacy_bits(len(payload).to_bytes(4, 'big') + payload)
+	new_pixels = []
+	for r, g, b in pixels:
+		try:
+			r = (r & 0xFE) | next(bits_iter)
+			g = (g & 0xFE) | next(bits_iter)
+			b = (b & 0xFE) | next(bits_iter)
+		except StopIteration:
+			new_pixels.append((r, g, b))
+			break
+		new_pixels.append((r, g, b))
+	if len(new_pixels) < len(pixels):
+		new_pixels.extend(pixels[len(new_pixels):])
+	out = Image.new('RGB', (width, height))
+	out.putdata(new_pixels)
+	buf = io.BytesIO()
+	out.save(buf, format='PNG')
+	return buf.getvalue()
+
+
+def _timed(fn, *args):
+	start = time.perf_counter()
+	result = fn(*args)
+	return time.perf_counter() - start, result
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('--sizes', default='256x256,1024x768,1920x1080,4000x3000')
+	parser.add_argument('--fill', type=float, default=0.5, help='payload size as a fraction of capacity')
+	parser.add_argument('--skip-legacy-above', type=int, default=13_000_000,
+		help='skip the legacy loop for covers with more pixels than this')
+	args = parser.parse_args()
+
+	rng = np.random.default_rng(0)
+	print(f"{'size':>11} {'payload':>10} {'legacy embed':>13} {'numpy embed':>12} {'speedup':>8} {'extract':>9}  identical")
+	with tempfile.TemporaryDirectory() as tmp:
+		for spec in args.sizes.split(','):
+			width, height = (int(v) for v in spec.lower().split('x'))
+			cover_path = os.path.join(tmp, f'cover_{spec}.png')
+			Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8)).save(cover_path)
+			payload = os.urandom(int((width * height * 3 // 8 - 4) * args.fill))
+
+			t_new, stego = _timed(embed_in_image, cover_path, payload)
+			stego_path = os.path.join(tmp, f'stego_{spec}.png')
+			with open(stego_path, 'wb') as f:
+				f.write(stego)
+			t_ext, extracted = _timed(extract_from_image, stego_path)
+			assert extracted == payload
+
+			if width * height <= args.skip_legacy_above:
+				t_old, legacy = _timed(legacy_embed, cover_path, payload)
+				legacy_col = f'{t_old:12.3f}s'
+				speedup_col = f'{t_old / t_new:7.1f}x'
+				identical = 'yes' if legacy == stego else 'NO'
+			else:
+				legacy_col, speedup_col, identical = f"{'skipped':>13}", f"{'-':>8}", '-'
+			print(f'{spec:>11} {len(payload):>10} {legacy_col} {t_new:11.3f}s {speedup_col} {t_ext:8.3f}s  {identical}')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Import time and resident memory of the app, the pipeline and each media backend.
+
+Every scenario runs in a fresh interpreter, so nothing is shared between them. Each
+one reports wall time and RSS growth over a bare interpreter (best of ``--repeat``)
+and which heavy libraries ended up loaded. 'eager' is the app plus all three
+backends, as every process loaded before they were imported on demand; a 'first
+<kind>' row is the pipeline plus one backend, i.e. a process that only sees that kind.
+
+Usage: python benchmarks/bench_imports.py [--repeat 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('numpy', 'PIL.Image', 'cv2', 'cryptography')
+
+SCENARIOS = {
+	'stegano.media': 'import stegano.media',
+	'stegano.pipeline': 'import stegano.pipeline',
+	'app': 'import app',
+	'first image': 'import stegano.pipeline; stegano.pipeline.backend("image")',
+	'first audio': 'import stegano.pipeline; stegano.pipeline.backend("audio")',
+	'first video': 'import stegano.pipeline; stegano.pipeline.backend("video")',
+	'eager': 'import app; [app.backend(kind) for kind in app.BACKENDS]',
+}
+
+# Runs in the child: time the statement and report RSS against the bare interpreter
+PROBE = '''
+import json, sys, time
+def rss():
+	with open('/proc/self/status') as f:
+		return next(int(line.split()[1]) for line in f if line.startswith('VmRSS'))
+sys.path.insert(0, {root!r})
+before = rss()
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': elapsed * 1000, 'rss_kib': rss() - before, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+def run(statement: str) -> dict:
+	code = PROBE.format(root=ROOT, statement=statement, heavy=HEAVY)
+	# Started from the repo root so app.py finds its directories; stderr carries OpenCV noise
+	out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+	return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per scenario; the fastest is shown')
+	args = parser.parse_args()
+	if not os.path.exists('/proc/self/status'):
+		sys.exit('RSS is read from /proc/self/status; this benchmark needs Linux')
+
+	print(f"{'scenario':>18} {'time':>8} {'RSS':>9}  loaded")
+	for name, statement in SCENARIOS.items():
+		runs = [run(statement) for _ in range(args.repeat)]
+		best = min(runs, key=lambda r: r['ms'])
+		rss = min(r['rss_kib'] for r in runs)
+		print(f"{name:>18} {best['ms']:>6.0f}ms {rss / 1024:>6.1f}MiB  {', '.join(best['loaded']) or '-'}")
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Compare keyed (scattered) sample placement with the sequential layout.
+
+The first table times the bit writes alone on a raw sample array, where the cost of
+computing keyed positions is most visible. The second times whole embeds and
+extractions, where decoding and encoding the cover dominate.
+
+Usage: python benchmarks/bench_scatter.py [--samples 24883200] [--payloads 65536,1048576]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks._common import best_time, noise, png, wav
+from stegano.audio_lsb import embed_in_wav, extract_from_wav
+from stegano.image_lsb import embed_in_image, extract_from_image
+from stegano.lsb import read_header, read_lsb, write_header, write_lsb
+from stegano.scatter import Scatter, read_scattered, read_scattered_header, write_scattered
+
+KEY = bytes(32)
+
+
+def _sequential(flat: np.ndarray, payload: bytes) -> None:
+	write_lsb(flat, payload, write_header(flat, len(payload)))
+
+
+def _sequential_read(flat: np.ndarray) -> bytes:
+	length, depth, offset = read_header(flat)
+	return read_lsb(flat, length, offset, depth)
+
+
+def _scattered_read(flat: np.ndarray) -> bytes:
+	scatter = Scatter(KEY, flat.size)
+	length, depth = read_scattered_header(flat, scatter)
+	return read_scattered(flat, scatter, length, depth)
+
+
+def bench_raw(samples: int, payloads) -> None:
+	flat = np.random.default_rng(0).integers(0, 256, samples, dtype=np.uint8)
+	print(f"{'payload':>10} {'seq write':>10} {'key write':>10} {'seq read':>10} {'key read':>10}")
+	for size in payloads:
+		payload = os.urandom(size)
+		t_seq, _ = best_time(lambda: _sequential(flat, payload))
+		assert _sequential_read(flat) == payload
+		t_seq_read, _ = best_time(lambda: _sequential_read(flat))
+		t_key, _ = best_time(lambda: write_scattered(flat, payload, Scatter(KEY, flat.size)))
+		assert _scattered_read(flat) == payload
+		t_key_read, _ = best_time(lambda: _scattered_read(flat))
+		mb = size / 1e6
+		print(f'{size:>10} {mb / t_seq:>7.1f}MB/s {mb / t_key:>7.1f}MB/s {mb / t_seq_read:>7.1f}MB/s {mb / t_key_read:>7.1f}MB/s')
+
+
+def _covers(samples: int):
+	side = int((samples / 3) ** 0.5)
+	return png(noise(side, side, seed=1)), wav(np.random.default_rng(2).integers(-2000, 2000, samples, dtype=np.int16))
+
+
+def bench_media(samples: int, payloads) -> None:
+	image_cover, audio_cover = _covers(samples)
+	print(f"\n{'media':>6} {'payload':>10} {'seq embed':>10} {'key embed':>10} {'seq extr':>10} {'key extr':>10}")
+	for media, embed, extract, cover in (
+		('image', embed_in_image, extract_from_image, image_cover),
+		('audio', embed_in_wav, extract_from_wav, audio_cover),
+	):
+		for size in payloads:
+			payload = os.urandom(size)
+			seq = embed(cover, payload)
+			keyed = embed(cover, payload, key=KEY)
+			assert extract(keyed, key=KEY) == payload
+			times = (
+				best_time(lambda: embed(cover, payload), 1)[0],
+				best_time(lambda: embed(cover, payload, key=KEY), 1)[0],
+				best_time(lambda: extract(seq), 1)[0],
+				best_time(lambda: extract(keyed, key=KEY), 1)[0],
+			)
+			print(f'{media:>6} {size:>10} ' + ' '.join(f'{t * 1000:>8.0f}ms' for t in times))
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('--samples', type=int, default=3840 * 2160 * 3, help='cover size in samples')
+	parser.add_argument('--payloads', default='65536,1048576', help='comma-separated payload sizes in bytes')
+	args = parser.parse_args()
+	payloads = [int(p) for p in args.payloads.split(',')]
+	bench_raw(args.samples, payloads)
+	bench_media(args.samples, payloads)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmark suite for every embed, extract, encrypt and decrypt path.
+
+Synthetic covers are generated locally: random-pixel PNGs at several resolutions,
+16-bit stereo WAVs of several lengths and short lossless AVIs. Every case reports
+latency percentiles, throughput in cover MB/s and payload bytes/s, and peak RSS
+(the high-water mark is reset before each case where /proc allows it). The results
+are written as JSON; pass an earlier file to --compare to see median-latency ratios
+between commits.
+
+Usage: python benchmarks/bench_suite.py [--output results.json] [--compare old.json]
+                                        [--filter image.] [--repeat 5] [--quick]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from benchmarks._common import noise, png, wav
+from stegano.audio_lsb import embed_in_wav, embed_in_wav_stream, extract_from_wav, extract_from_wav_stream, wav_capacity
+from stegano.container import open_payload, read_header, seal
+from stegano.crypto import (
+	decrypt_stream, decrypt_with_aes, decrypt_with_rsa_private_key, disable_key_cache, encrypt_stream_aes,
+	encrypt_stream_rsa, encrypt_with_aes, encrypt_with_rsa_public_key, scatter_key,
+)
+from stegano.image_lsb import embed_in_image, extract_from_image, image_capacity, iter_embed_image
+from stegano.video_lsb import embed_in_video, embed_in_video_remux, extract_from_video, find_ffmpeg, select_codec, video_capacity
+
+RESOLUTIONS = [(640, 480), (1920, 1080), (3840, 2160)]
+WAV_SECONDS = [10, 60, 300]
+VIDEO_SIZES = [(320, 240), (640, 480)]
+VIDEO_FRAMES = 30
+CRYPTO_SIZES = [1 << 20, 16 << 20]
+PASSWORD = 'benchmark-password'
+
+
+class Case(NamedTuple):
+	name: str
+	fn: Callable[[], object]
+	cover_bytes: int
+	payload_bytes: int
+	params: Dict[str, object]
+
+
+def _random_png(width: int, height: int) -> bytes:
+	return png(noise(width, height, seed=width * height), compress_level=1)
+
+
+def _wav(seconds: int, rate: int = 44100) -> bytes:
+	return wav(np.random.default_rng(seconds).integers(-8000, 8000, seconds * rate * 2, dtype=np.int16), rate)
+
+
+def _avi(path: str, width: int, height: int, frames: int) -> Optional[str]:
+	codec = select_codec('.avi', width, height)
+	if codec is None:
+		return None
+	writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), 25.0, (width, height))
+	rng = np.random.default_rng(width)
+	for _ in range(frames):
+		writer.write(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+	writer.release()
+	return codec
+
+
+def _rsa_pair():
+	private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+	public_pem = private.public_key().public_bytes(
+		serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo,
+	).decode('utf-8')
+	private_pem = private.private_bytes(
+		serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+	).decode('utf-8')
+	return public_pem, private_pem
+
+
+def image_cases(resolutions, max_payload: int) -> Iterator[Case]:
+	key = scatter_key(password=PASSWORD)
+	for width, height in resolutions:
+		cover = _random_png(width, height)
+		payload = os.urandom(min(max_payload, image_capacity(cover, keyed=True)['capacity_bytes']))
+		stego = embed_in_image(cover, payload)
+		keyed = embed_in_image(cover, payload, key=key)
+		params = {'width': width, 'height': height}
+		res = f'{width}x{height}'
+		yield Case(f'image.embed_in_image[{res}]', lambda: embed_in_image(cover, payload), len(cover), len(payload), params)
+		yield Case(f'image.embed_in_image.keyed[{res}]', lambda: embed_in_image(cover, payload, key=key), len(cover), len(payload), params)
+		yield Case(
+			f'image.iter_embed_image[{res}]', lambda: sum(map(len, iter_embed_image(cover, payload))),
+			len(cover), len(payload), params,
+		)
+		yield Case(f'image.extract_from_image[{res}]', lambda: extract_from_image(stego), len(stego), len(payload), params)
+		yield Case(f'image.extract_from_image.keyed[{res}]', lambda: extract_from_image(keyed, key=key), len(keyed), len(payload), params)
+
+
+def audio_cases(lengths, max_payload: int) -> Iterator[Case]:
+	key = scatter_key(password=PASSWORD)
+	for seconds in lengths:
+		cover = _wav(seconds)
+		payload = os.urandom(min(max_payload, wav_capacity(cover, keyed=True)['capacity_bytes']))
+		stego = bytes(embed_in_wav(cover, payload))
+		keyed = bytes(embed_in_wav(cover, payload, key=key))
+		params = {'seconds': seconds}
+		yield Case(f'audio.embed_in_wav[{seconds}s]', lambda: embed_in_wav(cover, payload), len(cover), len(payload), params)
+		yield Case(f'audio.embed_in_wav.keyed[{seconds}s]', lambda: embed_in_wav(cover, payload, key=key), len(cover), len(payload), params)
+		yield Case(
+			f'audio.embed_in_wav_stream[{seconds}s]', lambda: embed_in_wav_stream(cover, payload, io.BytesIO()),
+			len(cover), len(payload), params,
+		)
+		yield Case(f'audio.extract_from_wav[{seconds}s]', lambda: extract_from_wav(stego), len(stego), len(payload), params)
+		yield Case(f'audio.extract_from_wav.keyed[{seconds}s]', lambda: extract_from_wav(keyed, key=key), len(keyed), len(payload), params)
+		yield Case(
+			f'audio.extract_from_wav_stream[{seconds}s]', lambda: extract_from_wav_stream(stego, io.BytesIO()),
+			len(stego), len(payload), params,
+		)
+
+
+def video_cases(sizes, frames: int, max_payload: int, tmp_dir: str) -> Iterator[Case]:
+	ffmpeg = find_ffmpeg()
+	for width, height in sizes:
+		res = f'{width}x{height}'
+		cover = os.path.join(tmp_dir, f'cover_{res}.avi')
+		codec = _avi(cover, width, height, frames)
+		if codec is None:
+			print(f'skipping video {res}: no lossless AVI codec', file=sys.stderr)
+			continue
+		payload = os.urandom(min(max_payload, video_capacity(cover)['capacity_bytes']))
+		out = os.path.join(tmp_dir, f'out_{res}.avi')
+		remuxed = os.path.join(tmp_dir, f'out_{res}.mkv')
+		embed_in_video(cover, payload, out)
+		size = os.path.getsize(cover)
+		params = {'width': width, 'height': height, 'frames': frames, 'codec': codec}
+		yield Case(f'video.embed_in_video[{res}]', lambda: embed_in_video(cover, payload, out), size, len(payload), params)
+		if ffmpeg:
+			yield Case(
+				f'video.embed_in_video_remux[{res}]', lambda: embed_in_video_remux(cover, payload, remuxed, ffmpeg=ffmpeg),
+				size, len(payload), params,
+			)
+		yield Case(f'video.extract_from_video[{res}]', lambda: extract_from_video(out), os.path.getsize(out), len(payload), params)
+
+
+def crypto_cases(sizes) -> Iterator[Case]:
+	public_pem, private_pem = _rsa_pair()
+	for size in sizes:
+		plaintext = os.urandom(size)
+		params = {'bytes': size}
+		aes_blob = encrypt_with_aes(plaintext, PASSWORD)
+		rsa_blob = encrypt_with_rsa_public_key(plaintext, public_pem)
+		aes_stream = encrypt_stream_aes(io.BytesIO(plaintext), size, PASSWORD).read()
+		rsa_stream = encrypt_stream_rsa(io.BytesIO(plaintext), size, public_pem).read()
+		container = seal(io.BytesIO(plaintext), size, 'secret.bin', password=PASSWORD).read()
+
+		def open_container():
+			src = io.BytesIO(container)
+			return sum(map(len, open_payload(read_header(src), src, password=PASSWORD)))
+
+		mib = size >> 20
+		yield Case(f'crypto.encrypt_with_aes[{mib}MiB]', lambda: encrypt_with_aes(plaintext, PASSWORD), 0, size, params)
+		yield Case(f'crypto.decrypt_with_aes[{mib}MiB]', lambda: decrypt_with_aes(aes_blob, PASSWORD), 0, size, params)
+		yield Case(
+			f'crypto.encrypt_with_rsa_public_key[{mib}MiB]', lambda: encrypt_with_rsa_public_key(plaintext, public_pem),
+			0, size, params,
+		)
+		yield Case(
+			f'crypto.decrypt_with_rsa_private_key[{mib}MiB]', lambda: decrypt_with_rsa_private_key(rsa_blob, private_pem),
+			0, size, params,
+		)
+		yield Case(
+			f'crypto.encrypt_stream_aes[{mib}MiB]', lambda: encrypt_stream_aes(io.BytesIO(plaintext), size, PASSWORD).read(),
+			0, size, params,
+		)
+		yield Case(
+			f'crypto.encrypt_stream_rsa[{mib}MiB]', lambda: encrypt_stream_rsa(io.BytesIO(plaintext), size, public_pem).read(),
+			0, size, params,
+		)
+		yield Case(
+			f'crypto.decrypt_stream.aes[{mib}MiB]', lambda: sum(map(len, decrypt_stream(io.BytesIO(aes_stream), password=PASSWORD))),
+			0, size, params,
+		)
+		yield Case(
+			f'crypto.decrypt_stream.rsa[{mib}MiB]', lambda: sum(map(len, decrypt_stream(io.BytesIO(rsa_stream), private_pem=private_pem))),
+			0, size, params,
+		)
+		yield Case(
+			f'crypto.seal[{mib}MiB]', lambda: seal(io.BytesIO(plaintext), size, 'secret.bin', password=PASSWORD).read(),
+			0, size, params,
+		)
+		yield Case(f'crypto.open_payload[{mib}MiB]', open_container, 0, size, params)
+
+
+def _status_kib(field: str) -> Optional[int]:
+	try:
+		with open('/proc/self/status') as f:
+			for line in f:
+				if line.startswith(field + ':'):
+					return int(line.split()[1])
+	except OSError:
+		pass
+	return None
+
+
+def _reset_peak_rss() -> bool:
+	"""Reset the kernel's RSS high-water mark (Linux); False where that is not possible."""
+	try:
+		with open('/proc/self/clear_refs', 'w') as f:
+			f.write('5')
+		return True
+	except OSError:
+		return False
+
+
+def _percentile(values: List[float], q: float) -> float:
+	ordered = sorted(values)
+	pos = (len(ordered) - 1) * q
+	lo = int(pos)
+	hi = min(lo + 1, len(ordered) - 1)
+	return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def run_case(case: Case, repeat: int, warmup: int) -> Dict[str, object]:
+	# The peak is taken from before the warmup: later runs reuse memory the allocator kept
+	exact = _reset_peak_rss()
+	rss_start = _status_kib('VmRSS')
+	for _ in range(warmup):
+		case.fn()
+	times = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		case.fn()
+		times.append(time.perf_counter() - start)
+	peak = _status_kib('VmHWM') if exact else None
+	if peak is None:
+		# ru_maxrss never goes down, so without /proc this is the peak of the whole run so far
+		peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	p50 = _percentile(times, 0.5)
+	return {
+		'name': case.name,
+		'group': case.name.split('.', 1)[0],
+		'params': case.params,
+		'repeat': repeat,
+		'cover_bytes': case.cover_bytes,
+		'payload_bytes': case.payload_bytes,
+		'latency_s': {
+			'min': min(times),
+			'mean': statistics.fmean(times),
+			'p50': p50,
+			'p90': _percentile(times, 0.9),
+			'p99': _percentile(times, 0.99),
+			'max': max(times),
+			'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+		},
+		'cover_mb_s': case.cover_bytes / 1e6 / p50 if case.cover_bytes else None,
+		'payload_bytes_s': case.payload_bytes / p50,
+		'peak_rss_kib': peak,
+		'peak_rss_delta_kib': peak - rss_start if exact and rss_start is not None else None,
+		'peak_rss_exact': exact,
+	}
+
+
+def _git_commit() -> Optional[str]:
+	try:
+		out = subprocess.run(
+			['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=10,
+			cwd=os.path.dirname(os.path.abspath(__file__)),
+		)
+	except (OSError, subprocess.SubprocessError):
+		return None
+	return out.stdout.strip() or None
+
+
+def _meta(args) -> Dict[str, object]:
+	import PIL
+	import cryptography
+	return {
+		'commit': _git_commit(),
+		'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'cpus': os.cpu_count(),
+		'numpy': np.__version__,
+		'pillow': PIL.__version__,
+		'opencv': cv2.__version__,
+		'cryptography': cryptography.__version__,
+		'args': vars(args),
+	}
+
+
+def _print_row(result: Dict[str, object]) -> None:
+	lat = result['latency_s']
+	cover = f"{result['cover_mb_s']:>9.1f}" if result['cover_mb_s'] is not None else f"{'-':>9}"
+	delta = result['peak_rss_delta_kib']
+	rss = f'{delta / 1024:>8.1f}' if delta is not None else f"{result['peak_rss_kib'] / 1024:>7.1f}*"
+	print(
+		f"{result['name']:<48} {lat['p50'] * 1000:>9.1f} {lat['p90'] * 1000:>9.1f} {lat['p99'] * 1000:>9.1f} "
+		f"{cover} {result['payload_bytes_s'] / 1e6:>9.2f} {rss}",
+		file=sys.stderr,
+	)
+
+
+def compare(old_path: str, results: List[Dict[str, object]]) -> None:
+	"""Print the median-latency ratio against an earlier run; above 1 means slower now."""
+	with open(old_path) as f:
+		old = {r['name']: r for r in json.load(f)['results']}
+	print(f"\n{'case':<48} {'old p50':>9} {'new p50':>9} {'ratio':>6}", file=sys.stderr)
+	for result in results:
+		before = old.get(result['name'])
+		if before is None:
+			continue
+		a, b = before['latency_s']['p50'], result['latency_s']['p50']
+		flag = '  <-- slower' if b > a * 1.1 else ''
+		print(f"{result['name']:<48} {a * 1000:>7.1f}ms {b * 1000:>7.1f}ms {b / a:>6.2f}{flag}", file=sys.stderr)
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument('--output', help='write the JSON results here (default: stdout)')
+	parser.add_argument('--compare', help='earlier JSON results to compare median latencies against')
+	parser.add_argument('--filter', default='', help='only run cases whose name contains this')
+	parser.add_argument('--repeat', type=int, default=5, help='timed runs per case')
+	parser.add_argument('--warmup', type=int, default=1, help='untimed runs per case')
+	parser.add_argument('--payload', type=int, default=1 << 20, help='largest payload embedded, in bytes')
+	parser.add_argument('--quick', action='store_true', help='smallest cover of each kind only')
+	args = parser.parse_args()
+
+	# Every password operation should pay for its key derivation, as it does by default
+	disable_key_cache()
+	pick = (lambda sizes: sizes[:1]) if args.quick else (lambda sizes: sizes)
+	results = []
+	print(f"{'case':<48} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'cover MB/s':>9} {'pay MB/s':>9} {'RSS MiB':>8}", file=sys.stderr)
+	with tempfile.TemporaryDirectory() as tmp_dir:
+		groups = [
+			lambda: image_cases(pick(RESOLUTIONS), args.payload),
+			lambda: audio_cases(pick(WAV_SECONDS), args.payload),
+			lambda: video_cases(pick(VIDEO_SIZES), VIDEO_FRAMES, args.payload, tmp_dir),
+			lambda: crypto_cases(pick(CRYPTO_SIZES)),
+		]
+		for group in groups:
+			for case in group():
+				if args.filter not in case.name:
+					continue
+				result = run_case(case, args.repeat, args.warmup)
+				_print_row(result)
+				results.append(result)
+
+	report = json.dumps({'meta': _meta(args), 'results': results}, indent=2)
+	if args.output:
+		with open(args.output, 'w') as f:
+			f.write(report + '\n')
+	else:
+		print(report)
+	if args.compare:
+		compare(args.compare, results)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,80 @@
+"""
+Gunicorn settings for serving ``app:app`` in production (see serve.py).
+
+Every value can be overridden from the environment:
+STEGANO_BIND (or PORT), STEGANO_WORKERS, STEGANO_THREADS, STEGANO_TIMEOUT,
+STEGANO_GRACEFUL_TIMEOUT, STEGANO_MAX_REQUESTS, STEGANO_CERTFILE / STEGANO_KEYFILE,
+STEGANO_PRELOAD.
+"""
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CPUS = os.cpu_count() or 1
+
+bind = os.environ.get('STEGANO_BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+wsgi_app = 'app:app'
+chdir = BASE_DIR
+
+# One worker by default: background jobs live in the process that accepted them, so
+# /api/jobs/<id> only finds a job when every request reaches that process. Its threads
+# serve concurrent requests and the job pool (one process per core) does the heavy work.
+workers = int(os.environ.get('STEGANO_WORKERS', '1'))
+worker_class = 'gthread'
+threads = int(os.environ.get('STEGANO_THREADS', str(max(8, 2 * CPUS))))
+
+# gthread workers heartbeat from their main loop, so ``timeout`` only fires on a wedged
+# worker; it is still generous because a long video embed can hold the GIL for a while
+timeout = int(os.environ.get('STEGANO_TIMEOUT', '900'))
+# On SIGHUP / SIGTERM / recycling, in-flight requests (e.g. a video embed) get this long to finish
+graceful_timeout = int(os.environ.get('STEGANO_GRACEFUL_TIMEOUT', '300'))
+keepalive = 5
+
+# Recycle a worker after this many requests to give back memory held by large
+# NumPy/OpenCV buffers; the jitter keeps the workers from restarting together. 0 disables.
+# Off by default with a single worker, whose restart would forget every job.
+max_requests = int(os.environ.get('STEGANO_MAX_REQUESTS', '500' if workers > 1 else '0'))
+max_requests_jitter = max_requests // 10
+
+# Heartbeat files on tmpfs so a slow disk can't stall the workers
+if os.path.isdir('/dev/shm'):
+	worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('STEGANO_ACCESS_LOG', '-')
+
+# TLS from certs/ (python generate_ssl.py) unless other files are given; plain HTTP without them
+_cert = os.environ.get('STEGANO_CERTFILE', os.path.join(BASE_DIR, 'certs', 'cert.pem'))
+_key = os.environ.get('STEGANO_KEYFILE', os.path.join(BASE_DIR, 'certs', 'key.pem'))
+if os.path.exists(_cert) and os.path.exists(_key):
+	certfile, keyfile = _cert, _key
+
+# Each worker has its own job pool; split the cores between them unless set explicitly
+os.environ.setdefault('STEGANO_JOB_WORKERS', str(max(1, CPUS // workers)))
+
+
+def on_starting(server):
+	if server.cfg.workers > 1:
+		server.log.warning(
+			'%d workers: each keeps its own background jobs, so /api/jobs/<id> requests must be '
+			'routed back to the worker that accepted the job', server.cfg.workers,
+		)
+
+
+def post_worker_init(worker):
+	# Load the STEGANO_PRELOAD media backends (default: all) and pay their one-off costs before taking
+	# traffic; e.g. STEGANO_PRELOAD=image keeps OpenCV out of workers that never see video
+	from stegano.media import preload_kinds, warm_up
+
+	start = time.perf_counter()
+	kinds = preload_kinds()
+	warm_up(kinds)
+	worker.log.info('Worker %s warmed up (%s) in %.0fms', worker.pid, ', '.join(kinds) or 'nothing', (time.perf_counter() - start) * 1000)
+
+
+def worker_exit(server, worker):
+	# Let running background jobs finish (within graceful_timeout); queued ones are cancelled
+	app = sys.modules.get('app')
+	if app is not None:
+		app.reaper.stop()
+		app.jobs.shutdown(wait=True)
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-Run Stegano app with HTTPS support
+Run Stegano app with HTTPS support, via serve.py (Gunicorn picks up certs/ in gunicorn.conf.py)
 """
 import os
 import sys
@@ -18,8 +18,7 @@ def main():
     # Set environment variables
     os.environ['PORT'] = port
     
-    # Import and run the app
-    from app import app
+    from serve import main as serve
     
     print("🚀 Starting Stegano with HTTPS...")
     print("=" * 50)
@@ -30,9 +29,7 @@ def main():
     print("   Click 'Advanced' → 'Proceed to localhost' to continue")
     print("=" * 50)
     
-    # Run with SSL context
-    ssl_context = ('certs/cert.pem', 'certs/key.pem')
-    app.run(host='0.0.0.0', port=int(port), debug=True, ssl_context=ssl_context)
+    serve()
 
 if __name__ == '__main__':
     main()
@@ -10,5 +10,5 @@ pip install -r requirements.txt
 # Generate SSL certificates
 python generate_ssl.py
 
-# Run the Flask app on port 8000
-PORT=8000 python app.py
+# Serve the app with Gunicorn on port 8000 (HTTPS from certs/, see gunicorn.conf.py)
+PORT=8000 exec python serve.py
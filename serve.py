@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Production launcher: serve the Stegano app with Gunicorn (pre-forked workers, threads,
+graceful restarts, TLS from certs/). Settings live in gunicorn.conf.py; extra
+arguments are passed on to gunicorn, e.g. python serve.py --workers 8
+"""
+import os
+import sys
+
+
+def main():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        from gunicorn.app.wsgiapp import run
+    except ImportError:
+        print("❌ Gunicorn is not installed!")
+        print("🔧 Run: pip install -r requirements.txt")
+        sys.exit(1)
+
+    print("🚀 Starting Stegano with Gunicorn...")
+    print("   Reload workers gracefully: kill -HUP <master pid>")
+    sys.argv = ['gunicorn', '--config', 'gunicorn.conf.py'] + sys.argv[1:]
+    run()
+
+
+if __name__ == '__main__':
+    main()
@@ -100,14 +100,14 @@ def main():
         print(f"🔍 Using port: {port}")
         
         # Step 5: Start the application
-        print("🔒 Starting Flask application with HTTPS...")
+        print("🔒 Starting Stegano with Gunicorn (HTTPS)...")
         print("=" * 50)
         
         env = os.environ.copy()
         env['PORT'] = str(port)
         
-        # Start the Flask app
-        process = subprocess.run([python_exe, 'app.py'], env=env, check=False)
+        # Start the production server (python app.py is the debug server)
+        process = subprocess.run([python_exe, 'serve.py'], env=env, check=False)
         
         if process.returncode != 0:
             print(f"❌ Application failed to start (exit code: {process.returncode})")
@@ -0,0 +1,7 @@
+import sys
+
+from .cli import main
+
+# Guarded: spawned pool workers import this module too
+if __name__ == '__main__':
+	sys.exit(main())
@@ -1,76 +1,317 @@
-import wave
 import io
+import os
+import struct
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple, Union
 import numpy as np
 
+from .lsb import capacity_bytes, check_depth, header_samples, read_header, read_lsb, sample_values, samples_needed, write_header, write_lsb
+from .scatter import Scatter, read_scattered, read_scattered_header, write_scattered
+from .streams import Sink, Source, open_sink, open_source
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+SUPPORTED_SAMPWIDTHS = (1, 2, 3, 4)
+
+# Only the low byte of each sample is ever modified, so up to 8 bits per sample; see max_depth
+MAX_DEPTH = 8
+
+# Frames per block in streaming mode; a multiple of 8 keeps every block byte-aligned
+BLOCK_FRAMES = 64 * 1024
+COPY_CHUNK = 1024 * 1024
+
+
+def _wav_layout(f) -> Tuple[int, int, int, int, int]:
+	"""Walk the RIFF chunks of an open WAV file.
+
+	Returns ``(n_channels, sampwidth, framerate, data_offset, data_size)`` so the
+	sample data can be mapped or patched in place without decoding the file.
+	"""
+	riff = f.read(12)
+	if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+		raise ValueError('Not a RIFF/WAVE file')
+	file_size = f.seek(0, os.SEEK_END)
+	f.seek(12)
+	fmt = None
+	while True:
+		chunk = f.read(8)
+		if len(chunk) < 8:
+			raise ValueError('WAV file has no data chunk')
+		chunk_id, chunk_size = struct.unpack('<4sI', chunk)
+		if chunk_id == b'fmt ':
+			fmt = f.read(chunk_size)
+			if chunk_size % 2:
+				f.seek(1, os.SEEK_CUR)
+		elif chunk_id == b'data':
+			if fmt is None or len(fmt) < 16:
+				raise ValueError('WAV data chunk precedes its fmt chunk')
+			format_tag, n_channels, framerate, _, _, bits = struct.unpack('<HHIIHH', fmt[:16])
+			if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE) or bits // 8 not in SUPPORTED_SAMPWIDTHS:
+				raise ValueError('Only 8/16/24/32-bit PCM WAV supported')
+			data_offset = f.tell()
+			# Streamed WAVs may leave the size field unset; trust the file length instead
+			data_size = min(chunk_size, file_size - data_offset)
+			return n_channels, bits // 8, framerate, data_offset, data_size
+		else:
+			f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+def max_depth(sampwidth: int) -> int:
+	"""Deepest allowed depth for ``sampwidth``-byte samples; at least the top bit of every
+	sample is kept, so 8-bit PCM stops at 7."""
+	return min(MAX_DEPTH, sampwidth * 8 - 1)
+
+
+def _low_bytes(raw: np.ndarray, sampwidth: int) -> np.ndarray:
+	"""Strided view of the least significant byte of every little-endian PCM sample."""
+	usable = raw.size - raw.size % sampwidth
+	return raw[:usable:sampwidth]
 
-def _bytes_to_bits(data: bytes):
-	for byte in data:
-		for i in range(8):
-			yield (byte >> (7 - i)) & 1
-
-
-def _bits_to_bytes(bits):
-	b = 0
-	count = 0
-	for bit in bits:
-		b = (b << 1) | bit
-		count += 1
-		if count == 8:
-			yield b
-			b = 0
-			count = 0
-
-
-def embed_in_wav(wav_path: str, payload: bytes) -> bytes:
-	with wave.open(wav_path, 'rb') as w:
-		n_channels = w.getnchannels()
-		sampwidth = w.getsampwidth()
-		framerate = w.getframerate()
-		n_frames = w.getnframes()
-		audio_bytes = w.readframes(n_frames)
-
-	if sampwidth != 2:
-		raise ValueError('Only 16-bit PCM WAV supported')
-
-	data = (len(payload).to_bytes(4, 'big') + payload)
-	samples = np.frombuffer(audio_bytes, dtype=np.int16)
-	capacity_bits = samples.size
-	needed_bits = len(data) * 8
-	if needed_bits > capacity_bits:
-		raise ValueError('Payload too large for audio capacity')
 
-	samples = samples.copy()
-	bits_iter = _bytes_to_bits(data)
-	for i in range(needed_bits):
-		bit = next(bits_iter)
-		samples[i] = (samples[i] & 0xFFFE) | bit
-
-	out_bytes = samples.tobytes()
-	buf = io.BytesIO()
-	with wave.open(buf, 'wb') as wout:
-		wout.setnchannels(n_channels)
-		wout.setsampwidth(sampwidth)
-		wout.setframerate(framerate)
-		wout.writeframes(out_bytes)
-	return buf.getvalue()
-
-
-def extract_from_wav(wav_path: str) -> bytes:
-	with wave.open(wav_path, 'rb') as w:
-		sampwidth = w.getsampwidth()
-		n_frames = w.getnframes()
-		audio_bytes = w.readframes(n_frames)
-	if sampwidth != 2:
-		raise ValueError('Only 16-bit PCM WAV supported')
-	samples = np.frombuffer(audio_bytes, dtype=np.int16)
-	bits = samples & 1
-
-	length_bits = bits[:32]
-	length = 0
-	for bit in length_bits:
-		length = (length << 1) | int(bit)
-	payload_bits = bits[32:32 + length * 8]
-	payload = bytes(_bits_to_bytes(int(b) for b in payload_bits))
-	if len(payload) != length:
+def _read_samples(f: BinaryIO, data_offset: int, sampwidth: int, start: int, count: int) -> np.ndarray:
+	"""Low bytes of samples ``start .. start + count`` of the data chunk.
+
+	Files on disk are memory-mapped so only the touched pages are read; in-memory
+	streams are read for just that span.
+	"""
+	if count <= 0:
+		return np.zeros(0, dtype=np.uint8)
+	offset = data_offset + start * sampwidth
+	if isinstance(f, (io.BufferedReader, io.FileIO)):
+		raw = np.memmap(f, dtype=np.uint8, mode='r', offset=offset, shape=(count * sampwidth,))
+	else:
+		f.seek(offset)
+		raw = np.frombuffer(_read_exact(f, count * sampwidth), dtype=np.uint8)
+	return _low_bytes(raw, sampwidth)
+
+
+def _payload_header(f: BinaryIO, data_offset: int, sampwidth: int, data_size: int) -> Tuple[int, int, int]:
+	"""Returns ``(length, depth, offset)`` of the embedded payload, validated against the file size."""
+	n_samples = data_size // sampwidth
+	if n_samples < 32:
+		raise ValueError('Corrupted or incomplete payload in audio')
+	length, depth, offset = read_header(_read_samples(f, data_offset, sampwidth, 0, min(n_samples, header_samples(2))))
+	if samples_needed(length, depth) > n_samples:
+		raise ValueError('Corrupted or incomplete payload in audio')
+	return length, depth, offset
+
+
+def _scattered_payload(f: BinaryIO, data_offset: int, sampwidth: int, data_size: int, key: bytes):
+	"""``(samples, scatter, length, depth)`` of a keyed payload, or None if there is none."""
+	n_samples = data_size // sampwidth
+	if n_samples < header_samples(1, keyed=True):
+		return None
+	samples = _read_samples(f, data_offset, sampwidth, 0, n_samples)
+	scatter = Scatter(key, n_samples)
+	header = read_scattered_header(samples, scatter)
+	if header is None:
+		return None
+	length, depth = header
+	if samples_needed(length, depth, keyed=True) > n_samples:
 		raise ValueError('Corrupted or incomplete payload in audio')
-	return payload
+	return samples, scatter, length, depth
+
+
+def wav_capacity(wav: Source, depth: int = 1, keyed: bool = False) -> Dict[str, object]:
+	"""Payload capacity from the RIFF header alone."""
+	check_depth(depth, MAX_DEPTH)
+	with open_source(wav) as f:
+		n_channels, sampwidth, framerate, _, data_size = _wav_layout(f)
+	check_depth(depth, max_depth(sampwidth))
+	samples = data_size // sampwidth
+	frames = samples // max(1, n_channels)
+	return {
+		'media': 'audio', 'channels': n_channels, 'sampwidth': sampwidth, 'framerate': framerate,
+		'frames': frames, 'duration': frames / framerate if framerate else 0.0, 'depth': depth,
+		'capacity_bits': samples * depth, 'capacity_bytes': capacity_bytes(samples, depth, keyed),
+	}
+
+
+def embed_in_wav(wav: Source, payload: bytes, depth: int = 1, key: Optional[bytes] = None) -> bytearray:
+	# The output buffer is the only copy of the file; only the carrier samples are rewritten
+	check_depth(depth, MAX_DEPTH)
+	with open_source(wav) as f:
+		_, sampwidth, _, data_offset, data_size = _wav_layout(f)
+		check_depth(depth, max_depth(sampwidth))
+		buf = bytearray(f.seek(0, os.SEEK_END))
+		f.seek(0)
+		f.readinto(buf)
+
+	raw = np.frombuffer(buf, dtype=np.uint8, count=data_size, offset=data_offset)
+	samples = _low_bytes(raw, sampwidth)
+	if samples_needed(len(payload), depth, key is not None) > samples.size:
+		raise ValueError('Payload too large for audio capacity')
+
+	if key is not None:
+		write_scattered(samples, payload, Scatter(key, samples.size), depth)
+	else:
+		offset = write_header(samples, len(payload), depth)
+		write_lsb(samples, payload, offset, depth)
+	return buf
+
+
+def extract_from_wav(wav: Source, key: Optional[bytes] = None) -> bytes:
+	"""Read the payload; with ``key``, keyed placement is tried before the sequential layout."""
+	with open_source(wav) as f:
+		_, sampwidth, _, data_offset, data_size = _wav_layout(f)
+		found = _scattered_payload(f, data_offset, sampwidth, data_size, key) if key is not None else None
+		if found is not None:
+			return read_scattered(*found)
+		length, depth, offset = _payload_header(f, data_offset, sampwidth, data_size)
+		count = samples_needed(length, depth) - offset
+		return read_lsb(_read_samples(f, data_offset, sampwidth, offset, count), length, 0, depth)
+
+
+def _read_exact(f: BinaryIO, n: int) -> bytes:
+	parts = []
+	while n > 0:
+		chunk = f.read(n)
+		if not chunk:
+			break
+		parts.append(chunk)
+		n -= len(chunk)
+	return b''.join(parts)
+
+
+def iter_embed_wav(
+	wav: Source,
+	payload: Union[bytes, BinaryIO],
+	payload_len: Optional[int] = None,
+	block_frames: int = BLOCK_FRAMES,
+	depth: int = 1,
+	key: Optional[bytes] = None,
+) -> Iterator[bytes]:
+	"""Yield the stego WAV in pieces as it is produced; the output is as long as ``wav``.
+
+	``payload`` may be bytes or a readable file object of ``payload_len`` bytes.
+	Only the blocks that carry payload bits are decoded and rewritten; the rest of
+	the file is passed through unchanged, so memory use does not grow with the file.
+	With ``key`` the bits are scattered over the whole data chunk, so every block is
+	rewritten and the payload is held in memory (``8 / depth`` bytes per payload byte).
+	"""
+	check_depth(depth, MAX_DEPTH)
+	if isinstance(payload, (bytes, bytearray, memoryview)):
+		payload_len = len(payload)
+		payload = io.BytesIO(payload)
+	elif payload_len is None:
+		raise ValueError('payload_len is required for file-like payloads')
+	# Blocks hold whole payload bytes at any depth, and the first block holds the whole header
+	block_frames = max(header_samples(depth), block_frames - block_frames % 8)
+
+	with open_source(wav) as src:
+		n_channels, sampwidth, _, data_offset, data_size = _wav_layout(src)
+		check_depth(depth, max_depth(sampwidth))
+		if samples_needed(payload_len, depth, key is not None) > data_size // sampwidth:
+			raise ValueError('Payload too large for audio capacity')
+
+		src.seek(0)
+		yield src.read(data_offset)
+		block_samples = block_frames * n_channels
+		if key is not None:
+			yield from _iter_scattered_blocks(src, data_size // sampwidth, sampwidth, block_samples, payload, payload_len, depth, key)
+			return
+		remaining = payload_len
+		first = True
+		while first or remaining:
+			block = bytearray(_read_exact(src, block_samples * sampwidth))
+			if not block:
+				raise ValueError('Unexpected end of WAV data')
+			samples = _low_bytes(np.frombuffer(block, dtype=np.uint8), sampwidth)
+			offset = 0
+			if first:
+				offset = write_header(samples, payload_len, depth)
+				first = False
+			take = min((samples.size - offset) * depth // 8, remaining)
+			if take > 0:
+				chunk = _read_exact(payload, take)
+				if len(chunk) < take:
+					raise ValueError('Payload stream ended early')
+				write_lsb(samples, chunk, offset, depth)
+				remaining -= take
+			yield bytes(block)
+		# Everything after the carrier blocks, trailing chunks included, is copied verbatim
+		yield from iter(lambda: src.read(COPY_CHUNK), b'')
+
+
+def _iter_scattered_blocks(
+	src: BinaryIO,
+	n_samples: int,
+	sampwidth: int,
+	block_samples: int,
+	payload: BinaryIO,
+	payload_len: int,
+	depth: int,
+	key: bytes,
+) -> Iterator[bytes]:
+	"""Rewrite every block of the data chunk for keyed placement, then copy the rest."""
+	data = _read_exact(payload, payload_len)
+	if len(data) < payload_len:
+		raise ValueError('Payload stream ended early')
+	scatter = Scatter(key, n_samples)
+	# The header goes one bit per sample to its own positions; the payload at depth to the rest
+	head = np.zeros(scatter.head.size, dtype=np.uint8)
+	write_header(head, payload_len, depth, keyed=True)
+	values = sample_values(data, depth)
+	keep = np.uint8(0xFF ^ ((1 << depth) - 1))
+	for lo in range(0, n_samples, block_samples):
+		count = min(block_samples, n_samples - lo)
+		block = bytearray(_read_exact(src, count * sampwidth))
+		if len(block) < count * sampwidth:
+			raise ValueError('Unexpected end of WAV data')
+		samples = _low_bytes(np.frombuffer(block, dtype=np.uint8), sampwidth)
+		hits = np.flatnonzero((scatter.head >= lo) & (scatter.head < lo + count))
+		pos = scatter.head[hits] - lo
+		samples[pos] = (samples[pos] & 0xFE) | head[hits]
+		numbers, pos = scatter.data_in(values.size, lo, lo + count)
+		pos -= lo
+		samples[pos] = (samples[pos] & keep) | values[numbers]
+		yield bytes(block)
+	yield from iter(lambda: src.read(COPY_CHUNK), b'')
+
+
+def embed_in_wav_stream(
+	wav: Source,
+	payload: Union[bytes, BinaryIO],
+	output: Sink,
+	payload_len: Optional[int] = None,
+	block_frames: int = BLOCK_FRAMES,
+	depth: int = 1,
+	key: Optional[bytes] = None,
+) -> int:
+	"""Embed ``payload`` block by block, writing the stego WAV straight to ``output``.
+
+	``wav`` may be a path, buffer or file object and ``output`` a path or writable file.
+	See ``iter_embed_wav``. Returns the number of bytes written.
+	"""
+	chunks = iter_embed_wav(wav, payload, payload_len, block_frames, depth, key)
+	# Pull the header first so a payload that doesn't fit fails before output is created
+	first = next(chunks)
+	with open_sink(output) as dst:
+		written = dst.write(first)
+		for chunk in chunks:
+			written += dst.write(chunk)
+	return written
+
+
+def extract_from_wav_stream(wav: Source, sink: BinaryIO, block_frames: int = BLOCK_FRAMES, key: Optional[bytes] = None) -> int:
+	"""Write the embedded payload to ``sink`` one block at a time. Returns its length.
+
+	With ``key``, keyed placement is tried before the sequential layout.
+	"""
+	with open_source(wav) as f:
+		_, sampwidth, _, data_offset, data_size = _wav_layout(f)
+		found = _scattered_payload(f, data_offset, sampwidth, data_size, key) if key is not None else None
+		if found is not None:
+			samples, scatter, length, depth = found
+			block_bytes = max(8, block_frames - block_frames % 8) * depth // 8
+			for start in range(0, length, block_bytes):
+				sink.write(read_scattered(samples, scatter, length, depth, start, min(block_bytes, length - start)))
+			return length
+		length, depth, offset = _payload_header(f, data_offset, sampwidth, data_size)
+		# block_frames samples hold a whole number of bytes at any depth
+		block_samples = max(8, block_frames - block_frames % 8)
+		block_bytes = block_samples * depth // 8
+		for start in range(0, length, block_bytes):
+			n = min(block_bytes, length - start)
+			count = -(-n * 8 // depth)
+			sink.write(read_lsb(_read_samples(f, data_offset, sampwidth, offset + start * 8 // depth, count), n, 0, depth))
+	return length
@@ -0,0 +1,70 @@
+from typing import Dict, Optional
+
+from .container import SCHEME_AES, SCHEME_RSA, header_size
+from .crypto import STREAM_CHUNK, max_plaintext_len, rsa_key_bytes, stream_ciphertext_len
+from .media import backend
+from .pipeline import UnsupportedMedia, infer_media_kind
+from .streams import Source
+
+# Wrapped-key size assumed for RSA when no public key is given (2048-bit)
+DEFAULT_RSA_KEY_BYTES = 256
+
+
+def media_capacity(
+	cover: Source,
+	cover_name: Optional[str] = None,
+	spool_dir: Optional[str] = None,
+	depth: int = 1,
+	keyed: bool = False,
+) -> Dict[str, object]:
+	"""Container bytes ``cover`` can carry at ``depth`` bits per sample, read from its headers only.
+
+	``keyed`` accounts for the longer header written with keyed placement.
+	"""
+	media_kind = infer_media_kind(cover_name or str(cover))
+	if media_kind == 'image':
+		return backend('image').image_capacity(cover, depth, keyed)
+	if media_kind == 'audio':
+		return backend('audio').wav_capacity(cover, depth, keyed)
+	if media_kind == 'video':
+		return backend('video').video_capacity(cover, tmp_dir=spool_dir, depth=depth, keyed=keyed)
+	raise UnsupportedMedia('Unsupported cover file type')
+
+
+def estimate_capacity(
+	cover: Source,
+	cover_name: Optional[str] = None,
+	algo: str = 'aes',
+	public_pem: Optional[str] = None,
+	secret_name: str = 'secret.bin',
+	secret_size: Optional[int] = None,
+	spool_dir: Optional[str] = None,
+	depth: int = 1,
+	scatter: bool = False,
+) -> Dict[str, object]:
+	"""Media capacity plus the container overhead for ``algo`` ('aes' or 'rsa').
+
+	``max_secret_bytes`` is the largest uncompressed secret that fits; compressible
+	secrets can be larger. With ``secret_size`` the result also says whether it fits.
+	``scatter`` sizes for keyed placement, whose header is slightly longer.
+	"""
+	info = media_capacity(cover, cover_name, spool_dir, depth, scatter)
+	if algo == 'rsa':
+		key_len = rsa_key_bytes(public_pem) if public_pem else DEFAULT_RSA_KEY_BYTES
+		head = header_size(SCHEME_RSA, secret_name, key_len)
+	else:
+		head = header_size(SCHEME_AES, secret_name)
+	info.update({
+		'scheme': algo,
+		'scatter': scatter,
+		'container_header_bytes': head,
+		'segment_bytes': STREAM_CHUNK,
+		'max_secret_bytes': max(0, max_plaintext_len(info['capacity_bytes'] - head)),
+	})
+	if secret_size is not None:
+		container = head + stream_ciphertext_len(secret_size)
+		info['secret_bytes'] = secret_size
+		info['container_bytes'] = container
+		info['overhead_bytes'] = container - secret_size
+		info['fits'] = container <= info['capacity_bytes']
+	return info
@@ -0,0 +1,299 @@
+"""
+Command-line interface: python -m stegano {embed,extract,capacity,bench} ...
+
+Inputs are files, globs (``**`` recurses) or directories (their media files). Embeds
+and extractions fan out over a process pool (``-j``) and each result is written to
+the output directory as soon as it is ready.
+"""
+import argparse
+import getpass
+import glob
+import json
+import os
+import runpy
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+from .capacity import estimate_capacity
+from .compress import CODEC_NAMES
+from .container import seal_key
+from .crypto import scatter_key
+from .jobs import DONE, JobManager
+from .media import OUTPUT_FORMATS, output_options
+from .pipeline import check_media_depth, embed_job, extract_job, infer_media_kind
+
+BENCH_SUITE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'bench_suite.py')
+
+
+def expand_inputs(patterns: Iterable[str]) -> List[str]:
+	"""Files named by ``patterns``, in order and without repeats.
+
+	Directories and globs contribute only files of a known media kind; a plain path
+	is kept whatever its type, so the embedder reports it.
+	"""
+	paths: List[str] = []
+	for pattern in patterns:
+		if os.path.isdir(pattern):
+			found = sorted(os.path.join(pattern, name) for name in os.listdir(pattern))
+		elif any(c in pattern for c in '*?['):
+			found = sorted(glob.glob(pattern, recursive=True))
+		elif os.path.isfile(pattern):
+			paths.append(pattern)
+			continue
+		else:
+			raise ValueError(f'No such file or directory: {pattern}')
+		paths.extend(p for p in found if os.path.isfile(p) and infer_media_kind(p) != 'unknown')
+	return list(dict.fromkeys(paths))
+
+
+def _read_pem(path: Optional[str]) -> Optional[str]:
+	if not path:
+		return None
+	with open(path) as f:
+		return f.read()
+
+
+def _password(args: argparse.Namespace, needed: bool) -> Optional[str]:
+	# Prefer the environment or a prompt to -p, which other users can see in the process list
+	password = args.password or os.environ.get('STEGANO_PASSWORD')
+	if not password and needed and sys.stdin.isatty():
+		password = getpass.getpass('Password: ')
+	return password or None
+
+
+def _size(n: float) -> str:
+	if n < 1000:
+		return f'{n:.0f} B'
+	for unit in ('KB', 'MB', 'GB'):
+		n /= 1000
+		if n < 1000:
+			break
+	return f'{n:.1f} {unit}'
+
+
+def _run_jobs(kind: str, fn, inputs: List[str], kwargs_list: List[Dict[str, object]], workers: int, on_done) -> int:
+	"""Run ``fn`` over ``kwargs_list`` on a pool, reporting each job as it finishes; returns the failure count."""
+	manager = JobManager(max_workers=workers, max_queued=len(kwargs_list) + 1)
+	start = time.perf_counter()
+	in_bytes = out_bytes = 0
+	failed = 0
+	try:
+		batch = manager.submit_many(kind, fn, kwargs_list)
+		index = {job.id: i for i, job in enumerate(batch)}
+		for job in manager.as_completed(batch):
+			source = inputs[index[job.id]]
+			seconds = job.finished - job.started
+			if job.status == DONE:
+				written = on_done(job.result)
+				size = os.path.getsize(written)
+				in_bytes += os.path.getsize(source)
+				out_bytes += size
+				print(f'ok    {source} -> {written} ({_size(size)}, {seconds:.2f}s)', flush=True)
+			else:
+				failed += 1
+				print(f'FAIL  {source}: {job.error}', file=sys.stderr, flush=True)
+	except KeyboardInterrupt:
+		manager.shutdown(wait=False)
+		raise
+	manager.shutdown()
+	elapsed = time.perf_counter() - start
+	done = len(kwargs_list) - failed
+	print(
+		f'{done} ok, {failed} failed in {elapsed:.2f}s with {workers} worker(s): '
+		f'{_size(in_bytes)} in, {_size(out_bytes)} out, {in_bytes / 1e6 / elapsed:.1f} MB/s, {done / elapsed:.2f} files/s'
+	)
+	return failed
+
+
+def cmd_embed(args: argparse.Namespace) -> int:
+	covers = expand_inputs(args.inputs)
+	if not covers:
+		raise ValueError('No cover files matched')
+	if args.secret and not os.path.isfile(args.secret):
+		raise ValueError(f'No such secret file: {args.secret}')
+	public_pem = _read_pem(args.public_key)
+	password = _password(args, needed=not public_pem)
+	output_options(args.image_format, args.compress_level)
+	for cover in covers:
+		check_media_depth(cover, args.depth)
+	os.makedirs(args.output, exist_ok=True)
+
+	# One KDF run (or RSA wrap) for the whole run; every container still gets its own nonce prefix
+	key = seal_key(password, public_pem)
+	scatter = scatter_key(password=None if public_pem else password, public_pem=public_pem) if args.scatter else None
+	stems = set()
+	kwargs_list = []
+	for i, cover in enumerate(covers):
+		stem = os.path.splitext(os.path.basename(cover))[0] + '_stego'
+		while stem in stems:
+			stem += f'_{i}'
+		stems.add(stem)
+		kwargs_list.append({
+			'cover_path': cover,
+			'output_dir': args.output,
+			'secret_path': args.secret,
+			'secret_text': args.text,
+			'compression': args.compression,
+			'video_mode': args.video_mode,
+			'spool_dir': args.tmp_dir,
+			'key': key,
+			'stego_stem': stem,
+			'depth': args.depth,
+			'scatter': scatter,
+			'image_format': args.image_format,
+			'compress_level': args.compress_level,
+		})
+	return _run_jobs('embed', embed_job, covers, kwargs_list, args.jobs, lambda result: result['path'])
+
+
+def _secret_name(stego_path: str, stored: str) -> str:
+	# The stored name comes from the embedder; keep only its last component
+	name = os.path.basename(stored.replace('\\', '/'))
+	if name in ('', '.', '..'):
+		name = 'secret.bin'
+	return os.path.splitext(os.path.basename(stego_path))[0] + '_' + name
+
+
+def cmd_extract(args: argparse.Namespace) -> int:
+	stegos = expand_inputs(args.inputs)
+	if not stegos:
+		raise ValueError('No stego files matched')
+	private_pem = _read_pem(args.private_key)
+	password = _password(args, needed=not private_pem)
+	if not password and not private_pem:
+		raise ValueError('A password or an RSA private key is required')
+	os.makedirs(args.output, exist_ok=True)
+
+	kwargs_list = [{
+		'stego_path': stego,
+		# Written under a temporary name, then renamed after the name stored in the container
+		'output_path': os.path.join(args.output, f'.{i}.{os.path.basename(stego)}.part'),
+		'password': password,
+		'private_pem': private_pem,
+		'spool_dir': args.tmp_dir,
+	} for i, stego in enumerate(stegos)]
+	parts = {kwargs['output_path']: kwargs['stego_path'] for kwargs in kwargs_list}
+
+	def finish(result: Dict[str, object]) -> str:
+		path = os.path.join(args.output, _secret_name(parts[result['path']], result['filename']))
+		os.replace(result['path'], path)
+		return path
+
+	try:
+		return _run_jobs('extract', extract_job, stegos, kwargs_list, args.jobs, finish)
+	finally:
+		for part in parts:
+			if os.path.exists(part):
+				os.remove(part)
+
+
+def cmd_capacity(args: argparse.Namespace) -> int:
+	covers = expand_inputs(args.inputs)
+	if not covers:
+		raise ValueError('No cover files matched')
+	public_pem = _read_pem(args.public_key)
+	secret_size = os.path.getsize(args.secret) if args.secret else args.secret_size
+	failed = 0
+	if not args.json:
+		print(f"{'media':>6} {'capacity':>12} {'max secret':>12} {'fits':>5}  file")
+	for cover in covers:
+		try:
+			info = estimate_capacity(
+				cover, algo='rsa' if public_pem else 'aes', public_pem=public_pem,
+				secret_size=secret_size, spool_dir=args.tmp_dir, depth=args.depth, scatter=args.scatter,
+			)
+		except (ValueError, OSError) as e:
+			# e.g. an unreadable cover; the others are still reported
+			failed += 1
+			print(f'FAIL  {cover}: {e}', file=sys.stderr)
+			continue
+		if args.json:
+			print(json.dumps(dict(info, file=cover)), flush=True)
+		else:
+			fits = {True: 'yes', False: 'no'}.get(info.get('fits'), '-')
+			print(f"{info['media']:>6} {info['capacity_bytes']:>12} {info['max_secret_bytes']:>12} {fits:>5}  {cover}", flush=True)
+	return failed
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+	if not os.path.exists(BENCH_SUITE):
+		raise ValueError('The benchmark suite (benchmarks/bench_suite.py) is only available in a source checkout')
+	sys.argv = [BENCH_SUITE] + args.args
+	runpy.run_path(BENCH_SUITE, run_name='__main__')
+	return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(prog='python -m stegano', description='Hide files in images, WAV audio and video, offline.')
+	commands = parser.add_subparsers(dest='command', required=True)
+
+	def common(sub: argparse.ArgumentParser, inputs_help: str) -> None:
+		sub.add_argument('inputs', nargs='+', help=inputs_help)
+		sub.add_argument('--tmp-dir', help='where large intermediates are spooled (default: system temp)')
+
+	def pooled(sub: argparse.ArgumentParser) -> None:
+		sub.add_argument('-o', '--output', required=True, help='output directory')
+		sub.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='worker processes (default: CPU count)')
+		sub.add_argument('-p', '--password', help='password (or set STEGANO_PASSWORD; prompted for if neither)')
+
+	embed = commands.add_parser('embed', help='hide a secret in each cover')
+	common(embed, 'cover files, globs or directories')
+	pooled(embed)
+	secret = embed.add_mutually_exclusive_group(required=True)
+	secret.add_argument('-s', '--secret', help='file to hide')
+	secret.add_argument('-t', '--text', help='text to hide')
+	embed.add_argument('--public-key', help='RSA public key (PEM) for hybrid encryption instead of a password')
+	embed.add_argument('--depth', type=int, default=1, help='low bits per sample: 1-4 for images and video, 1-8 for audio')
+	embed.add_argument('--scatter', action='store_true', help='spread the bits over keyed positions across the cover')
+	embed.add_argument('--image-format', choices=list(OUTPUT_FORMATS), default='png', help='lossless encoding of image output')
+	embed.add_argument('--compress-level', type=int, help='PNG zlib level, 0-9')
+	embed.add_argument('--compression', default='auto', choices=['auto'] + list(CODEC_NAMES.values()), help='secret compression')
+	embed.add_argument(
+		'--video-mode', default='reencode', choices=['reencode', 'remux', 'auto'],
+		help='video output: reencode to AVI (default), remux into MKV keeping the cover tracks (needs ffmpeg), or remux if ffmpeg is found',
+	)
+	embed.set_defaults(func=cmd_embed)
+
+	extract = commands.add_parser('extract', help='recover the secret from each stego file')
+	common(extract, 'stego files, globs or directories')
+	pooled(extract)
+	extract.add_argument('--private-key', help='RSA private key (PEM) for RSA-encrypted payloads')
+	extract.set_defaults(func=cmd_extract)
+
+	capacity = commands.add_parser('capacity', help="report each cover's capacity from its headers")
+	common(capacity, 'cover files, globs or directories')
+	capacity.add_argument('--public-key', help='size the container for RSA with this public key (PEM)')
+	size = capacity.add_mutually_exclusive_group()
+	size.add_argument('-s', '--secret', help='say whether this file fits')
+	size.add_argument('--secret-size', type=int, help='say whether a secret of this many bytes fits')
+	capacity.add_argument('--depth', type=int, default=1, help='low bits per sample')
+	capacity.add_argument('--scatter', action='store_true', help='size for keyed placement')
+	capacity.add_argument('--json', action='store_true', help='one JSON object per cover')
+	capacity.set_defaults(func=cmd_capacity)
+
+	bench = commands.add_parser(
+		'bench', help='run the benchmark suite', add_help=False,
+		description='Every argument goes to benchmarks/bench_suite.py, e.g. --quick --filter image.',
+	)
+	bench.set_defaults(func=cmd_bench)
+	return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+	parser = build_parser()
+	# bench hands everything after it to the suite's own parser
+	args, extra = parser.parse_known_args(argv)
+	if args.command == 'bench':
+		args.args = extra
+	elif extra:
+		parser.error(f'unrecognized arguments: {" ".join(extra)}')
+	if getattr(args, 'jobs', 1) < 1:
+		parser.error('--jobs must be at least 1')
+	try:
+		return 1 if args.func(args) else 0
+	except (ValueError, OSError) as e:
+		print(f'error: {e}', file=sys.stderr)
+		return 2
+	except KeyboardInterrupt:
+		return 130
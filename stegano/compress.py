@@ -0,0 +1,159 @@
+import lzma
+import os
+import tempfile
+import zlib
+from typing import BinaryIO, Iterable, Iterator, Optional, Tuple
+
+from .streams import IterReader
+
+try:
+	import zstandard
+except ImportError:  # optional: pip install zstandard
+	zstandard = None
+
+# Codec ids as stored in the container header
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_LZMA = 2
+CODEC_ZSTD = 3
+CODEC_NAMES = {CODEC_NONE: 'none', CODEC_ZLIB: 'zlib', CODEC_LZMA: 'lzma', CODEC_ZSTD: 'zstd'}
+
+# Auto selection compresses a sample with every available codec and keeps the
+# fastest one within SELECT_SLACK of the smallest result (zstd, zlib, then lzma).
+SAMPLE_SIZE = 256 * 1024
+SELECT_SLACK = 0.02
+MIN_SAVING = 0.05
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+_READ_CHUNK = 64 * 1024
+
+# Most a payload may decompress to, so a tiny compressed bomb can't fill the disk or a
+# response: the app's upload limit by default, the largest secret it can have embedded
+MAX_DECOMPRESSED = int(os.environ.get('STEGANO_MAX_SECRET_BYTES', str(2 * 1024 ** 3)))
+
+
+def available_codecs() -> Tuple[int, ...]:
+	codecs = (CODEC_ZLIB, CODEC_LZMA)
+	return ((CODEC_ZSTD,) + codecs) if zstandard is not None else codecs
+
+
+def codec_id(name: str) -> int:
+	for cid, cname in CODEC_NAMES.items():
+		if cname == name:
+			if cid == CODEC_ZSTD and zstandard is None:
+				raise ValueError('zstd compression requires the zstandard package')
+			return cid
+	raise ValueError(f'Unknown compression codec: {name}')
+
+
+def _compressor(codec: int):
+	if codec == CODEC_ZLIB:
+		return zlib.compressobj(6)
+	if codec == CODEC_LZMA:
+		return lzma.LZMACompressor(preset=6)
+	if codec == CODEC_ZSTD:
+		return zstandard.ZstdCompressor(level=6).compressobj()
+	raise ValueError(f'Unknown compression codec id {codec}')
+
+
+def _decompressed_pieces(chunks: Iterable[bytes], codec: int) -> Iterator[bytes]:
+	"""Decompress ``chunks`` in pieces of at most _READ_CHUNK bytes, however well they compress."""
+	if codec == CODEC_ZLIB:
+		decomp = zlib.decompressobj()
+		for chunk in chunks:
+			while chunk:
+				data = decomp.decompress(chunk, _READ_CHUNK)
+				chunk = decomp.unconsumed_tail
+				if data:
+					yield data
+		tail = decomp.flush()
+		if tail:
+			yield tail
+	elif codec == CODEC_LZMA:
+		decomp = lzma.LZMADecompressor()
+		for chunk in chunks:
+			data = decomp.decompress(chunk, _READ_CHUNK)
+			while True:
+				if data:
+					yield data
+				if decomp.eof or decomp.needs_input:
+					break
+				data = decomp.decompress(b'', _READ_CHUNK)
+	elif codec == CODEC_ZSTD:
+		if zstandard is None:
+			raise ValueError('This payload is zstd-compressed; install the zstandard package to extract it')
+		yield from zstandard.ZstdDecompressor().read_to_iter(IterReader(chunks), write_size=_READ_CHUNK)
+	else:
+		raise ValueError(f'Unknown compression codec id {codec}')
+
+
+def _compress_all(codec: int, data: bytes) -> bytes:
+	comp = _compressor(codec)
+	return comp.compress(data) + comp.flush()
+
+
+def choose_codec(sample: bytes) -> int:
+	"""Pick a codec for data that starts with ``sample``, or CODEC_NONE if it won't shrink."""
+	if not sample:
+		return CODEC_NONE
+	sizes = [(codec, len(_compress_all(codec, sample))) for codec in available_codecs()]
+	best = min(size for _, size in sizes)
+	if best > len(sample) * (1 - MIN_SAVING):
+		return CODEC_NONE
+	return next(codec for codec, size in sizes if size <= best * (1 + SELECT_SLACK))
+
+
+def compress_stream(
+	src: BinaryIO,
+	size: int,
+	codec: str = 'auto',
+	spool_dir: Optional[str] = None,
+) -> Tuple[int, BinaryIO, int]:
+	"""Compress ``size`` bytes of ``src`` ahead of encryption.
+
+	Returns ``(codec_id, reader, reader_size)``. The compressed copy is spooled to disk
+	above SPOOL_MAX_SIZE. If compression is off or doesn't shrink the data, the original
+	(rewound) ``src`` is returned with CODEC_NONE.
+	"""
+	start = src.tell()
+	if codec == 'auto':
+		cid = choose_codec(src.read(min(size, SAMPLE_SIZE)))
+		src.seek(start)
+	else:
+		cid = codec_id(codec)
+	if cid == CODEC_NONE:
+		return CODEC_NONE, src, size
+
+	out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, dir=spool_dir)
+	comp = _compressor(cid)
+	remaining = size
+	while remaining:
+		chunk = src.read(min(_READ_CHUNK, remaining))
+		if not chunk:
+			break
+		remaining -= len(chunk)
+		out.write(comp.compress(chunk))
+	out.write(comp.flush())
+	compressed_size = out.tell()
+	if compressed_size >= size:
+		out.close()
+		src.seek(start)
+		return CODEC_NONE, src, size
+	out.seek(0)
+	return cid, out, compressed_size
+
+
+def decompress_stream(chunks: Iterable[bytes], codec: int, max_size: Optional[int] = None) -> Iterator[bytes]:
+	"""Incrementally decompress an iterator of chunks.
+
+	Raises ValueError once the output passes ``max_size`` bytes (default MAX_DECOMPRESSED).
+	"""
+	if codec == CODEC_NONE:
+		yield from chunks
+		return
+	limit = MAX_DECOMPRESSED if max_size is None else max_size
+	total = 0
+	for data in _decompressed_pieces(chunks, codec):
+		total += len(data)
+		if total > limit:
+			raise ValueError(f'Secret decompresses to more than {limit} bytes')
+		yield data
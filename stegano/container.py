@@ -0,0 +1,227 @@
+import io
+import json
+import os
+import struct
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional
+
+from .compress import CODEC_NAMES, CODEC_NONE
+from .crypto import (
+	STREAM_CHUNK,
+	STREAM_PREFIX_LEN,
+	StreamEncryptor,
+	decrypt_segments,
+	decrypt_stream,
+	decrypt_with_aes,
+	decrypt_with_rsa_private_key,
+	new_rsa_key,
+	new_salt,
+	password_cipher,
+	password_key,
+	rsa_cipher,
+)
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+# v2 binary container, all integers big-endian:
+#
+#   magic 'SGC2' | version u8 | scheme u8 | kind u8 | codec u8 | chunk u32 | ts u32
+#   | name_len u16 | salt_len u8 | prefix_len u8 | key_len u16
+#   | filename | salt | nonce prefix | RSA-wrapped key | sealed segments ...
+#
+# Every variable field is length-prefixed in the fixed part, so the whole header is
+# read with two reads and parsed with struct.unpack_from over a memoryview.
+# v1 containers (JSON head + b'\n\n' + JSON-framed ciphertext) are still readable.
+MAGIC = b'SGC2'
+VERSION = 2
+_FIXED = struct.Struct('>4sBBBBIIHBBH')
+
+SCHEME_AES = 1
+SCHEME_RSA = 2
+SCHEMES = {SCHEME_AES: 'aes-gcm-stream', SCHEME_RSA: 'rsa-hybrid-stream'}
+KINDS = {0: 'file', 1: 'text'}
+
+NO_PAYLOAD = 'No embedded payload found in the provided file. Make sure you uploaded a stego file generated by this app.'
+
+
+class ContainerError(ValueError):
+	pass
+
+
+@dataclass
+class ContainerHeader:
+	version: int
+	scheme: str
+	kind: str
+	filename: str
+	codec: int = CODEC_NONE
+	ts: int = 0
+	chunk_size: int = STREAM_CHUNK
+	salt: bytes = b''
+	nonce_prefix: bytes = b''
+	enc_key: bytes = b''
+	header_len: int = 0
+
+	@property
+	def is_rsa(self) -> bool:
+		return self.scheme.startswith('rsa')
+
+
+@dataclass
+class SealKey:
+	"""Key material that can seal many containers after a single KDF run or RSA wrap.
+
+	Each container still draws its own random nonce prefix, so sharing a key across a
+	batch keeps nonces unique. Plain bytes, so it pickles into worker processes.
+	"""
+	scheme: int
+	key: bytes
+	salt: bytes = b''
+	enc_key: bytes = b''
+
+
+def seal_key(password: Optional[str] = None, public_pem: Optional[str] = None) -> SealKey:
+	if public_pem:
+		key, enc_key = new_rsa_key(public_pem)
+		return SealKey(SCHEME_RSA, key, enc_key=enc_key)
+	if password:
+		salt = new_salt(password)
+		return SealKey(SCHEME_AES, password_key(password, salt), salt=salt)
+	raise ValueError('A password or an RSA public key is required')
+
+
+def header_size(scheme: int, filename: str, enc_key_len: int = 0) -> int:
+	"""Size of a v2 header; ``enc_key_len`` is the RSA modulus size in bytes for SCHEME_RSA."""
+	salt = 16 if scheme == SCHEME_AES else 0
+	key = enc_key_len if scheme == SCHEME_RSA else 0
+	return _FIXED.size + len(filename.encode('utf-8')[:0xFFFF]) + salt + STREAM_PREFIX_LEN + key
+
+
+def _pack_header(scheme: int, kind: str, filename: str, codec: int, chunk_size: int, salt: bytes, prefix: bytes, enc_key: bytes) -> bytes:
+	name = filename.encode('utf-8')[:0xFFFF]
+	kind_id = {v: k for k, v in KINDS.items()}[kind]
+	fixed = _FIXED.pack(
+		MAGIC, VERSION, scheme, kind_id, codec, chunk_size, int(time.time()) & 0xFFFFFFFF,
+		len(name), len(salt), len(prefix), len(enc_key),
+	)
+	return fixed + name + salt + prefix + enc_key
+
+
+def seal(
+	src: BinaryIO,
+	size: int,
+	filename: str,
+	kind: str = 'file',
+	password: Optional[str] = None,
+	public_pem: Optional[str] = None,
+	codec: int = CODEC_NONE,
+	chunk_size: int = STREAM_CHUNK,
+	key: Optional[SealKey] = None,
+) -> StreamEncryptor:
+	"""Encrypt ``size`` bytes of ``src`` into a v2 container, read lazily by the embedder.
+
+	``codec`` records how ``src`` was compressed (see ``stegano.compress``). Pass a
+	``key`` from ``seal_key`` to reuse one derivation across containers.
+	"""
+	if key is None:
+		key = seal_key(password, public_pem)
+	prefix = os.urandom(STREAM_PREFIX_LEN)
+	header = _pack_header(key.scheme, kind, filename, codec, chunk_size, key.salt, prefix, key.enc_key)
+	return StreamEncryptor(src, size, AESGCM(key.key), prefix, header, chunk_size)
+
+
+def parse_header(buf) -> ContainerHeader:
+	"""Parse a v2 header from the start of a bytes-like buffer without copying the body."""
+	view = memoryview(buf)
+	if len(view) < _FIXED.size:
+		raise ContainerError(NO_PAYLOAD)
+	magic, version, scheme, kind, codec, chunk, ts, name_len, salt_len, prefix_len, key_len = _FIXED.unpack_from(view)
+	if magic != MAGIC or scheme not in SCHEMES or kind not in KINDS or codec not in CODEC_NAMES:
+		raise ContainerError(NO_PAYLOAD)
+	if version != VERSION:
+		raise ContainerError(f'Unsupported container version {version}')
+	end = _FIXED.size + name_len + salt_len + prefix_len + key_len
+	if len(view) < end:
+		raise ContainerError('Container header is truncated')
+	pos = _FIXED.size
+	fields = []
+	for n in (name_len, salt_len, prefix_len, key_len):
+		fields.append(view[pos:pos + n])
+		pos += n
+	name, salt, prefix, enc_key = fields
+	return ContainerHeader(
+		version=version,
+		scheme=SCHEMES[scheme],
+		kind=KINDS[kind],
+		filename=bytes(name).decode('utf-8', 'replace'),
+		codec=codec,
+		ts=ts,
+		chunk_size=chunk,
+		salt=bytes(salt),
+		nonce_prefix=bytes(prefix),
+		enc_key=bytes(enc_key),
+		header_len=end,
+	)
+
+
+def _parse_v1(src: BinaryIO) -> ContainerHeader:
+	head_raw, blank = src.readline(), src.readline()
+	try:
+		head = json.loads(head_raw.decode('utf-8'))
+	except ValueError:
+		head = None
+	if not isinstance(head, dict) or blank != b'\n':
+		raise ContainerError(NO_PAYLOAD)
+	meta = head.get('secret_meta', {})
+	return ContainerHeader(
+		version=1,
+		scheme=head.get('encryption', {}).get('scheme') or 'aes-gcm',
+		kind=meta.get('type', 'file'),
+		filename=meta.get('filename', 'secret.bin'),
+		header_len=len(head_raw) + len(blank),
+	)
+
+
+def read_header(src: BinaryIO) -> ContainerHeader:
+	"""Read the container header from seekable ``src`` and leave it positioned at the ciphertext."""
+	fixed = src.read(_FIXED.size)
+	if fixed[:4] != MAGIC:
+		src.seek(-len(fixed), io.SEEK_CUR)
+		return _parse_v1(src)
+	if len(fixed) < _FIXED.size:
+		raise ContainerError(NO_PAYLOAD)
+	lengths = _FIXED.unpack(fixed)[-4:]
+	rest = src.read(sum(lengths))
+	return parse_header(fixed + rest)
+
+
+def open_payload(
+	header: ContainerHeader,
+	src: BinaryIO,
+	password: Optional[str] = None,
+	private_pem: Optional[str] = None,
+) -> Iterator[bytes]:
+	"""Return an iterator of authenticated plaintext chunks for the ciphertext in ``src``.
+
+	The chunks are still compressed if ``header.codec`` says so; see ``decompress_stream``.
+	"""
+	if header.is_rsa and not private_pem:
+		raise ContainerError('RSA private key is required for RSA-encrypted payloads')
+	if not header.is_rsa and not password:
+		raise ContainerError('Password is required for AES decryption')
+
+	if header.version >= 2:
+		if header.is_rsa:
+			aesgcm = rsa_cipher(header.enc_key, private_pem)
+		else:
+			aesgcm = password_cipher(password, header.salt)
+		return decrypt_segments(src, aesgcm, header.nonce_prefix, header.chunk_size)
+
+	# v1: the encryption layer carries its own JSON header line
+	if header.scheme in ('aes-gcm-stream', 'rsa-hybrid-stream'):
+		return decrypt_stream(src, password=password, private_pem=private_pem)
+	blob = src.read()
+	if header.is_rsa:
+		return iter([decrypt_with_rsa_private_key(blob, private_pem)])
+	return iter([decrypt_with_aes(blob, password)])
+
@@ -1,19 +1,130 @@
+import io
 import os
 import json
-from dataclasses import dataclass
-from typing import Tuple
+import hmac
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO, Iterator, Optional, Tuple
 
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.backends import default_backend
 
+from .metrics import stage
+
 PBKDF2_ITERS = 200_000
 KEY_LEN = 32
 
 
-def _derive_key(password: str, salt: bytes) -> bytes:
+class KeyCache:
+	"""Bounded LRU cache of PBKDF2-derived keys with a TTL.
+
+	Entries are keyed by the salt and an HMAC fingerprint of the password (never the
+	password itself). Keys are held in bytearrays and overwritten with zeros when they
+	are evicted, expire or the cache is cleared.
+
+	Embedding draws a fresh salt, which would never hit; ``salt_for`` hands out the same
+	salt for a password until the TTL passes, so repeat embeds reuse the derived key too.
+	"""
+
+	def __init__(self, maxsize: int = 128, ttl: float = 300.0):
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self._entries: 'OrderedDict[Tuple[bytes, bytes], Tuple[float, bytearray]]' = OrderedDict()
+		self._salts: 'OrderedDict[bytes, Tuple[float, bytes]]' = OrderedDict()
+		self._lock = threading.Lock()
+		self._pepper = os.urandom(32)
+
+	def _fingerprint(self, password: str, salt: bytes) -> Tuple[bytes, bytes]:
+		return salt, hmac.new(self._pepper, password.encode('utf-8'), hashlib.sha256).digest()
+
+	@staticmethod
+	def _zeroize(key: bytearray) -> None:
+		for i in range(len(key)):
+			key[i] = 0
+
+	def get(self, password: str, salt: bytes) -> Optional[bytes]:
+		ident = self._fingerprint(password, salt)
+		with self._lock:
+			entry = self._entries.get(ident)
+			if entry is None:
+				return None
+			expires, key = entry
+			if expires < time.monotonic():
+				del self._entries[ident]
+				self._zeroize(key)
+				return None
+			self._entries.move_to_end(ident)
+			return bytes(key)
+
+	def put(self, password: str, salt: bytes, key: bytes) -> None:
+		ident = self._fingerprint(password, salt)
+		with self._lock:
+			old = self._entries.pop(ident, None)
+			if old is not None:
+				self._zeroize(old[1])
+			self._entries[ident] = (time.monotonic() + self.ttl, bytearray(key))
+			while len(self._entries) > self.maxsize:
+				_, (_, evicted) = self._entries.popitem(last=False)
+				self._zeroize(evicted)
+
+	def salt_for(self, password: str) -> bytes:
+		"""The salt to seal new containers with under ``password``; fresh once the last expired."""
+		_, ident = self._fingerprint(password, b'')
+		now = time.monotonic()
+		with self._lock:
+			entry = self._salts.pop(ident, None)
+			if entry is None or entry[0] < now:
+				entry = (now + self.ttl, os.urandom(16))
+			self._salts[ident] = entry
+			while len(self._salts) > self.maxsize:
+				self._salts.popitem(last=False)
+			return entry[1]
+
+	def clear(self) -> None:
+		with self._lock:
+			for _, key in self._entries.values():
+				self._zeroize(key)
+			self._entries.clear()
+			self._salts.clear()
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+
+_key_cache: Optional[KeyCache] = None
+
+
+def enable_key_cache(maxsize: int = 128, ttl: float = 300.0) -> KeyCache:
+	"""Opt in to caching derived keys in memory for this process."""
+	global _key_cache
+	disable_key_cache()
+	_key_cache = KeyCache(maxsize=maxsize, ttl=ttl)
+	return _key_cache
+
+
+def disable_key_cache() -> None:
+	global _key_cache
+	if _key_cache is not None:
+		_key_cache.clear()
+	_key_cache = None
+
+
+def configure_key_cache_from_env() -> Optional[KeyCache]:
+	"""Enable the cache from STEGANO_KEY_CACHE (max entries) and STEGANO_KEY_CACHE_TTL (seconds)."""
+	if not os.environ.get('STEGANO_KEY_CACHE'):
+		return None
+	return enable_key_cache(
+		maxsize=int(os.environ['STEGANO_KEY_CACHE']),
+		ttl=float(os.environ.get('STEGANO_KEY_CACHE_TTL', '300')),
+	)
+
+
+def _pbkdf2(password: str, salt: bytes) -> bytes:
 	kdf = PBKDF2HMAC(
 		algorithm=hashes.SHA256(),
 		length=KEY_LEN,
@@ -21,7 +132,23 @@ def _derive_key(password: str, salt: bytes) -> bytes:
 		iterations=PBKDF2_ITERS,
 		backend=default_backend(),
 	)
-	return kdf.derive(password.encode('utf-8'))
+	with stage('kdf'):
+		return kdf.derive(password.encode('utf-8'))
+
+
+def _derive_key(password: str, salt: bytes) -> bytes:
+	cache = _key_cache
+	if cache is None:
+		return _pbkdf2(password, salt)
+	key = cache.get(password, salt)
+	if key is None:
+		key = _pbkdf2(password, salt)
+		cache.put(password, salt, key)
+	return key
+
+
+def _aes_header(salt: bytes, nonce: bytes) -> bytes:
+	return json.dumps({'v': 1, 'alg': 'aes-gcm', 'salt': salt.hex(), 'nonce': nonce.hex()}).encode('utf-8') + b'\n'
 
 
 def encrypt_with_aes(plaintext: bytes, password: str) -> bytes:
@@ -30,12 +157,14 @@ def encrypt_with_aes(plaintext: bytes, password: str) -> bytes:
 	key = _derive_key(password, salt)
 	aesgcm = AESGCM(key)
 	ct = aesgcm.encrypt(nonce, plaintext, None)
-	return json.dumps({'v': 1, 'alg': 'aes-gcm', 'salt': salt.hex(), 'nonce': nonce.hex()}).encode('utf-8') + b'\n' + ct
+	return _aes_header(salt, nonce) + ct
 
 
 def decrypt_with_aes(blob: bytes, password: str) -> bytes:
 	head_line, ct = blob.split(b'\n', 1)
 	head = json.loads(head_line.decode('utf-8'))
+	if head.get('alg') == 'aes-gcm-stream':
+		return b''.join(decrypt_stream(io.BytesIO(blob), password=password))
 	salt = bytes.fromhex(head['salt'])
 	nonce = bytes.fromhex(head['nonce'])
 	key = _derive_key(password, salt)
@@ -46,15 +175,11 @@ def decrypt_with_aes(blob: bytes, password: str) -> bytes:
 # RSA hybrid: generate random AES key, encrypt data with AES-GCM, encrypt AES key with RSA OAEP
 
 def encrypt_with_rsa_public_key(plaintext: bytes, public_pem: str) -> bytes:
-	public_key = serialization.load_pem_public_key(public_pem.encode('utf-8'))
 	aes_key = os.urandom(KEY_LEN)
 	nonce = os.urandom(12)
 	aesgcm = AESGCM(aes_key)
 	ct = aesgcm.encrypt(nonce, plaintext, None)
-	enc_key = public_key.encrypt(
-		aes_key,
-		padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None),
-	)
+	enc_key = _rsa_wrap(aes_key, public_pem)
 	payload = {
 		'v': 1,
 		'alg': 'rsa-hybrid',
@@ -67,12 +192,241 @@ def encrypt_with_rsa_public_key(plaintext: bytes, public_pem: str) -> bytes:
 def decrypt_with_rsa_private_key(blob: bytes, private_pem: str) -> bytes:
 	head_line, ct = blob.split(b'\n', 1)
 	head = json.loads(head_line.decode('utf-8'))
-	private_key = serialization.load_pem_private_key(private_pem.encode('utf-8'), password=None)
-	enc_key = bytes.fromhex(head['enc_key'])
+	if head.get('alg') == 'rsa-hybrid-stream':
+		return b''.join(decrypt_stream(io.BytesIO(blob), private_pem=private_pem))
+	aes_key = _rsa_unwrap(bytes.fromhex(head['enc_key']), private_pem)
 	nonce = bytes.fromhex(head['nonce'])
-	aes_key = private_key.decrypt(
-		enc_key,
-		padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None),
-	)
 	aesgcm = AESGCM(aes_key)
 	return aesgcm.decrypt(nonce, ct, None)
+
+
+def _oaep():
+	return padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+
+
+def _rsa_wrap(aes_key: bytes, public_pem: str) -> bytes:
+	with stage('rsa'):
+		public_key = serialization.load_pem_public_key(public_pem.encode('utf-8'))
+		return public_key.encrypt(aes_key, _oaep())
+
+
+def _rsa_unwrap(enc_key: bytes, private_pem: str) -> bytes:
+	with stage('rsa'):
+		private_key = serialization.load_pem_private_key(private_pem.encode('utf-8'), password=None)
+		return private_key.decrypt(enc_key, _oaep())
+
+
+# Streaming AEAD in the style of STREAM (Hoang et al.): the plaintext is cut into
+# fixed-size segments, each sealed with AES-GCM under
+# nonce = prefix(7) || counter(4, big-endian) || last-segment flag(1).
+# Segments authenticate independently; reordering, truncation and extension are
+# caught by the counter and the final flag. Both directions hold one segment at a time.
+
+STREAM_CHUNK = 64 * 1024
+STREAM_PREFIX_LEN = 7
+TAG_LEN = 16
+
+
+def _stream_nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+	return prefix + counter.to_bytes(4, 'big') + (b'\x01' if last else b'\x00')
+
+
+def stream_ciphertext_len(size: int, chunk_size: int = STREAM_CHUNK) -> int:
+	"""Sealed length of ``size`` plaintext bytes, excluding the header line."""
+	segments = max(1, -(-size // chunk_size))
+	return size + segments * TAG_LEN
+
+
+def max_plaintext_len(ciphertext_len: int, chunk_size: int = STREAM_CHUNK) -> int:
+	"""Largest plaintext whose sealed length fits in ``ciphertext_len`` bytes, or -1 if none does."""
+	if ciphertext_len < TAG_LEN:
+		return -1
+	full, rest = divmod(ciphertext_len, chunk_size + TAG_LEN)
+	if full and rest <= TAG_LEN:
+		return full * chunk_size
+	return full * chunk_size + rest - TAG_LEN
+
+
+class StreamEncryptor(io.RawIOBase):
+	"""Readable file object that produces the header line followed by sealed segments.
+
+	``len()`` is known up front, so it can be handed straight to an embedder that
+	needs the payload length before it starts writing.
+	"""
+
+	def __init__(self, src: BinaryIO, size: int, aesgcm: AESGCM, prefix: bytes, header: bytes, chunk_size: int):
+		super().__init__()
+		self.length = len(header) + stream_ciphertext_len(size, chunk_size)
+		self._src = src
+		self._remaining = size
+		self._aesgcm = aesgcm
+		self._prefix = prefix
+		self._chunk_size = chunk_size
+		self._counter = 0
+		self._done = False
+		self._buf = memoryview(header)
+
+	def __len__(self) -> int:
+		return self.length
+
+	def readable(self) -> bool:
+		return True
+
+	def _next_segment(self) -> None:
+		want = min(self._chunk_size, self._remaining)
+		chunk = self._src.read(want) if want else b''
+		while len(chunk) < want:
+			more = self._src.read(want - len(chunk))
+			if not more:
+				raise ValueError('Secret stream ended before its declared size')
+			chunk += more
+		self._remaining -= want
+		last = self._remaining == 0
+		nonce = _stream_nonce(self._prefix, self._counter, last)
+		self._buf = memoryview(self._aesgcm.encrypt(nonce, chunk, None))
+		self._counter += 1
+		self._done = last
+
+	def readinto(self, b) -> int:
+		while not self._buf:
+			if self._done:
+				return 0
+			self._next_segment()
+		n = min(len(b), len(self._buf))
+		b[:n] = self._buf[:n]
+		self._buf = self._buf[n:]
+		return n
+
+
+def password_cipher(password: str, salt: bytes) -> AESGCM:
+	"""AES-GCM keyed from ``password`` (through the key cache when enabled)."""
+	return AESGCM(_derive_key(password, salt))
+
+
+def rsa_key_bytes(public_pem: str) -> int:
+	"""Length of an RSA-wrapped key under ``public_pem`` (the modulus size in bytes)."""
+	public_key = serialization.load_pem_public_key(public_pem.encode('utf-8'))
+	return (public_key.key_size + 7) // 8
+
+
+def new_salt(password: str) -> bytes:
+	"""Salt for sealing under ``password``: random, or reused within the key cache's TTL."""
+	cache = _key_cache
+	if cache is None:
+		return os.urandom(16)
+	return cache.salt_for(password)
+
+
+def password_key(password: str, salt: bytes) -> bytes:
+	"""Raw PBKDF2 key, for handing one derivation to several containers or processes."""
+	return _derive_key(password, salt)
+
+
+# The scatter key must be derivable before anything is read from the cover, so the
+# password KDF uses a fixed salt. It runs the full PBKDF2 iteration count: a cheaper
+# derivation would let the 16-bit header magic act as an offline password oracle.
+SCATTER_SALT = b'stegano-scatter1'
+
+
+def scatter_key(password: Optional[str] = None, public_pem: Optional[str] = None, private_pem: Optional[str] = None) -> bytes:
+	"""Seed for keyed sample placement (``stegano.scatter``), from a password or either half of an RSA key pair.
+
+	RSA mode hashes the public key so the embedder (public key) and the extractor
+	(private key) agree; placement is then hidden only from those without the public key.
+	"""
+	if private_pem:
+		public = serialization.load_pem_private_key(private_pem.encode('utf-8'), password=None).public_key()
+	elif public_pem:
+		public = serialization.load_pem_public_key(public_pem.encode('utf-8'))
+	elif password:
+		return password_key(password, SCATTER_SALT)
+	else:
+		raise ValueError('A password or an RSA key is required for scatter mode')
+	der = public.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+	return hashlib.sha256(b'stegano-scatter' + der).digest()
+
+
+def new_rsa_key(public_pem: str) -> Tuple[bytes, bytes]:
+	"""Fresh AES key for RSA hybrid mode. Returns ``(aes_key, rsa_wrapped_key)``."""
+	aes_key = os.urandom(KEY_LEN)
+	return aes_key, _rsa_wrap(aes_key, public_pem)
+
+
+def new_rsa_cipher(public_pem: str) -> Tuple[AESGCM, bytes]:
+	"""Fresh AES-GCM key for RSA hybrid mode. Returns ``(cipher, rsa_wrapped_key)``."""
+	aes_key, enc_key = new_rsa_key(public_pem)
+	return AESGCM(aes_key), enc_key
+
+
+def rsa_cipher(enc_key: bytes, private_pem: str) -> AESGCM:
+	return AESGCM(_rsa_unwrap(enc_key, private_pem))
+
+
+def encrypt_stream_aes(src: BinaryIO, size: int, password: str, chunk_size: int = STREAM_CHUNK) -> StreamEncryptor:
+	salt = os.urandom(16)
+	prefix = os.urandom(STREAM_PREFIX_LEN)
+	aesgcm = password_cipher(password, salt)
+	head = {'v': 2, 'alg': 'aes-gcm-stream', 'salt': salt.hex(), 'nonce_prefix': prefix.hex(), 'chunk': chunk_size}
+	return StreamEncryptor(src, size, aesgcm, prefix, json.dumps(head).encode('utf-8') + b'\n', chunk_size)
+
+
+def encrypt_stream_rsa(src: BinaryIO, size: int, public_pem: str, chunk_size: int = STREAM_CHUNK) -> StreamEncryptor:
+	aesgcm, enc_key = new_rsa_cipher(public_pem)
+	prefix = os.urandom(STREAM_PREFIX_LEN)
+	head = {
+		'v': 2,
+		'alg': 'rsa-hybrid-stream',
+		'nonce_prefix': prefix.hex(),
+		'enc_key': enc_key.hex(),
+		'chunk': chunk_size,
+	}
+	return StreamEncryptor(src, size, aesgcm, prefix, json.dumps(head).encode('utf-8') + b'\n', chunk_size)
+
+
+def decrypt_stream(src: BinaryIO, password: Optional[str] = None, private_pem: Optional[str] = None) -> Iterator[bytes]:
+	"""Yield plaintext segments from a stream produced by ``encrypt_stream_*``."""
+	head = json.loads(src.readline().decode('utf-8'))
+	alg = head.get('alg')
+	if alg == 'aes-gcm-stream':
+		if password is None:
+			raise ValueError('Password is required for AES decryption')
+		aesgcm = password_cipher(password, bytes.fromhex(head['salt']))
+	elif alg == 'rsa-hybrid-stream':
+		if private_pem is None:
+			raise ValueError('RSA private key is required for RSA-encrypted payloads')
+		aesgcm = rsa_cipher(bytes.fromhex(head['enc_key']), private_pem)
+	else:
+		raise ValueError(f'Not a streaming ciphertext: {alg}')
+	return decrypt_segments(src, aesgcm, bytes.fromhex(head['nonce_prefix']), int(head['chunk']))
+
+
+def _read_full(src: BinaryIO, n: int) -> bytes:
+	data = src.read(n)
+	while data and len(data) < n:
+		more = src.read(n - len(data))
+		if not more:
+			break
+		data += more
+	return data
+
+
+def decrypt_segments(src: BinaryIO, aesgcm: AESGCM, prefix: bytes, chunk_size: int) -> Iterator[bytes]:
+	"""Yield authenticated plaintext segments sealed under ``prefix`` by a ``StreamEncryptor``.
+
+	A truncated or extended stream raises ``InvalidTag`` (or ``ValueError``) instead of
+	returning a silently short plaintext.
+	"""
+	segment_len = chunk_size + TAG_LEN
+	counter = 0
+	segment = _read_full(src, segment_len)
+	while True:
+		# One segment of lookahead tells us whether the current one must carry the final flag
+		following = _read_full(src, segment_len) if len(segment) == segment_len else b''
+		last = not following
+		if len(segment) < TAG_LEN:
+			raise ValueError('Encrypted stream is truncated')
+		yield aesgcm.decrypt(_stream_nonce(prefix, counter, last), segment, None)
+		if last:
+			return
+		segment = following
+		counter += 1
@@ -1,76 +1,176 @@
-from typing import Tuple
 from PIL import Image
 import io
+from typing import BinaryIO, Dict, Iterator, Optional
+import numpy as np
 
+from .lsb import capacity_bytes, check_depth, header_samples, read_header, read_lsb, samples_needed, write_header, write_lsb
+from .media import output_options
+from .metrics import stage
+from .scatter import Scatter, read_scattered, read_scattered_header, write_scattered
+from .streams import Sink, Source, iter_writes, open_sink, open_source
 
-def _bytes_to_bits(data: bytes):
-	for byte in data:
-		for i in range(8):
-			yield (byte >> (7 - i)) & 1
-
-
-def _bits_to_bytes(bits):
-	b = 0
-	count = 0
-	for bit in bits:
-		b = (b << 1) | bit
-		count += 1
-		if count == 8:
-			yield b
-			b = 0
-			count = 0
-
-
-def embed_in_image(image_path: str, payload: bytes) -> bytes:
-	img = Image.open(image_path).convert('RGB')
-	pixels = list(img.getdata())
-	width, height = img.size
-	capacity_bits = width * height * 3
-	payload_len = len(payload)
-	head = payload_len.to_bytes(4, 'big')
-	data = head + payload
-	needed_bits = len(data) * 8
-	if needed_bits > capacity_bits:
+# Bits per channel value; beyond 4 the noise becomes visible in flat regions
+MAX_DEPTH = 4
+
+# Pillow writers that seek back to patch offsets; they cannot encode into a pipe
+SEEKING_FORMATS = {'TIFF'}
+# Encoded whole before sending when streamed, so the length is known up front: the
+# seeking formats are buffered anyway, and BMP is uncompressed (nothing to overlap)
+BUFFERED_FORMATS = SEEKING_FORMATS | {'BMP'}
+
+
+def _load_rgb(image: Source) -> np.ndarray:
+	with open_source(image) as f:
+		img = Image.open(f).convert('RGB')
+	return np.asarray(img)
+
+
+def _load_rgb_rows(image: Source, rows: int) -> np.ndarray:
+	"""Decode only the first ``rows`` rows of the image when the format allows it.
+
+	Non-interlaced PNGs are decoded top to bottom, so shrinking the tile stops
+	zlib after the requested rows. Other formats fall back to a full decode.
+	"""
+	with open_source(image) as f:
+		img = Image.open(f)
+		width, height = img.size
+		if rows < height and img.format == 'PNG' and len(img.tile) == 1 and not img.info.get('interlace'):
+			try:
+				return _decode_top_rows(img, rows)
+			except Exception:
+				# Pillow has no public partial decode; if its internals change, decode it all
+				f.seek(0)
+				img = Image.open(f)
+		return np.asarray(img.convert('RGB'))[:rows]
+
+
+def _decode_top_rows(img: Image.Image, rows: int) -> np.ndarray:
+	# Shrinks the image's private size and tile before loading; checked since neither is public API
+	width = img.size[0]
+	decoder, _, offset, args = img.tile[0][:4]
+	img._size = (width, rows)
+	img.tile = [(decoder, (0, 0, width, rows), offset, args)]
+	pixels = np.asarray(img.convert('RGB'))
+	if pixels.shape[:2] != (rows, width):
+		raise ValueError(f'Partial decode returned {pixels.shape[:2]}, expected {(rows, width)}')
+	return pixels
+
+
+def _rows_for_samples(n_samples: int, width: int) -> int:
+	return -(-n_samples // (width * 3))
+
+
+def image_capacity(image: Source, depth: int = 1, keyed: bool = False) -> Dict[str, object]:
+	"""Payload capacity from the image header alone; no pixels are decoded."""
+	check_depth(depth, MAX_DEPTH)
+	with open_source(image) as f, Image.open(f) as img:
+		width, height = img.size
+		mode, fmt = img.mode, img.format
+	# Every mode is embedded after conversion to RGB, so capacity is 3 values per pixel
+	samples = width * height * 3
+	return {
+		'media': 'image', 'format': fmt, 'mode': mode, 'width': width, 'height': height, 'depth': depth,
+		'capacity_bits': samples * depth, 'capacity_bytes': capacity_bytes(samples, depth, keyed),
+	}
+
+
+def _stego_image(image: Source, payload: bytes, depth: int, key: Optional[bytes]) -> Image.Image:
+	check_depth(depth, MAX_DEPTH)
+	with stage('decode', kind='image'):
+		pixels = np.array(_load_rgb(image))
+	flat = pixels.reshape(-1)
+	if samples_needed(len(payload), depth, key is not None) > flat.size:
 		raise ValueError('Payload too large for image capacity')
 
-	bits_iter = _bytes_to_bits(data)
-	new_pixels = []
-	for r, g, b in pixels:
-		try:
-			r = (r & 0xFE) | next(bits_iter)
-			g = (g & 0xFE) | next(bits_iter)
-			b = (b & 0xFE) | next(bits_iter)
-		except StopIteration:
-			new_pixels.append((r, g, b))
-			break
-		new_pixels.append((r, g, b))
-
-	# Fill remaining pixels unchanged
-	if len(new_pixels) < len(pixels):
-		new_pixels.extend(pixels[len(new_pixels):])
-
-	out = Image.new('RGB', (width, height))
-	out.putdata(new_pixels)
-	buf = io.BytesIO()
-	out.save(buf, format='PNG')
-	return buf.getvalue()
-
-
-def extract_from_image(image_path: str) -> bytes:
-	img = Image.open(image_path).convert('RGB')
-	pixels = list(img.getdata())
-	bits = []
-	for r, g, b in pixels:
-		bits.extend([r & 1, g & 1, b & 1])
-
-	# First 32 bits is length
-	length_bits = bits[:32]
-	length = 0
-	for bit in length_bits:
-		length = (length << 1) | bit
-
-	payload_bits = bits[32:32 + length * 8]
-	payload = bytes(_bits_to_bytes(payload_bits))
+	with stage('lsb', kind='image'):
+		if key is not None:
+			write_scattered(flat, payload, Scatter(key, flat.size), depth)
+		else:
+			offset = write_header(flat, len(payload), depth)
+			write_lsb(flat, payload, offset, depth)
+	return Image.fromarray(pixels, 'RGB')
+
+
+def embed_in_image(
+	image: Source,
+	payload: bytes,
+	output: Optional[Sink] = None,
+	depth: int = 1,
+	key: Optional[bytes] = None,
+	image_format: str = 'png',
+	compress_level: Optional[int] = None,
+) -> Optional[bytes]:
+	"""Return PNG bytes of ``image`` (a path, buffer or file object) carrying ``payload``.
+
+	``depth`` low bits of each channel value are used (1-4); extraction reads it from
+	the header. With ``key`` (see ``scatter_key``) the bits go to keyed pseudo-random
+	positions across the whole image instead of the leading pixels. ``image_format``
+	picks another lossless encoding from ``OUTPUT_FORMATS`` and ``compress_level`` the
+	PNG zlib level. With ``output`` (a path or writable file) the image is encoded
+	straight into it instead and nothing is returned.
+	"""
+	fmt, _, options = output_options(image_format, compress_level)
+	out = _stego_image(image, payload, depth, key)
+	with stage('encode', kind='image'):
+		if output is not None:
+			with open_sink(output) as f:
+				out.save(f, format=fmt, **options)
+			return None
+		buf = io.BytesIO()
+		out.save(buf, format=fmt, **options)
+		return buf.getvalue()
+
+
+def iter_embed_image(
+	image: Source,
+	payload: bytes,
+	depth: int = 1,
+	key: Optional[bytes] = None,
+	image_format: str = 'png',
+	compress_level: Optional[int] = None,
+) -> Iterator[bytes]:
+	"""Embed now, then yield the encoded image in pieces while a worker thread encodes it.
+
+	Errors such as an oversized payload are raised by this call, before any chunk;
+	the consumer (e.g. an HTTP response) sends each piece while the next is compressed.
+	"""
+	fmt, _, options = output_options(image_format, compress_level)
+	out = _stego_image(image, payload, depth, key)
+
+	def encode(f: BinaryIO) -> None:
+		with stage('encode', kind='image'):
+			if fmt in SEEKING_FORMATS:
+				buf = io.BytesIO()
+				out.save(buf, format=fmt, **options)
+				f.write(buf.getbuffer())
+			else:
+				out.save(f, format=fmt, **options)
+
+	return iter_writes(encode)
+
+
+def extract_from_image(image: Source, key: Optional[bytes] = None) -> bytes:
+	"""Read the payload; with ``key``, keyed placement is tried before the sequential layout."""
+	if key is not None:
+		flat = _load_rgb(image).reshape(-1)
+		scatter = Scatter(key, flat.size) if flat.size >= header_samples(1, keyed=True) else None
+		header = read_scattered_header(flat, scatter) if scatter else None
+		if header is not None:
+			length, depth = header
+			if samples_needed(length, depth, keyed=True) > flat.size:
+				raise ValueError('Corrupted or incomplete payload in image')
+			return read_scattered(flat, scatter, length, depth)
+
+	with open_source(image) as f, Image.open(f) as img:
+		width, height = img.size
+
+	# The header (length and bit depth) comes first; decode just enough rows for it, then for the payload
+	flat = _load_rgb_rows(image, min(_rows_for_samples(header_samples(2), width), height)).reshape(-1)
+	length, depth, offset = read_header(flat)
+	needed_rows = _rows_for_samples(samples_needed(length, depth), width)
+	if needed_rows > flat.size // (width * 3):
+		flat = _load_rgb_rows(image, min(needed_rows, height)).reshape(-1)
+	payload = read_lsb(flat, length, offset, depth)
 	if len(payload) != length:
 		raise ValueError('Corrupted or incomplete payload in image')
 	return payload
@@ -0,0 +1,316 @@
+import multiprocessing
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+from .crypto import configure_key_cache_from_env
+from .metrics import inc, observe
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Finished jobs are forgotten after this many seconds
+JOB_TTL = 3600.0
+
+# Set in each worker process by _init_worker; carries (job_id, stage, fraction) back to the parent
+_progress_queue = None
+
+
+class QueueFull(Exception):
+	pass
+
+
+def _init_worker(progress_queue) -> None:
+	global _progress_queue
+	_progress_queue = progress_queue
+	configure_key_cache_from_env()
+
+
+def _run(job_id: str, fn: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+	def progress(stage: str, fraction: float) -> None:
+		if _progress_queue is not None:
+			_progress_queue.put((job_id, stage, fraction))
+	return fn(progress=progress, **kwargs)
+
+
+class Job:
+	def __init__(self, job_id: str, kind: str, fn: Callable[..., Any], kwargs: Dict[str, Any], label: Optional[str] = None):
+		self.id = job_id
+		self.kind = kind
+		# Dropped once the job is handed to a worker: the arguments can hold passwords and keys
+		self.fn: Optional[Callable[..., Any]] = fn
+		self.kwargs: Optional[Dict[str, Any]] = kwargs
+		self.label = label
+		self.status = QUEUED
+		self.stage = QUEUED
+		self.progress = 0.0
+		self.result: Any = None
+		self.error: Optional[str] = None
+		self.created = time.time()
+		self.started: Optional[float] = None
+		self.finished: Optional[float] = None
+		self._callbacks: List[Callable[['Job'], None]] = []
+		self._callbacks_lock = threading.Lock()
+
+	def add_done_callback(self, fn: Callable[['Job'], None]) -> None:
+		"""Call ``fn(job)`` once the job has finished, or now if it already has."""
+		with self._callbacks_lock:
+			if self.finished is None:
+				self._callbacks.append(fn)
+				return
+		fn(self)
+
+	def _run_callbacks(self) -> None:
+		# After ``finished`` is set, so no callback can be added and missed
+		with self._callbacks_lock:
+			callbacks, self._callbacks = self._callbacks, []
+		for fn in callbacks:
+			fn(self)
+
+	def to_dict(self) -> Dict[str, Any]:
+		info = {
+			'job_id': self.id,
+			'kind': self.kind,
+			'status': self.status,
+			'stage': self.stage,
+			'progress': round(self.progress, 3),
+			'created': self.created,
+			'started': self.started,
+			'finished': self.finished,
+		}
+		if self.error:
+			info['error'] = self.error
+		return info
+
+
+class JobManager:
+	"""Run embed/extract jobs on a process pool with per-kind concurrency limits.
+
+	Jobs wait in a per-kind FIFO until a slot of their kind is free; once ``max_queued``
+	jobs are waiting in total, ``submit`` raises QueueFull.
+	"""
+
+	def __init__(
+		self,
+		max_workers: Optional[int] = None,
+		limits: Optional[Dict[str, int]] = None,
+		max_queued: int = 64,
+		mp_context: str = 'spawn',
+	):
+		self.max_workers = max_workers or os.cpu_count() or 1
+		self.limits = dict(limits or {})
+		self.max_queued = max_queued
+		self._ctx = multiprocessing.get_context(mp_context)
+		self._pool: Optional[ProcessPoolExecutor] = None
+		self._progress = None
+		self._drain: Optional[threading.Thread] = None
+		self._lock = threading.Lock()
+		self._changed = threading.Condition(self._lock)
+		self._jobs: Dict[str, Job] = {}
+		self._pending: Dict[str, Deque[Job]] = {}
+		self._running: Dict[str, int] = {}
+		self._closed = False
+
+	def _ensure_pool(self) -> ProcessPoolExecutor:
+		# Created on first use so importing the app (and forked servers) doesn't spawn workers
+		if self._pool is None:
+			# A new queue per pool: a worker killed while writing can leave the old one's lock held
+			self._progress = self._ctx.Queue()
+			self._pool = ProcessPoolExecutor(
+				max_workers=self.max_workers,
+				mp_context=self._ctx,
+				initializer=_init_worker,
+				initargs=(self._progress,),
+			)
+			if self._drain is None:
+				self._drain = threading.Thread(target=self._drain_progress, name='stegano-job-progress', daemon=True)
+				self._drain.start()
+		return self._pool
+
+	def _drain_progress(self) -> None:
+		# One thread for the manager's lifetime; it moves on to the queue of a replacement pool
+		while not self._closed:
+			try:
+				item = self._progress.get(timeout=0.5)
+			except queue.Empty:
+				continue
+			except (EOFError, OSError, ValueError):
+				return
+			if item is None:
+				return
+			job_id, stage, fraction = item
+			job = self._jobs.get(job_id)
+			if job is not None and job.status == RUNNING:
+				job.stage = stage
+				job.progress = fraction
+
+	def _limit(self, kind: str) -> int:
+		return self.limits.get(kind, self.max_workers)
+
+	def queued(self) -> int:
+		return sum(len(q) for q in self._pending.values())
+
+	def submit(self, kind: str, fn: Callable[..., Any], **kwargs) -> Job:
+		"""Queue ``fn(progress=..., **kwargs)``; ``fn`` and its arguments must be picklable."""
+		with self._lock:
+			if self._closed:
+				raise RuntimeError('Job manager is shut down')
+			self._expire()
+			if self.queued() >= self.max_queued:
+				raise QueueFull(f'Job queue is full ({self.max_queued} waiting)')
+			job = Job(secrets.token_hex(8), kind, fn, kwargs)
+			self._jobs[job.id] = job
+			self._pending.setdefault(kind, deque()).append(job)
+			self._dispatch(kind)
+		return job
+
+	def submit_many(
+		self,
+		kind: str,
+		fn: Callable[..., Any],
+		kwargs_list: Iterable[Dict[str, Any]],
+		labels: Optional[Iterable[str]] = None,
+	) -> List[Job]:
+		"""Queue a batch as one admission: accepted whole if the queue has room, else QueueFull.
+
+		``labels`` (e.g. the cover names) are kept on the jobs after their arguments are dropped.
+		"""
+		with self._lock:
+			if self._closed:
+				raise RuntimeError('Job manager is shut down')
+			self._expire()
+			kwargs_list = list(kwargs_list)
+			labels = list(labels) if labels is not None else [None] * len(kwargs_list)
+			batch = [Job(secrets.token_hex(8), kind, fn, kwargs, label) for kwargs, label in zip(kwargs_list, labels)]
+			room = self.max_queued - self.queued()
+			if len(batch) > room:
+				raise QueueFull(f'Job queue has room for {max(room, 0)} of the {len(batch)} jobs (at most {self.max_queued} waiting)')
+			for job in batch:
+				self._jobs[job.id] = job
+			self._pending.setdefault(kind, deque()).extend(batch)
+			self._dispatch(kind)
+		return batch
+
+	def as_completed(self, batch: Iterable[Job]) -> Iterator[Job]:
+		"""Yield the jobs of ``batch`` in the order they finish."""
+		remaining = list(batch)
+		while remaining:
+			with self._changed:
+				done = [job for job in remaining if job.finished]
+				while not done:
+					self._changed.wait()
+					done = [job for job in remaining if job.finished]
+			for job in done:
+				remaining.remove(job)
+				yield job
+
+	def get(self, job_id: str) -> Optional[Job]:
+		with self._lock:
+			self._expire()
+			return self._jobs.get(job_id)
+
+	def _dispatch(self, kind: str) -> None:
+		# Caller holds self._lock
+		pending = self._pending.get(kind)
+		while pending and not self._closed and self._running.get(kind, 0) < self._limit(kind):
+			job = pending.popleft()
+			self._running[kind] = self._running.get(kind, 0) + 1
+			job.status = RUNNING
+			job.stage = 'starting'
+			job.started = time.time()
+			pool = self._ensure_pool()
+			future = pool.submit(_run, job.id, job.fn, job.kwargs)
+			job.fn = job.kwargs = None
+			future.add_done_callback(lambda f, job=job, pool=pool: self._finished(job, f, pool))
+
+	def _finished(self, job: Job, future: Future, pool: ProcessPoolExecutor) -> None:
+		exc = RuntimeError('Job was cancelled') if future.cancelled() else future.exception()
+		with self._lock:
+			job.finished = time.time()
+			if exc is not None:
+				job.status = FAILED
+				job.stage = FAILED
+				job.error = str(exc) or exc.__class__.__name__
+				if isinstance(exc, BrokenProcessPool) and pool is self._pool:
+					# A worker died (e.g. OOM on a huge cover); start a fresh pool for the next job.
+					# The other jobs of the broken pool fail too, and must not reset its replacement.
+					pool.shutdown(wait=False)
+					self._pool = None
+			else:
+				job.status = DONE
+				job.stage = DONE
+				job.progress = 1.0
+				job.result = future.result()
+			self._running[job.kind] -= 1
+			self._dispatch(job.kind)
+			self._changed.notify_all()
+		# Stage timings stay in the worker processes; the parent sees whole jobs
+		inc('stegano_jobs_total', kind=job.kind, status=job.status)
+		observe('stegano_job_seconds', job.finished - job.started, kind=job.kind)
+		job._run_callbacks()
+
+	def _expire(self) -> None:
+		cutoff = time.time() - JOB_TTL
+		for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished < cutoff]:
+			del self._jobs[job_id]
+
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			self._expire()
+			kinds = set(self._pending) | set(self._running) | set(self.limits)
+			return {
+				'workers': self.max_workers,
+				'max_queued': self.max_queued,
+				'queued': self.queued(),
+				'kinds': {
+					kind: {
+						'limit': self._limit(kind),
+						'running': self._running.get(kind, 0),
+						'queued': len(self._pending.get(kind, ())),
+					}
+					for kind in sorted(kinds)
+				},
+			}
+
+	def shutdown(self, wait: bool = True) -> None:
+		with self._lock:
+			self._closed = True
+			cancelled = [job for pending in self._pending.values() for job in pending]
+			for job in cancelled:
+				job.fn = job.kwargs = None
+				job.status = job.stage = FAILED
+				job.error = 'Job was cancelled'
+				job.finished = time.time()
+			for pending in self._pending.values():
+				pending.clear()
+			self._changed.notify_all()
+		for job in cancelled:
+			job._run_callbacks()
+		if self._pool is not None:
+			self._pool.shutdown(wait=wait, cancel_futures=True)
+			self._pool = None
+			# Wakes the drain thread, which exits now that the manager is closed
+			self._progress.put(None)
+
+
+def manager_from_env() -> JobManager:
+	"""Build a JobManager from STEGANO_JOB_WORKERS, STEGANO_JOB_LIMIT_<KIND> and STEGANO_JOB_QUEUE."""
+	workers = int(os.environ.get('STEGANO_JOB_WORKERS', '0')) or None
+	limits: Dict[str, int] = {}
+	for key, value in os.environ.items():
+		if key.startswith('STEGANO_JOB_LIMIT_') and value:
+			limits[key[len('STEGANO_JOB_LIMIT_'):].lower()] = int(value)
+	return JobManager(
+		max_workers=workers,
+		limits=limits,
+		max_queued=int(os.environ.get('STEGANO_JOB_QUEUE', '64')),
+	)
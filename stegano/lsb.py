@@ -0,0 +1,114 @@
+from typing import Tuple
+
+import numpy as np
+
+# Depth-1 payloads start with a bare 32-bit length (the original layout). Deeper
+# payloads start with 64 one-bit samples: DEPTH_MAGIC, depth, a reserved byte and
+# the 32-bit length; the data then follows at ``depth`` bits per sample. A bare
+# length can't begin with DEPTH_MAGIC: that would be a payload of over 2.9 GB.
+# Keyed (scattered) payloads always use the longer header, even at depth 1, so a
+# wrong key is told apart by the magic.
+DEPTH_MAGIC = b'\xb1\x75'
+MAX_DEPTH = 8
+
+
+def bytes_to_bits(data: bytes) -> np.ndarray:
+	"""Unpack ``data`` into a uint8 array of bits, most significant bit first."""
+	return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+
+
+def bits_to_bytes(bits: np.ndarray) -> bytes:
+	return np.packbits(bits.astype(np.uint8, copy=False)).tobytes()
+
+
+def _samples_for(n_bytes: int, depth: int) -> int:
+	return -(-n_bytes * 8 // depth)
+
+
+def sample_values(data: bytes, depth: int = 1) -> np.ndarray:
+	"""The ``depth``-bit value each sample carries for ``data``, most significant bits first."""
+	bits = bytes_to_bits(data)
+	if depth == 1:
+		return bits
+	# One strided pass per bit plane: bit j of every group lands in plane depth-1-j
+	n = _samples_for(len(data), depth)
+	padded = np.zeros(n * depth, dtype=np.uint8)
+	padded[:bits.size] = bits
+	values = np.zeros(n, dtype=np.uint8)
+	for j in range(depth):
+		values |= padded[j::depth] << (depth - 1 - j)
+	return values
+
+
+def write_lsb(flat: np.ndarray, data: bytes, offset: int = 0, depth: int = 1) -> int:
+	"""Write the bits of ``data`` into the ``depth`` low bits of ``flat`` in place.
+
+	``flat`` is any one-dimensional integer view (uint8 pixels, int16 samples);
+	only the samples that carry bits are touched. Each sample takes ``depth``
+	consecutive bits, most significant first. Returns the number of samples written.
+	"""
+	bits = sample_values(data, depth)
+	seg = flat[offset:offset + bits.size]
+	seg >>= depth
+	seg <<= depth
+	seg |= bits.astype(flat.dtype, copy=False)
+	return bits.size
+
+
+def read_lsb(flat: np.ndarray, n_bytes: int, offset: int = 0, depth: int = 1) -> bytes:
+	"""Read ``n_bytes`` from the ``depth`` low bits of ``flat`` starting at sample ``offset``."""
+	seg = flat[offset:offset + _samples_for(n_bytes, depth)]
+	if depth == 1:
+		bits = seg & 1
+	else:
+		values = (seg & ((1 << depth) - 1)).astype(np.uint8)
+		bits = np.empty(values.size * depth, dtype=np.uint8)
+		for j in range(depth):
+			bits[j::depth] = (values >> (depth - 1 - j)) & 1
+	# A truncated cover yields only whole bytes, so callers can compare lengths
+	bits = bits[:min(bits.size - bits.size % 8, n_bytes * 8)]
+	return bits_to_bytes(bits)
+
+
+def read_length(flat: np.ndarray, offset: int = 0, depth: int = 1) -> int:
+	return int.from_bytes(read_lsb(flat, 4, offset, depth), 'big')
+
+
+def check_depth(depth: int, max_depth: int) -> int:
+	if not 1 <= depth <= max_depth:
+		raise ValueError(f'Bit depth must be between 1 and {max_depth}')
+	return depth
+
+
+def header_samples(depth: int, keyed: bool = False) -> int:
+	"""Samples taken by the payload header at ``depth``."""
+	return 32 if depth == 1 and not keyed else 64
+
+
+def capacity_bytes(n_samples: int, depth: int = 1, keyed: bool = False) -> int:
+	"""Payload bytes that fit in ``n_samples`` at ``depth`` bits per sample."""
+	return max(0, (n_samples - header_samples(depth, keyed)) * depth // 8)
+
+
+def samples_needed(n_bytes: int, depth: int = 1, keyed: bool = False) -> int:
+	return header_samples(depth, keyed) + _samples_for(n_bytes, depth)
+
+
+def write_header(flat: np.ndarray, length: int, depth: int = 1, keyed: bool = False) -> int:
+	"""Write the payload header; returns the sample offset where the data starts."""
+	head = length.to_bytes(4, 'big')
+	if depth > 1 or keyed:
+		head = DEPTH_MAGIC + bytes([depth, 0]) + head
+	write_lsb(flat, head)
+	return header_samples(depth, keyed)
+
+
+def read_header(flat: np.ndarray) -> Tuple[int, int, int]:
+	"""Read the payload header. Returns ``(length, depth, data_offset)``."""
+	head = read_lsb(flat, 4)
+	if head[:2] != DEPTH_MAGIC:
+		return int.from_bytes(head, 'big'), 1, 32
+	depth = head[2]
+	if not 1 <= depth <= MAX_DEPTH:
+		raise ValueError('Corrupted payload header: invalid bit depth')
+	return read_length(flat, 32), depth, 64
@@ -0,0 +1,93 @@
+import importlib
+import io
+import os
+import shutil
+import sys
+from types import ModuleType
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Embedder module for each media kind (as returned by ``pipeline.infer_media_kind``).
+# They carry the heavy imports (NumPy, Pillow, OpenCV), so each is imported on first
+# use: a process that only ever sees images never loads cv2.
+BACKENDS = {
+	'image': 'stegano.image_lsb',
+	'audio': 'stegano.audio_lsb',
+	'video': 'stegano.video_lsb',
+}
+
+# Lossless output encodings: name -> (Pillow format, extension, MIME type, save options).
+# 'png-fast' is zlib level 1 with run-length matching only, several times faster than
+# the default level at a modest size cost; WebP lossless at its lowest effort is faster
+# still and usually smaller. TIFF (LZW) and BMP trade size for near-free encoding.
+# Kept here so requests can be validated without importing Pillow.
+OUTPUT_FORMATS = {
+	'png': ('PNG', '.png', 'image/png', {}),
+	'png-fast': ('PNG', '.png', 'image/png', {'compress_level': 1, 'compress_type': 3}),
+	'webp': ('WEBP', '.webp', 'image/webp', {'lossless': True, 'quality': 0, 'method': 0}),
+	'tiff': ('TIFF', '.tiff', 'image/tiff', {'compression': 'tiff_lzw'}),
+	'bmp': ('BMP', '.bmp', 'image/bmp', {}),
+}
+
+
+def backend(kind: str) -> ModuleType:
+	"""The embedder module for ``kind``, imported on the first call."""
+	if kind not in BACKENDS:
+		raise ValueError(f'No backend for media kind {kind!r}')
+	return importlib.import_module(BACKENDS[kind])
+
+
+def loaded(kind: str) -> bool:
+	return BACKENDS.get(kind) in sys.modules
+
+
+def output_options(image_format: str = 'png', compress_level: Optional[int] = None) -> Tuple[str, str, Dict[str, object]]:
+	"""``(Pillow format, extension, save options)`` for an output format.
+
+	``compress_level`` (0-9) overrides the zlib level of the PNG formats.
+	"""
+	if image_format not in OUTPUT_FORMATS:
+		raise ValueError(f'Unknown image format {image_format!r}; expected one of {", ".join(OUTPUT_FORMATS)}')
+	fmt, ext, _, options = OUTPUT_FORMATS[image_format]
+	if compress_level is not None:
+		if fmt != 'PNG':
+			raise ValueError('compress_level only applies to PNG output')
+		if not 0 <= compress_level <= 9:
+			raise ValueError('compress_level must be between 0 and 9')
+		options = dict(options, compress_level=compress_level)
+	return fmt, ext, options
+
+
+def find_ffmpeg() -> Optional[str]:
+	"""Locate an ffmpeg binary via ``STEGANO_FFMPEG`` or ``PATH``."""
+	path = os.environ.get('STEGANO_FFMPEG') or shutil.which('ffmpeg')
+	return path if path and os.path.exists(path) else None
+
+
+def preload_kinds(default: str = 'all') -> List[str]:
+	"""Media kinds to load at startup, from ``STEGANO_PRELOAD`` (e.g. 'image,audio', 'all' or 'none')."""
+	value = os.environ.get('STEGANO_PRELOAD', default).strip().lower()
+	if value == 'all':
+		return list(BACKENDS)
+	kinds = [kind.strip() for kind in value.split(',') if kind.strip() and kind.strip() != 'none']
+	for kind in kinds:
+		if kind not in BACKENDS:
+			raise ValueError(f'Unknown media kind {kind!r} in STEGANO_PRELOAD')
+	return kinds
+
+
+def warm_up(kinds: Iterable[str]) -> None:
+	"""Import the backends for ``kinds`` and pay their one-off costs before the first request.
+
+	Images run a tiny embed (Pillow plugins, first NumPy and zlib calls); video probes
+	the writer codecs.
+	"""
+	for kind in kinds:
+		module = backend(kind)
+		if kind == 'image':
+			from PIL import Image
+			Image.init()
+			cover = io.BytesIO()
+			Image.new('RGB', (32, 32)).save(cover, format='PNG')
+			module.extract_from_image(module.embed_in_image(cover.getvalue(), b'warmup'))
+		elif kind == 'video':
+			module.probe_codecs()
@@ -0,0 +1,201 @@
+import contextlib
+import contextvars
+import cProfile
+import os
+import threading
+import time
+import tracemalloc
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Upper bounds (seconds) of the duration histogram buckets; embeds range from ms to minutes
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Registry:
+	"""Thread-safe counters, gauges and histograms, rendered in the Prometheus text format."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._meta: Dict[str, Tuple[str, str]] = {}
+		self._counters: Dict[str, Dict[Labels, float]] = {}
+		self._gauges: Dict[str, Dict[Labels, float]] = {}
+		self._histograms: Dict[str, Dict[Labels, List[float]]] = {}
+
+	def describe(self, name: str, kind: str, help: str) -> None:
+		self._meta[name] = (kind, help)
+
+	def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+		key = tuple(sorted(labels.items()))
+		with self._lock:
+			series = self._counters.setdefault(name, {})
+			series[key] = series.get(key, 0.0) + value
+
+	def set(self, name: str, value: float, **labels: str) -> None:
+		key = tuple(sorted(labels.items()))
+		with self._lock:
+			self._gauges.setdefault(name, {})[key] = value
+
+	def observe(self, name: str, value: float, **labels: str) -> None:
+		key = tuple(sorted(labels.items()))
+		with self._lock:
+			# Per-bucket counts (not cumulative), then the sum and the count
+			series = self._histograms.setdefault(name, {})
+			cells = series.setdefault(key, [0.0] * (len(BUCKETS) + 2))
+			for i, bound in enumerate(BUCKETS):
+				if value <= bound:
+					cells[i] += 1
+					break
+			cells[-2] += value
+			cells[-1] += 1
+
+	def render(self, **const: str) -> str:
+		"""The Prometheus text format; ``const`` labels (e.g. the worker) are added to every series."""
+		base = tuple(const.items())
+		lines = []
+		with self._lock:
+			for name in sorted(set(self._counters) | set(self._gauges) | set(self._histograms)):
+				kind, help = self._meta.get(name, ('untyped', ''))
+				lines.append(f'# HELP {name} {help}')
+				lines.append(f'# TYPE {name} {kind}')
+				for series in (self._counters, self._gauges):
+					for key, value in sorted(series.get(name, {}).items()):
+						lines.append(f'{name}{_labels(base + key)} {_number(value)}')
+				for key, cells in sorted(self._histograms.get(name, {}).items()):
+					key = base + key
+					running = 0.0
+					for bound, count in zip(BUCKETS, cells):
+						running += count
+						lines.append(f'{name}_bucket{_labels(key, le=_number(bound))} {_number(running)}')
+					lines.append(f'{name}_bucket{_labels(key, le="+Inf")} {_number(cells[-1])}')
+					lines.append(f'{name}_sum{_labels(key)} {cells[-2]!r}')
+					lines.append(f'{name}_count{_labels(key)} {_number(cells[-1])}')
+		return '\n'.join(lines) + '\n'
+
+
+def _labels(key: Labels, **extra: str) -> str:
+	pairs = list(key) + list(extra.items())
+	if not pairs:
+		return ''
+	escaped = (k + '="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"' for k, v in pairs)
+	return '{' + ','.join(escaped) + '}'
+
+
+def _number(value: float) -> str:
+	return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+REGISTRY = Registry()
+REGISTRY.describe('stegano_stage_seconds', 'histogram', 'Time spent in each processing stage.')
+REGISTRY.describe('stegano_bytes_total', 'counter', 'Bytes received in request bodies and sent in responses.')
+REGISTRY.describe('stegano_media_total', 'counter', 'Covers embedded into and stego files extracted from, by media kind.')
+REGISTRY.describe('stegano_encoder_total', 'counter', 'Output encoder chosen for stego files (image format or video codec).')
+REGISTRY.describe('stegano_requests_total', 'counter', 'HTTP requests by endpoint and status.')
+REGISTRY.describe('stegano_request_seconds', 'histogram', 'HTTP request handling time, up to the start of the response body.')
+REGISTRY.describe('stegano_jobs_total', 'counter', 'Background jobs finished, by kind and status.')
+REGISTRY.describe('stegano_job_seconds', 'histogram', 'Background job run time, from start to finish.')
+REGISTRY.describe('stegano_jobs_queued', 'gauge', 'Background jobs waiting for a worker, by kind.')
+REGISTRY.describe('stegano_jobs_running', 'gauge', 'Background jobs running, by kind.')
+
+# Stages timed in the current request, for its Server-Timing header; None outside a trace
+_trace: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar('stegano_trace', default=None)
+
+
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+	REGISTRY.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+	REGISTRY.observe(name, value, **labels)
+
+
+def set_gauge(name: str, value: float, **labels: str) -> None:
+	REGISTRY.set(name, value, **labels)
+
+
+def render() -> str:
+	# Each Gunicorn worker keeps its own registry; the pid tells their series apart
+	return REGISTRY.render(worker=str(os.getpid()))
+
+
+@contextlib.contextmanager
+def stage(name: str, **labels: str) -> Iterator[None]:
+	"""Time a processing stage into ``stegano_stage_seconds`` and the current trace, if any.
+
+	Stages run on other threads (e.g. a streamed encode) are counted but not traced.
+	"""
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		elapsed = time.perf_counter() - start
+		REGISTRY.observe('stegano_stage_seconds', elapsed, stage=name, **labels)
+		trace = _trace.get()
+		if trace is not None:
+			trace.append((name, elapsed))
+
+
+def start_trace() -> contextvars.Token:
+	return _trace.set([])
+
+
+def end_trace(token: contextvars.Token) -> List[Tuple[str, float]]:
+	"""Stop the trace begun by ``start_trace`` and return its ``(stage, seconds)`` entries."""
+	trace = _trace.get() or []
+	_trace.reset(token)
+	return trace
+
+
+def server_timing(trace: Iterable[Tuple[str, float]], total: Optional[float] = None) -> str:
+	"""``Server-Timing`` header value; repeated stages (e.g. two KDF runs) are summed."""
+	durations: Dict[str, float] = {}
+	for name, seconds in trace:
+		durations[name] = durations.get(name, 0.0) + seconds
+	if total is not None:
+		durations['total'] = total
+	return ', '.join(f'{name};dur={seconds * 1000:.1f}' for name, seconds in durations.items())
+
+
+class RequestProfile:
+	"""cProfile ('cpu') and/or tracemalloc ('memory') around one request.
+
+	tracemalloc is process-wide, so a request that finds it already running (another
+	profiled request) skips the memory report rather than sharing it.
+	"""
+
+	def __init__(self, modes: Iterable[str]):
+		self.modes = set(modes)
+		self._profile: Optional[cProfile.Profile] = None
+		self._tracing = False
+		self.peak_bytes: Optional[int] = None
+
+	def start(self) -> None:
+		if 'cpu' in self.modes:
+			self._profile = cProfile.Profile()
+			self._profile.enable()
+		if 'memory' in self.modes and not tracemalloc.is_tracing():
+			tracemalloc.start()
+			self._tracing = True
+
+	def stop(self, out_dir: str, name: str) -> List[str]:
+		"""Stop profiling and write the reports into ``out_dir``; returns their file names."""
+		os.makedirs(out_dir, exist_ok=True)
+		written = []
+		if self._profile is not None:
+			self._profile.disable()
+			# A pstats dump: python -m pstats <file>, or snakeviz
+			path = os.path.join(out_dir, name + '.prof')
+			self._profile.dump_stats(path)
+			written.append(os.path.basename(path))
+		if self._tracing:
+			snapshot = tracemalloc.take_snapshot()
+			self.peak_bytes = tracemalloc.get_traced_memory()[1]
+			tracemalloc.stop()
+			path = os.path.join(out_dir, name + '.alloc.txt')
+			with open(path, 'w') as f:
+				f.write(f'peak traced memory: {self.peak_bytes} bytes\n\n')
+				for line in snapshot.statistics('lineno')[:25]:
+					f.write(f'{line}\n')
+			written.append(os.path.basename(path))
+		return written
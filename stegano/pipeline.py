@@ -0,0 +1,321 @@
+import io
+import itertools
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+
+from cryptography.exceptions import InvalidTag
+
+from .compress import compress_stream, decompress_stream
+from .container import ContainerHeader, SealKey, open_payload, read_header, seal
+from .crypto import StreamEncryptor, scatter_key
+from .media import BACKENDS, backend, find_ffmpeg, output_options
+from .metrics import inc, stage
+from .streams import Source, iter_chunks, open_source
+
+# Extracted payloads above this spill from memory to disk
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+ProgressFn = Callable[[str, float], None]
+
+class UnsupportedMedia(ValueError):
+	pass
+
+
+def infer_media_kind(filename: str) -> str:
+	name = filename.lower()
+	if name.endswith(('.png', '.bmp', '.jpg', '.jpeg', '.webp', '.tif', '.tiff')):
+		return 'image'
+	if name.endswith(('.wav',)):
+		return 'audio'
+	if name.endswith(('.mp4', '.avi', '.mov', '.mkv')):
+		return 'video'
+	return 'unknown'
+
+
+def check_media_depth(filename: str, depth: int) -> int:
+	"""Validate ``depth`` for the media kind of ``filename``; unknown kinds are left to the embedder."""
+	# lsb and the backends import NumPy, so they load with the first media request
+	from .lsb import MAX_DEPTH, check_depth
+	media_kind = infer_media_kind(filename)
+	return check_depth(depth, backend(media_kind).MAX_DEPTH if media_kind in BACKENDS else MAX_DEPTH)
+
+
+def _no_progress(stage: str, fraction: float) -> None:
+	pass
+
+
+def build_container(
+	secret: BinaryIO,
+	secret_size: int,
+	filename: str,
+	kind: str = 'file',
+	password: Optional[str] = None,
+	public_pem: Optional[str] = None,
+	compression: str = 'auto',
+	spool_dir: Optional[str] = None,
+	key: Optional[SealKey] = None,
+) -> StreamEncryptor:
+	"""Compress (when it pays off) and seal a secret into a lazily-read container."""
+	with stage('compress'):
+		codec, secret, secret_size = compress_stream(secret, secret_size, compression, spool_dir=spool_dir)
+	return seal(secret, secret_size, filename, kind, password=password, public_pem=public_pem, codec=codec, key=key)
+
+
+def _count_embed(media_kind: str, encoder: str) -> None:
+	inc('stegano_media_total', kind=media_kind, op='embed')
+	inc('stegano_encoder_total', kind=media_kind, encoder=encoder)
+
+
+def embed_container(
+	cover: Source,
+	container: StreamEncryptor,
+	output_dir: str,
+	stego_stem: Optional[str] = None,
+	video_mode: str = 'reencode',
+	cover_name: Optional[str] = None,
+	spool_dir: Optional[str] = None,
+	depth: int = 1,
+	scatter: Optional[bytes] = None,
+	image_format: str = 'png',
+	compress_level: Optional[int] = None,
+) -> Tuple[str, Optional[Dict[str, object]]]:
+	"""Embed ``container`` into ``cover``, writing the stego file into ``output_dir``.
+
+	``cover`` may be a path or an in-memory buffer/stream; for the latter, ``cover_name``
+	supplies the file name the media kind is inferred from. ``depth`` is the number of
+	low bits used per sample; extraction reads it back from the stego file. ``scatter``
+	(from ``scatter_key``) spreads the bits over keyed positions instead of the start.
+	``image_format`` and ``compress_level`` choose the lossless encoding of image output.
+	Returns ``(stego_path, stats)``; stats are only produced for video.
+	"""
+	cover_name = cover_name or os.fspath(cover)
+	media_kind = infer_media_kind(cover_name)
+	stem = stego_stem or os.path.splitext(os.path.basename(cover_name))[0] + '_stego'
+	stats = None
+	if media_kind == 'unknown':
+		raise UnsupportedMedia('Unsupported cover file type')
+	embedder = backend(media_kind)
+	with stage('embed', kind=media_kind):
+		if media_kind == 'image':
+			stego_path = os.path.join(output_dir, stem + output_options(image_format, compress_level)[1])
+			embedder.embed_in_image(cover, container.read(), stego_path, depth, scatter, image_format, compress_level)
+			encoder = image_format
+		elif media_kind == 'audio':
+			# Stream block by block straight into the output; memory stays flat for any WAV length
+			stego_path = os.path.join(output_dir, stem + '.wav')
+			embedder.embed_in_wav_stream(cover, container, stego_path, payload_len=len(container), depth=depth, key=scatter)
+			encoder = 'wav'
+		elif video_mode == 'remux' or (video_mode == 'auto' and find_ffmpeg()):
+			# Only the carrier frames are re-encoded; the cover tracks are stream-copied into MKV
+			stego_path = os.path.join(output_dir, stem + '.mkv')
+			stats = embedder.embed_in_video_remux(cover, container.read(), stego_path, tmp_dir=spool_dir, depth=depth, key=scatter)
+			encoder = str(stats['codec'])
+		else:
+			# Prefer AVI container to reduce lossy compression issues that break LSBs
+			stego_path = os.path.join(output_dir, stem + '.avi')
+			stats = embedder.embed_in_video(cover, container.read(), stego_path, tmp_dir=spool_dir, depth=depth, key=scatter)
+			encoder = str(stats['codec'])
+	_count_embed(media_kind, encoder)
+	return stego_path, stats
+
+
+def stream_embed(
+	cover: Source,
+	container: StreamEncryptor,
+	cover_name: str,
+	video_mode: str = 'reencode',
+	spool_dir: Optional[str] = None,
+	depth: int = 1,
+	scatter: Optional[bytes] = None,
+	image_format: str = 'png',
+	compress_level: Optional[int] = None,
+) -> Tuple[str, Iterator[bytes], Optional[int]]:
+	"""Embed for direct delivery. Returns ``(stego_filename, chunks, content_length)``.
+
+	Audio is produced block by block while it is sent (the stego WAV is exactly as long
+	as the cover). PNG and WebP images are encoded by a worker thread while the first
+	pieces are sent, so their length is not known up front and ``content_length`` is
+	None; TIFF and BMP are encoded whole in memory first and have a length. Videos have
+	to be finished first and are spooled to a temp file. Errors such as an oversized
+	payload are raised here, before any chunk is handed out.
+	"""
+	media_kind = infer_media_kind(cover_name)
+	stem = os.path.splitext(os.path.basename(cover_name))[0] + '_stego'
+	if media_kind == 'audio':
+		with open_source(cover) as f:
+			length = f.seek(0, os.SEEK_END)
+		chunks = backend('audio').iter_embed_wav(cover, container, len(container), depth=depth, key=scatter)
+		first = next(chunks)
+		_count_embed(media_kind, 'wav')
+		return stem + '.wav', itertools.chain([first], chunks), length
+	if media_kind == 'image':
+		fmt, ext, _ = output_options(image_format, compress_level)
+		image = backend('image')
+		if fmt in image.BUFFERED_FORMATS:
+			data = image.embed_in_image(cover, container.read(), None, depth, scatter, image_format, compress_level)
+			_count_embed(media_kind, image_format)
+			return stem + ext, iter_chunks(io.BytesIO(data)), len(data)
+		chunks = image.iter_embed_image(cover, container.read(), depth, scatter, image_format, compress_level)
+		_count_embed(media_kind, image_format)
+		return stem + ext, chunks, None
+	if media_kind == 'video':
+		tmp_dir = tempfile.mkdtemp(dir=spool_dir)
+		try:
+			stego_path, _ = embed_container(cover, container, tmp_dir, stem, video_mode, cover_name, spool_dir, depth, scatter)
+		except Exception:
+			shutil.rmtree(tmp_dir, ignore_errors=True)
+			raise
+		f = open(stego_path, 'rb')
+		length = os.fstat(f.fileno()).st_size
+		return os.path.basename(stego_path), iter_chunks(f, on_close=lambda: shutil.rmtree(tmp_dir, ignore_errors=True)), length
+	raise UnsupportedMedia('Unsupported cover file type')
+
+
+def extract_container(
+	stego: Source,
+	spool_dir: Optional[str] = None,
+	stego_name: Optional[str] = None,
+	scatter: Optional[bytes] = None,
+) -> BinaryIO:
+	"""Pull the raw container out of a stego file (path, buffer or stream) as a seekable file object."""
+	media_kind = infer_media_kind(stego_name or os.fspath(stego))
+	if media_kind == 'unknown':
+		raise UnsupportedMedia('Unsupported stego file type')
+	inc('stegano_media_total', kind=media_kind, op='extract')
+	extractor = backend(media_kind)
+	with stage('extract', kind=media_kind):
+		if media_kind == 'image':
+			return io.BytesIO(extractor.extract_from_image(stego, scatter))
+		if media_kind == 'video':
+			return io.BytesIO(extractor.extract_from_video(stego, tmp_dir=spool_dir, key=scatter))
+		# Long audio payloads are spooled to disk rather than held in memory
+		container = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, dir=spool_dir)
+		try:
+			extractor.extract_from_wav_stream(stego, container, key=scatter)
+		except Exception:
+			container.close()
+			raise
+		container.seek(0)
+		return container
+
+
+def _checked_container(stego: Source, spool_dir: Optional[str], stego_name: Optional[str], scatter: Optional[bytes]) -> BinaryIO:
+	container = extract_container(stego, spool_dir, stego_name, scatter)
+	try:
+		read_header(container)
+	except Exception:
+		container.close()
+		raise
+	container.seek(0)
+	return container
+
+
+def locate_container(
+	stego: Source,
+	password: Optional[str] = None,
+	private_pem: Optional[str] = None,
+	spool_dir: Optional[str] = None,
+	stego_name: Optional[str] = None,
+) -> BinaryIO:
+	"""Like ``extract_container``, but also finds payloads embedded with keyed placement.
+
+	The sequential layout is tried first, so unscattered files never pay for the scatter
+	KDF; if it yields no valid container, keys derived from the credentials are tried.
+	"""
+	try:
+		return _checked_container(stego, spool_dir, stego_name, None)
+	except UnsupportedMedia:
+		raise
+	except ValueError as e:
+		error = e
+	for credentials in ({'password': password}, {'private_pem': private_pem}):
+		if not any(credentials.values()):
+			continue
+		try:
+			return _checked_container(stego, spool_dir, stego_name, scatter_key(**credentials))
+		except ValueError:
+			continue
+	raise error
+
+
+def open_secret(
+	container: BinaryIO,
+	password: Optional[str] = None,
+	private_pem: Optional[str] = None,
+) -> Tuple[ContainerHeader, Iterator[bytes]]:
+	"""Parse the container header and return it with an iterator of plaintext chunks."""
+	head = read_header(container)
+	segments = open_payload(head, container, password=password, private_pem=private_pem)
+	return head, decompress_stream(segments, head.codec)
+
+
+def embed_job(
+	cover_path: str,
+	output_dir: str,
+	secret_path: Optional[str] = None,
+	secret_text: Optional[str] = None,
+	secret_filename: Optional[str] = None,
+	password: Optional[str] = None,
+	public_pem: Optional[str] = None,
+	compression: str = 'auto',
+	video_mode: str = 'reencode',
+	spool_dir: Optional[str] = None,
+	key: Optional[SealKey] = None,
+	stego_stem: Optional[str] = None,
+	depth: int = 1,
+	scatter: Optional[bytes] = None,
+	image_format: str = 'png',
+	compress_level: Optional[int] = None,
+	progress: ProgressFn = _no_progress,
+) -> Dict[str, object]:
+	"""Path-in/path-out embed, suitable for running in a worker process.
+
+	``key`` (from ``seal_key``) skips the per-job key derivation, e.g. for batches.
+	"""
+	progress('compressing', 0.0)
+	if secret_path:
+		secret = open(secret_path, 'rb')
+		secret_size = os.fstat(secret.fileno()).st_size
+		kind = 'file'
+		filename = secret_filename or os.path.basename(secret_path)
+	else:
+		data = (secret_text or '').encode('utf-8')
+		secret = io.BytesIO(data)
+		secret_size = len(data)
+		kind = 'text'
+		filename = secret_filename or 'secret.txt'
+	with secret:
+		container = build_container(secret, secret_size, filename, kind, password, public_pem, compression, spool_dir, key)
+		progress('embedding', 0.2)
+		stego_path, stats = embed_container(
+			cover_path, container, output_dir, stego_stem, video_mode, spool_dir=spool_dir,
+			depth=depth, scatter=scatter, image_format=image_format, compress_level=compress_level,
+		)
+	progress('done', 1.0)
+	return {'filename': os.path.basename(stego_path), 'path': stego_path, 'stats': stats}
+
+
+def extract_job(
+	stego_path: str,
+	output_path: str,
+	password: Optional[str] = None,
+	private_pem: Optional[str] = None,
+	spool_dir: Optional[str] = None,
+	progress: ProgressFn = _no_progress,
+) -> Dict[str, object]:
+	"""Path-in/path-out extract; the plaintext is written to ``output_path``."""
+	progress('extracting', 0.0)
+	with locate_container(stego_path, password, private_pem, spool_dir) as container:
+		progress('decrypting', 0.5)
+		head, chunks = open_secret(container, password, private_pem)
+		try:
+			with open(output_path, 'wb') as out:
+				for chunk in chunks:
+					out.write(chunk)
+		except InvalidTag:
+			os.remove(output_path)
+			raise ValueError('Decryption failed: wrong password or key, or the payload is corrupted') from None
+	progress('done', 1.0)
+	return {'filename': head.filename, 'path': output_path, 'size': os.path.getsize(output_path)}
@@ -0,0 +1,208 @@
+import glob
+import os
+import re
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+# ``.<name>.hold-<pid>-<token>`` next to a held path; one per holding Reaper
+_MARKER = re.compile(r'^\.(.+)\.hold-(\d+)-[0-9a-f]+$')
+
+
+@dataclass
+class Quota:
+	"""Limits for one directory; ``None`` disables that limit. Files younger than
+	``min_age`` seconds are never evicted to meet ``max_bytes``."""
+	max_age: Optional[float] = 3600.0
+	max_bytes: Optional[int] = None
+	min_age: float = 60.0
+
+
+def _alive(pid: int) -> bool:
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+	except PermissionError:
+		pass
+	return True
+
+
+def _held_names(dirpath: str, filenames: List[str]) -> Set[str]:
+	"""Names in ``dirpath`` held by a live process. Markers left by dead ones are removed."""
+	held = set()
+	for name in filenames:
+		match = _MARKER.match(name)
+		if match is None:
+			continue
+		if _alive(int(match.group(2))):
+			held.add(match.group(1))
+		else:
+			try:
+				os.remove(os.path.join(dirpath, name))
+			except FileNotFoundError:
+				pass
+	return held
+
+
+def _is_held(path: str) -> bool:
+	pattern = os.path.join(glob.escape(os.path.dirname(path)), '.' + glob.escape(os.path.basename(path)) + '.hold-*')
+	for marker in glob.glob(pattern):
+		match = _MARKER.match(os.path.basename(marker))
+		if match is not None and _alive(int(match.group(2))):
+			return True
+	return False
+
+
+def _scan(root: str) -> Tuple[List[Tuple[float, int, str]], List[str]]:
+	"""Files (``(mtime, size, path)``) and subdirectories under ``root``, parents before
+	children. Held files are left out, and so is everything under a held directory."""
+	files = []
+	dirs = []
+	for dirpath, dirnames, filenames in os.walk(root):
+		held = _held_names(dirpath, filenames)
+		dirnames[:] = [name for name in dirnames if name not in held]
+		dirs.extend(os.path.join(dirpath, name) for name in dirnames)
+		for name in filenames:
+			if name in held or _MARKER.match(name):
+				continue
+			path = os.path.join(dirpath, name)
+			try:
+				st = os.stat(path)
+			except FileNotFoundError:
+				continue
+			files.append((st.st_mtime, st.st_size, path))
+	return files, dirs
+
+
+def _remove(path: str) -> bool:
+	# Checked again here: a request may have taken the file since the scan
+	if _is_held(path):
+		return False
+	try:
+		os.remove(path)
+		return True
+	except FileNotFoundError:
+		return False
+
+
+def reap(root: str, quota: Quota, now: Optional[float] = None) -> Dict[str, int]:
+	"""Delete files under ``root`` older than ``quota.max_age``, then oldest-first until
+	the rest fits in ``quota.max_bytes`` (sparing files younger than ``quota.min_age``). Empty subdirectories older than ``max_age``
+	go too. Paths held by a Reaper in any live process (and everything under held
+	directories) are in use and never touched."""
+	now = time.time() if now is None else now
+	root = os.path.abspath(root)
+	entries, dirs = _scan(root)
+	entries.sort()
+	removed = freed = 0
+	kept = []
+	for mtime, size, path in entries:
+		if quota.max_age is not None and now - mtime > quota.max_age:
+			if _remove(path):
+				removed += 1
+				freed += size
+		else:
+			kept.append((mtime, size, path))
+	total = sum(size for _, size, _ in kept)
+	if quota.max_bytes is not None:
+		for mtime, size, path in kept:
+			if total <= quota.max_bytes or now - mtime < quota.min_age:
+				break
+			if _remove(path):
+				removed += 1
+				freed += size
+				total -= size
+	if quota.max_age is not None:
+		# Children first; a fresh directory (e.g. one a request just made) is left alone
+		for path in reversed(dirs):
+			if _is_held(path):
+				continue
+			try:
+				if now - os.stat(path).st_mtime > quota.max_age:
+					os.rmdir(path)
+			except OSError:
+				pass
+	return {'removed': removed, 'freed': freed, 'bytes': total}
+
+
+class Reaper:
+	"""Background thread that applies a Quota to each directory every ``interval`` seconds.
+
+	Paths that requests and jobs are still using are ``hold``-ed until ``release``-d. A
+	hold is a marker file next to the path, so reapers in other processes (gunicorn
+	workers, the reloader's watcher) see it too; markers of dead processes are ignored.
+	"""
+
+	def __init__(self, quotas: Dict[str, Quota], interval: float = 60.0):
+		self.quotas = quotas
+		self.interval = interval
+		self.last: Dict[str, Dict[str, int]] = {}
+		self._held: Dict[str, int] = {}
+		self._token = secrets.token_hex(4)
+		self._lock = threading.Lock()
+		self._stop = threading.Event()
+		self._thread: Optional[threading.Thread] = None
+
+	def _marker(self, path: str) -> str:
+		head, name = os.path.split(path)
+		return os.path.join(head, f'.{name}.hold-{os.getpid()}-{self._token}')
+
+	def hold(self, *paths: str) -> None:
+		"""Keep ``paths`` (files, or directories and everything under them) until released."""
+		with self._lock:
+			for path in paths:
+				path = os.path.abspath(path)
+				if path not in self._held:
+					open(self._marker(path), 'wb').close()
+				self._held[path] = self._held.get(path, 0) + 1
+
+	def release(self, *paths: str) -> None:
+		with self._lock:
+			for path in paths:
+				path = os.path.abspath(path)
+				count = self._held.pop(path, 0) - 1
+				if count > 0:
+					self._held[path] = count
+				elif count == 0:
+					try:
+						os.remove(self._marker(path))
+					except FileNotFoundError:
+						pass
+
+	def run_once(self) -> Dict[str, Dict[str, int]]:
+		for root, quota in self.quotas.items():
+			if os.path.isdir(root):
+				self.last[root] = reap(root, quota)
+		return self.last
+
+	def _loop(self) -> None:
+		while not self._stop.wait(self.interval):
+			try:
+				self.run_once()
+			except OSError:
+				pass
+
+	def start(self) -> 'Reaper':
+		if self._thread is None:
+			self._thread = threading.Thread(target=self._loop, name='stegano-reaper', daemon=True)
+			self._thread.start()
+		return self
+
+	def stop(self) -> None:
+		self._stop.set()
+
+
+def quota_from_env(prefix: str, default: Quota) -> Quota:
+	"""Read ``<prefix>_MAX_AGE`` (seconds), ``<prefix>_MAX_BYTES`` and ``<prefix>_MIN_AGE``
+	(seconds); 0 disables the first two."""
+	age = os.environ.get(f'{prefix}_MAX_AGE')
+	size = os.environ.get(f'{prefix}_MAX_BYTES')
+	grace = os.environ.get(f'{prefix}_MIN_AGE')
+	return Quota(
+		max_age=default.max_age if age is None else (float(age) or None),
+		max_bytes=default.max_bytes if size is None else (int(size) or None),
+		min_age=default.min_age if grace is None else float(grace),
+	)
@@ -0,0 +1,140 @@
+import hashlib
+from typing import Optional, Tuple
+
+import numpy as np
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from .lsb import DEPTH_MAGIC, MAX_DEPTH, read_header, read_lsb, write_header, write_lsb
+
+MAX_SAMPLES = 1 << 32
+BATCH = 1 << 16
+_S32 = np.uint64(32)
+
+
+class Scatter:
+	"""Keyed placement of a header and a payload across ``n`` samples.
+
+	Each of the ``m`` carrier samples gets its own stratum, an equal slice of the
+	index space, and sits at a pseudo-random offset inside it. Offsets come from an
+	AES-CTR keystream (a counter-mode PRF), so any range of positions is computed
+	directly in vectorized batches and comes out sorted, which keeps the gather and
+	scatter over the cover cache-friendly. The ``head`` header samples are placed the
+	same way over the whole cover and the payload over the remaining indices, so the
+	header can be read before the payload length is known. ``tweak`` selects an
+	independent layout under the same key (e.g. one per video frame).
+	"""
+
+	def __init__(self, key: bytes, n: int, tweak: bytes = b'', head: int = 64):
+		if not head <= n <= MAX_SAMPLES:
+			raise ValueError('Cover size out of range for keyed placement')
+		self.n = n
+		self.space = n - head
+		seed = key + n.to_bytes(8, 'big') + tweak
+		self._keys = [hashlib.sha256(seed + label).digest() for label in (b'head', b'data')]
+		self.head = self._positions(self._keys[0], n, head, 0, head, False)
+		self._gaps = (self.head - np.arange(head)).astype(np.uint64)
+		self._steps = np.arange(head + 1, dtype=np.uint64)
+
+	def _positions(self, key: bytes, space: int, m: int, start: int, count: int, skip_head: bool) -> np.ndarray:
+		"""Indices of strata ``start .. start + count`` when ``space`` is cut into ``m`` strata.
+
+		With ``skip_head`` the result is shifted past the header samples, which lie
+		outside the payload's index space.
+		"""
+		if m > space:
+			raise ValueError('Payload too large for cover capacity')
+		if not count:
+			return np.empty(0, dtype=np.intp)
+		# Equal strata of ``stride`` samples; the last ``space % m`` samples are never used
+		stride = np.uint64(space // m)
+		# One 32-bit keystream word per stratum, from AES-CTR seeked to the first one
+		block, skip = divmod(start, 4)
+		enc = Cipher(algorithms.AES(key), modes.CTR(block.to_bytes(16, 'big'))).encryptor()
+		enc.update(bytes(4 * skip))
+		size = min(BATCH, count)
+		zeros = bytes(4 * size)
+		words = np.empty(size + 4, dtype=np.uint32)
+		wide = np.empty(size, dtype=np.uint64)
+		bases = np.arange(size, dtype=np.uint64) * stride
+		out = np.empty(count, dtype=np.intp)
+		# Batches keep the temporaries in cache
+		for lo in range(0, count, BATCH):
+			n = min(BATCH, count - lo)
+			enc.update_into(zeros[:4 * n], words)
+			# Widen before multiplying: NumPy 1.x keeps uint32 * uint64-scalar in 32 bits,
+			# which wraps, and the shift would then zero every offset
+			pos = wide[:n]
+			np.multiply(words[:n], stride, out=pos, dtype=np.uint64)
+			pos >>= _S32
+			pos += bases[:n]
+			pos += np.uint64(start + lo) * stride
+			if skip_head:
+				# gaps[j] = head[j] - j; a slot moves up by one for every gap at or below it.
+				# Both are sorted, so cut the batch at each gap and repeat the running count.
+				cuts = np.searchsorted(pos, self._gaps)
+				pos += np.repeat(self._steps, np.diff(cuts, prepend=0, append=n))
+			out[lo:lo + n] = pos
+		return out
+
+	def data(self, m: int, start: int = 0, count: Optional[int] = None) -> np.ndarray:
+		"""Cover indices of payload samples ``start .. start + count`` out of ``m``."""
+		count = m - start if count is None else count
+		return self._positions(self._keys[1], self.space, m, start, count, True)
+
+	def data_in(self, m: int, lo: int, hi: int) -> Tuple[np.ndarray, np.ndarray]:
+		"""``(sample numbers, cover indices)`` of the payload samples that fall in ``lo .. hi``."""
+		if not m:
+			return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+		# Convert to payload slots, then take the strata that can reach into the range
+		slot_lo = lo - int(np.searchsorted(self.head, lo))
+		slot_hi = hi - int(np.searchsorted(self.head, hi))
+		stride = self.space // m
+		first = min(m, slot_lo // stride)
+		last = min(m, -(-slot_hi // stride))
+		idx = self.data(m, first, last - first)
+		inside = np.flatnonzero((idx >= lo) & (idx < hi))
+		return inside + first, idx[inside]
+
+
+def write_scattered(flat: np.ndarray, data: bytes, scatter: Scatter, depth: int = 1) -> None:
+	"""Write the payload header and ``data`` at the keyed positions of ``flat``.
+
+	The carrier samples are gathered, written with the sequential code and scattered
+	back; the rest of ``flat`` is never read or written.
+	"""
+	seg = flat[scatter.head]
+	write_header(seg, len(data), depth, keyed=True)
+	flat[scatter.head] = seg
+	idx = scatter.data(-(-len(data) * 8 // depth))
+	seg = flat[idx]
+	write_lsb(seg, data, 0, depth)
+	flat[idx] = seg
+
+
+def read_scattered_header(flat: np.ndarray, scatter: Scatter) -> Optional[Tuple[int, int]]:
+	"""``(length, depth)`` of a keyed payload, or None if ``scatter`` finds no header."""
+	seg = flat[scatter.head]
+	head = read_lsb(seg, 3)
+	if head[:2] != DEPTH_MAGIC or not 1 <= head[2] <= MAX_DEPTH:
+		return None
+	length, depth, _ = read_header(seg)
+	return length, depth
+
+
+def read_scattered(
+	flat: np.ndarray,
+	scatter: Scatter,
+	length: int,
+	depth: int = 1,
+	start: int = 0,
+	n_bytes: Optional[int] = None,
+) -> bytes:
+	"""Read bytes ``start .. start + n_bytes`` of a keyed payload of ``length`` bytes.
+
+	``start`` must fall on a sample boundary (a multiple of ``depth`` bits).
+	"""
+	n_bytes = length - start if n_bytes is None else n_bytes
+	m = -(-length * 8 // depth)
+	first = start * 8 // depth
+	idx = scatter.data(m, first, min(m, first + -(-n_bytes * 8 // depth)) - first)
+	return read_lsb(flat[idx], n_bytes, 0, depth)
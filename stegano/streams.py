@@ -0,0 +1,214 @@
+import contextlib
+import io
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, Union
+
+# Anything the embed/extract functions accept as media input: a path, an in-memory
+# buffer, or a seekable binary file object (e.g. Werkzeug's upload stream)
+Source = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+Sink = Union[str, os.PathLike, BinaryIO]
+
+
+def is_path(src) -> bool:
+	return isinstance(src, (str, os.PathLike))
+
+
+@contextlib.contextmanager
+def open_source(src: Source) -> Iterator[BinaryIO]:
+	"""Yield ``src`` as a binary file positioned at its start.
+
+	Paths are opened (and closed afterwards), buffers are wrapped without copying
+	bytes, and caller-owned file objects are rewound but left open.
+	"""
+	if is_path(src):
+		with open(src, 'rb') as f:
+			yield f
+	elif isinstance(src, (bytes, bytearray, memoryview)):
+		yield io.BytesIO(src)
+	else:
+		src.seek(0)
+		yield src
+
+
+@contextlib.contextmanager
+def open_sink(dst: Sink) -> Iterator[BinaryIO]:
+	"""Yield a writable binary file for ``dst``; only paths are opened and closed here."""
+	if is_path(dst):
+		with open(dst, 'wb') as f:
+			yield f
+	else:
+		yield dst
+
+
+def _file_path(src) -> Optional[str]:
+	"""A path that opens the file behind ``src``, if it is backed by one.
+
+	A rolled-over SpooledTemporaryFile (how Werkzeug spools large uploads) is reached
+	through ``/proc/<pid>/fd``, which also works for unlinked files and in child
+	processes such as ffmpeg; one still in memory has no path.
+	"""
+	if isinstance(src, tempfile.SpooledTemporaryFile):
+		if not src._rolled:
+			return None
+		src = src._file
+	try:
+		src.flush()
+		fd = src.fileno()
+	except (AttributeError, OSError, io.UnsupportedOperation):
+		return None
+	path = f'/proc/{os.getpid()}/fd/{fd}'
+	if os.path.exists(path):
+		return path
+	name = getattr(src, 'name', None)
+	return name if isinstance(name, str) and os.path.isfile(name) else None
+
+
+@contextlib.contextmanager
+def source_path(src: Source, suffix: str = '', dir: Optional[str] = None) -> Iterator[str]:
+	"""Yield a filesystem path for ``src``, spilling buffers and in-memory streams to a
+	temp file; files (including spooled uploads on disk) are used in place.
+
+	For libraries such as OpenCV and ffmpeg that only open paths.
+	"""
+	if is_path(src):
+		yield os.fspath(src)
+		return
+	if not isinstance(src, (bytes, bytearray, memoryview)):
+		path = _file_path(src)
+		if path is not None:
+			yield path
+			return
+	tmp = tempfile.NamedTemporaryFile(suffix=suffix, dir=dir, delete=False)
+	try:
+		with tmp, open_source(src) as f:
+			shutil.copyfileobj(f, tmp, 1024 * 1024)
+		yield tmp.name
+	finally:
+		os.remove(tmp.name)
+
+
+class IterReader(io.RawIOBase):
+	"""Expose an iterator of byte chunks as a readable file object (e.g. for ``send_file``)."""
+
+	def __init__(self, chunks: Iterable[bytes], on_close: Optional[Callable[[], None]] = None):
+		super().__init__()
+		self._chunks = iter(chunks)
+		self._buf = memoryview(b'')
+		self._on_close = on_close
+
+	def readable(self) -> bool:
+		return True
+
+	def readinto(self, b) -> int:
+		while not self._buf:
+			chunk = next(self._chunks, None)
+			if chunk is None:
+				return 0
+			self._buf = memoryview(chunk)
+		n = min(len(b), len(self._buf))
+		b[:n] = self._buf[:n]
+		self._buf = self._buf[n:]
+		return n
+
+	def close(self) -> None:
+		if not self.closed and self._on_close is not None:
+			self._on_close()
+		super().close()
+
+
+class ChunkSink(io.RawIOBase):
+	"""Unseekable write target whose buffered bytes are handed out by ``drain`` (e.g. a streamed ZIP)."""
+
+	def __init__(self):
+		super().__init__()
+		self._chunks = []
+
+	def writable(self) -> bool:
+		return True
+
+	def write(self, b) -> int:
+		self._chunks.append(bytes(b))
+		return len(b)
+
+	def drain(self) -> bytes:
+		out = b''.join(self._chunks)
+		self._chunks.clear()
+		return out
+
+
+def iter_chunks(f: BinaryIO, chunk_size: int = 1024 * 1024, on_close: Optional[Callable[[], None]] = None) -> Iterator[bytes]:
+	"""Yield ``f`` from its current position in chunks, then close it (and call ``on_close``)."""
+	try:
+		yield from iter(lambda: f.read(chunk_size), b'')
+	finally:
+		f.close()
+		if on_close is not None:
+			on_close()
+
+
+class _QueueWriter(io.RawIOBase):
+	"""Write end of ``iter_writes``: each write is handed to the reader through a bounded queue."""
+
+	def __init__(self, q: queue.Queue, stop: threading.Event):
+		super().__init__()
+		self._q = q
+		self._stop = stop
+
+	def writable(self) -> bool:
+		return True
+
+	def write(self, b) -> int:
+		chunk = bytes(b)
+		while not self._stop.is_set():
+			try:
+				self._q.put(chunk, timeout=0.1)
+				return len(chunk)
+			except queue.Full:
+				continue
+		raise BrokenPipeError('Reader stopped before the writer finished')
+
+
+_DONE = object()
+
+
+def iter_writes(produce: Callable[[BinaryIO], None], chunk_size: int = 1024 * 1024, max_chunks: int = 4) -> Iterator[bytes]:
+	"""Yield what ``produce(f)`` writes to ``f`` while it runs in a worker thread.
+
+	Writes are coalesced into ``chunk_size`` pieces and at most ``max_chunks`` wait in
+	the queue, so a slow reader throttles the writer. The worker starts on the first
+	``next``; an exception in ``produce`` is re-raised to the reader, and closing the
+	iterator early stops ``produce`` at its next write.
+	"""
+	q: queue.Queue = queue.Queue(max_chunks)
+	stop = threading.Event()
+
+	def run():
+		try:
+			with io.BufferedWriter(_QueueWriter(q, stop), chunk_size) as f:
+				produce(f)
+			end = _DONE
+		except BaseException as e:  # surfaced to the reader
+			end = e
+		while not stop.is_set():
+			try:
+				q.put(end, timeout=0.1)
+				return
+			except queue.Full:
+				continue
+
+	thread = threading.Thread(target=run, daemon=True)
+	thread.start()
+	try:
+		while True:
+			item = q.get()
+			if item is _DONE:
+				return
+			if isinstance(item, BaseException):
+				raise item
+			yield item
+	finally:
+		stop.set()
@@ -1,39 +1,211 @@
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
 import cv2
 import numpy as np
 
+from .lsb import check_depth, read_length, read_lsb, write_lsb
+from .media import find_ffmpeg
+from .scatter import Scatter
+from .streams import Source, source_path
+
+
+# Multi-frame layout. Frame 0 carries MAGIC + total length, and every carrier
+# frame (0 included) carries its 4-byte frame index ahead of its payload chunk.
+# Videos whose first frame lacks the magic use the legacy single-frame layout.
+# With more than one bit per channel value, frame 0 starts with DEPTH_MAGIC, the
+# depth and three reserved bytes at one bit per value; everything after that,
+# and every later frame, is written at the chosen depth. With a scatter key every
+# frame is written at keyed positions (an independent layout per frame index):
+# frame 0 keeps the DEPTH_MAGIC marker and the length at one bit per value in its
+# keyed header positions, and the index and chunk at depth in the payload positions.
+FRAME_MAGIC = b'SVMF'
+DEPTH_MAGIC = b'SVMD'
+FRAME_HEAD = 4
+LENGTH_HEAD = 4
+KEYED_HEAD = 8 + LENGTH_HEAD
+MAX_DEPTH = 4
+
+# Writer codecs in order of preference. Only codecs that round-trip LSBs bit-exactly
+# in the startup probe are treated as lossless; MJPG/mp4v are a last resort.
+LOSSLESS_CODECS = ['FFV1', 'HFYU', 'LAGS']
+LOSSY_CODECS = ['MJPG', 'mp4v']
+RESOLUTION_CLASSES = {'sd': (640, 480), 'hd': (1920, 1080), 'uhd': (3840, 2160)}
+PROBE_SIZE = (160, 120)
+_codec_cache: Dict[Tuple[str, str], Dict[str, object]] = {}
+_codec_lock = threading.Lock()
+
+# Frames buffered between decode -> embed -> encode; bounds memory to ~2x this many frames
+PIPELINE_DEPTH = 8
+_END = object()
+
+
+def _marker(depth: int, keyed: bool = False) -> bytes:
+	return FRAME_MAGIC if depth == 1 and not keyed else DEPTH_MAGIC + bytes([depth, 0, 0, 0])
+
+
+def _frame_layout(width: int, height: int, depth: int = 1, keyed: bool = False) -> Tuple[int, int]:
+	"""Payload bytes carried by frame 0 and by each later frame, headers excluded."""
+	values = width * height * 3
+	if keyed:
+		first = (values - KEYED_HEAD * 8) * depth // 8 - FRAME_HEAD
+	else:
+		first = (values - len(_marker(depth)) * 8) * depth // 8 - LENGTH_HEAD - FRAME_HEAD
+	return first, values * depth // 8 - FRAME_HEAD
+
+
+def _frames_needed(payload_len: int, first: int, other: int) -> int:
+	if payload_len <= first:
+		return 1
+	return 1 + -(-(payload_len - first) // other)
+
+
+def _frame_chunks(payload: bytes, first: int, other: int):
+	"""Yield ``(index, data)`` for each carrier frame; data includes the length/index heads."""
+	pos = 0
+	for index in range(_frames_needed(len(payload), first, other)):
+		head = index.to_bytes(FRAME_HEAD, 'big')
+		if index == 0:
+			head = len(payload).to_bytes(LENGTH_HEAD, 'big') + head
+		take = first if index == 0 else other
+		yield index, head + payload[pos:pos + take]
+		pos += take
+
+
+def _scatter(flat: np.ndarray, index: int, key: bytes) -> Scatter:
+	"""Keyed layout of frame ``index``; only frame 0 has header positions."""
+	return Scatter(key, flat.size, index.to_bytes(FRAME_HEAD, 'big'), KEYED_HEAD * 8 if index == 0 else 0)
+
+
+def _write_frame(frame: np.ndarray, index: int, data: bytes, depth: int, key: Optional[bytes] = None) -> None:
+	flat = frame.reshape(-1)
+	if key is None:
+		# A slice of the frame is a view, so this writes in place
+		offset = write_lsb(flat, _marker(depth)) if index == 0 else 0
+		write_lsb(flat, data, offset, depth)
+		return
+	scatter = _scatter(flat, index, key)
+	if index == 0:
+		seg = flat[scatter.head]
+		write_lsb(seg, _marker(depth, True) + data[:LENGTH_HEAD])
+		flat[scatter.head] = seg
+		data = data[LENGTH_HEAD:]
+	idx = scatter.data(-(-len(data) * 8 // depth))
+	seg = flat[idx]
+	write_lsb(seg, data, 0, depth)
+	flat[idx] = seg
+
 
-def _bytes_to_bits(data: bytes):
-	for byte in data:
-		for i in range(8):
-			yield (byte >> (7 - i)) & 1
+def _resolution_class(width: int, height: int) -> str:
+	pixels = width * height
+	for name, (w, h) in RESOLUTION_CLASSES.items():
+		if pixels <= w * h:
+			return name
+	return name
 
 
-def _bits_to_bytes(bits):
-	b = 0
-	count = 0
-	for bit in bits:
-		b = (b << 1) | bit
-		count += 1
-		if count == 8:
-			yield b
-			b = 0
-			count = 0
+def _roundtrips(container: str, codec: str, width: int, height: int, check_lsb: bool = True) -> bool:
+	"""Encode two noise frames with ``codec`` and check every LSB survives decoding."""
+	rng = np.random.default_rng(0)
+	frames = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(2)]
+	fd, path = tempfile.mkstemp(suffix=container)
+	os.close(fd)
+	try:
+		out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), 25.0, (width, height))
+		if not out.isOpened():
+			return False
+		if not check_lsb:
+			out.release()
+			return True
+		for frame in frames:
+			out.write(frame)
+		out.release()
+		cap = cv2.VideoCapture(path)
+		try:
+			for frame in frames:
+				ok, decoded = cap.read()
+				if not ok or decoded.shape != frame.shape or not np.array_equal(decoded & 1, frame & 1):
+					return False
+		finally:
+			cap.release()
+		return True
+	except cv2.error:
+		return False
+	finally:
+		if os.path.exists(path):
+			os.remove(path)
+
+
+def _probe(container: str, res_class: str) -> Dict[str, object]:
+	width, height = RESOLUTION_CLASSES[res_class]
+	# Bit-exactness does not depend on frame size, so it is checked on a small frame and
+	# the class resolution only has to open
+	lossless = [
+		name for name in LOSSLESS_CODECS
+		if _roundtrips(container, name, *PROBE_SIZE) and _roundtrips(container, name, width, height, check_lsb=False)
+	]
+	if lossless:
+		return {'codec': lossless[0], 'lossless': True, 'available': lossless}
+	# Nothing keeps LSBs intact; fall back to whatever this build can at least open
+	for name in LOSSY_CODECS:
+		if _roundtrips(container, name, width, height, check_lsb=False):
+			return {'codec': name, 'lossless': False, 'available': []}
+	return {'codec': None, 'lossless': False, 'available': []}
+
+
+def select_codec(container: str, width: int, height: int) -> Optional[str]:
+	"""Return the cached codec for this container and resolution class, probing on first use."""
+	key = (container.lower(), _resolution_class(width, height))
+	with _codec_lock:
+		if key not in _codec_cache:
+			_codec_cache[key] = _probe(*key)
+		return _codec_cache[key]['codec']
+
+
+def probe_codecs(containers=('.avi',), classes=None) -> Dict[str, Dict[str, object]]:
+	"""Probe every container/resolution class up front (e.g. at startup) and return the report."""
+	for container in containers:
+		for res_class in classes or RESOLUTION_CLASSES:
+			width, height = RESOLUTION_CLASSES[res_class]
+			select_codec(container, width, height)
+	return codec_report()
+
+
+def codec_report() -> Dict[str, Dict[str, object]]:
+	with _codec_lock:
+		return {f'{container}/{res_class}': dict(entry) for (container, res_class), entry in _codec_cache.items()}
 
 
-def _open_writer(output_path: str, fps: float, width: int, height: int):
-	"""Try multiple codecs favoring lossless/near-lossless to preserve LSBs."""
-	# Prefer FFV1/HuffYUV/Lagarith/MJPG; fallback to mp4v
+def _open_writer(output_path: str, fps: float, width: int, height: int, lossless: bool = False):
+	"""Open a writer with the cached best codec, falling back through the rest in order.
+
+	With ``lossless``, the lossy last resorts are not tried. Returns ``(writer, codec_name)``.
+	"""
+	container = os.path.splitext(output_path)[1] or '.avi'
+	codecs = LOSSLESS_CODECS if lossless else LOSSLESS_CODECS + LOSSY_CODECS
+	preferred = select_codec(container, width, height)
+	order = [preferred] if preferred in codecs else []
+	order += [name for name in codecs if name != preferred]
 	tried = []
-	for name in ['FFV1', 'HFYU', 'LAGS', 'MJPG', 'mp4v']:
+	for name in order:
 		fourcc = cv2.VideoWriter_fourcc(*name)
 		out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
 		tried.append(name)
 		if out.isOpened():
-			return out
+			return out, name
 	raise ValueError(f"Unable to open VideoWriter for '{output_path}'. Tried: {', '.join(tried)}")
 
 
-def embed_in_video(video_path: str, payload: bytes, output_path: str) -> None:
+def _open_cover(video_path: str, payload_len: int, depth: int = 1, keyed: bool = False):
+	"""Open the cover and check it has enough frames.
+
+	Returns ``(cap, fps, width, height, layout, needed_frames)``; see ``_frame_layout``.
+	"""
 	cap = cv2.VideoCapture(video_path)
 	if not cap.isOpened():
 		raise ValueError('Cannot open video')
@@ -41,72 +213,344 @@ def embed_in_video(video_path: str, payload: bytes, output_path: str) -> None:
 	fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
 	width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
 	height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-	out = _open_writer(output_path, fps, width, height)
+	frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+	layout = _frame_layout(width, height, depth, keyed)
+	if min(layout) <= 0:
+		cap.release()
+		raise ValueError('Video frames are too small to carry a payload')
+	needed_frames = _frames_needed(payload_len, *layout)
+	# The container frame count can be approximate; running out of frames is caught while embedding too
+	if frame_count > 0 and needed_frames > frame_count:
+		cap.release()
+		raise ValueError(f'Payload too large for video capacity ({needed_frames} frames needed, {frame_count} available)')
+	return cap, fps, width, height, layout, needed_frames
+
+
+def video_capacity(video: Source, tmp_dir: Optional[str] = None, depth: int = 1, keyed: bool = False) -> Dict[str, object]:
+	"""Payload capacity from the container's frame count and resolution; nothing is decoded.
+
+	The frame count is what the container reports, which can be approximate for some formats.
+	"""
+	check_depth(depth, MAX_DEPTH)
+	with source_path(video, dir=tmp_dir) as video_path:
+		cap = cv2.VideoCapture(video_path)
+		try:
+			if not cap.isOpened():
+				raise ValueError('Cannot open video')
+			fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+			width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+			height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+			frames = max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+		finally:
+			cap.release()
+	first, other = _frame_layout(width, height, depth, keyed)
+	usable = first + (frames - 1) * other if frames and min(first, other) > 0 else 0
+	return {
+		'media': 'video', 'width': width, 'height': height, 'fps': fps, 'frames': frames, 'depth': depth,
+		'capacity_bits': frames * width * height * 3 * depth, 'capacity_bytes': usable,
+	}
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+	"""Blocking put that gives up once another stage has failed."""
+	while not stop.is_set():
+		try:
+			q.put(item, timeout=0.1)
+			return True
+		except queue.Full:
+			continue
+	return False
 
-	ok, frame = cap.read()
-	if not ok:
+
+def _get(q: queue.Queue, stop: threading.Event):
+	while not stop.is_set():
+		try:
+			return q.get(timeout=0.1)
+		except queue.Empty:
+			continue
+	return _END
+
+
+def _run_stage(target, errors: list, stop: threading.Event):
+	def run():
+		try:
+			target()
+		except BaseException as e:  # surfaced to the caller after join
+			errors.append(e)
+			stop.set()
+	thread = threading.Thread(target=run, daemon=True)
+	thread.start()
+	return thread
+
+
+def embed_in_video(
+	video: Source,
+	payload: bytes,
+	output_path: str,
+	queue_depth: int = PIPELINE_DEPTH,
+	tmp_dir: Optional[str] = None,
+	depth: int = 1,
+	key: Optional[bytes] = None,
+) -> Dict[str, object]:
+	"""Re-encode ``video`` into ``output_path`` with ``payload`` in the leading frames.
+
+	Decode, embed and encode run as a pipeline: a reader thread decodes into a bounded
+	queue, the calling thread embeds into the carrier frames only, and a writer thread
+	encodes. OpenCV releases the GIL while decoding and encoding, so the stages overlap.
+	Returns frame counts, elapsed seconds and the achieved frames per second.
+	OpenCV only reads paths, so buffers and streams are spilled to ``tmp_dir`` first.
+	``depth`` low bits of each channel value are used (1-4); with ``key`` they go to
+	keyed positions spread over each carrier frame.
+	"""
+	check_depth(depth, MAX_DEPTH)
+	with source_path(video, dir=tmp_dir) as video_path:
+		return _embed_in_video_file(video_path, payload, output_path, queue_depth, depth, key)
+
+
+def _embed_in_video_file(
+	video_path: str,
+	payload: bytes,
+	output_path: str,
+	queue_depth: int,
+	depth: int,
+	key: Optional[bytes],
+) -> Dict[str, object]:
+	cap, fps, width, height, layout, needed_frames = _open_cover(video_path, len(payload), depth, key is not None)
+	out, codec = _open_writer(output_path, fps, width, height)
+	decoded: queue.Queue = queue.Queue(maxsize=queue_depth)
+	encoded: queue.Queue = queue.Queue(maxsize=queue_depth)
+	stop = threading.Event()
+	errors: list = []
+	written = [0]
+
+	def read_frames():
+		while not stop.is_set():
+			ok, frame = cap.read()
+			if not ok:
+				break
+			if not _put(decoded, frame, stop):
+				return
+		_put(decoded, _END, stop)
+
+	def write_frames():
+		while True:
+			frame = _get(encoded, stop)
+			if frame is _END:
+				return
+			out.write(frame)
+			written[0] += 1
+
+	start = time.perf_counter()
+	reader = _run_stage(read_frames, errors, stop)
+	writer = _run_stage(write_frames, errors, stop)
+	completed = False
+	try:
+		# Each carrier frame gets its whole chunk in one vectorized LSB write
+		for index, chunk in _frame_chunks(payload, *layout):
+			frame = _get(decoded, stop)
+			if frame is _END:
+				if not errors:
+					errors.append(ValueError('Payload too large for video capacity' if index else 'Empty video'))
+				break
+			_write_frame(frame, index, chunk, depth, key)
+			_put(encoded, frame, stop)
+		else:
+			# Remaining frames pass straight from the decoder to the encoder
+			while True:
+				frame = _get(decoded, stop)
+				if frame is _END:
+					break
+				_put(encoded, frame, stop)
+		_put(encoded, _END, stop)
+		completed = True
+	finally:
+		if errors or not completed:
+			stop.set()
+		writer.join()
+		stop.set()
+		reader.join()
 		cap.release()
 		out.release()
-		raise ValueError('Empty video')
-
-	# Embed into the first frame using 1 LSB across channels
-	head = len(payload).to_bytes(4, 'big')
-	data = head + payload
-	needed_bits = len(data) * 8
-	capacity_bits = width * height * 3
-	if needed_bits > capacity_bits:
+	if errors:
+		raise errors[0]
+
+	elapsed = time.perf_counter() - start
+	return {
+		'frames': written[0],
+		'carrier_frames': needed_frames,
+		'seconds': elapsed,
+		'fps': written[0] / elapsed if elapsed > 0 else 0.0,
+		'codec': codec,
+	}
+
+
+def embed_in_video_remux(
+	video: Source,
+	payload: bytes,
+	output_path: str,
+	ffmpeg: Optional[str] = None,
+	tmp_dir: Optional[str] = None,
+	depth: int = 1,
+	key: Optional[bytes] = None,
+) -> Dict[str, object]:
+	"""Embed by re-encoding only the carrier frames and stream-copying the cover.
+
+	The carrier frames are encoded losslessly into a short stream that is muxed as the
+	first video track of a Matroska ``output_path``; the cover's own video and audio
+	tracks are copied without decoding. OpenCV, and therefore ``extract_from_video``,
+	reads the first video track, while players default to the untouched cover track.
+	Cost scales with the payload size rather than the clip length.
+
+	The carrier is a separate track, not spliced into the cover's: one track has one
+	codec, and the cover's (lossy) codec would not keep the low bits. So remux needs a
+	lossless codec and raises ValueError when none is available, rather than writing a
+	file the payload can't be read back from.
+	"""
+	check_depth(depth, MAX_DEPTH)
+	ffmpeg = ffmpeg or find_ffmpeg()
+	if not ffmpeg:
+		raise ValueError('ffmpeg is required for remux mode')
+	with source_path(video, dir=tmp_dir) as video_path:
+		return _remux_file(video_path, payload, output_path, ffmpeg, depth, key)
+
+
+def _remux_file(video_path: str, payload: bytes, output_path: str, ffmpeg: str, depth: int, key: Optional[bytes]) -> Dict[str, object]:
+	start = time.perf_counter()
+	cap, fps, width, height, layout, needed_frames = _open_cover(video_path, len(payload), depth, key is not None)
+	carrier_path = os.path.splitext(output_path)[0] + '.carrier.avi'
+	try:
+		out, codec = _open_writer(carrier_path, fps, width, height, lossless=True)
+	except ValueError:
 		cap.release()
-		out.release()
-		raise ValueError('Payload too large for first frame capacity')
-
-	bits = list(_bytes_to_bits(data))
-	flat = frame.reshape(-1, 3)
-	for i in range(needed_bits):
-		channel = i % 3
-		pixel_index = i // 3
-		flat[pixel_index, channel] = (flat[pixel_index, channel] & 0xFE) | bits[i]
-	frame_embedded = flat.reshape(frame.shape)
-
-	out.write(frame_embedded)
-	while True:
-		ok, frame = cap.read()
-		if not ok:
-			break
-		out.write(frame)
+		raise ValueError(f"Remux needs a lossless video codec ({', '.join(LOSSLESS_CODECS)}); none is available") from None
+	first = None
+	try:
+		try:
+			for index, chunk in _frame_chunks(payload, *layout):
+				ok, frame = cap.read()
+				if not ok:
+					raise ValueError('Payload too large for video capacity' if index else 'Empty video')
+				_write_frame(frame, index, chunk, depth, key)
+				out.write(frame)
+				if first is None:
+					first = frame
+		finally:
+			cap.release()
+			out.release()
+
+		cmd = [
+			ffmpeg, '-nostdin', '-v', 'error', '-y',
+			'-i', carrier_path, '-i', video_path,
+			'-map', '0:v:0', '-map', '1:v:0', '-map', '1:a?',
+			'-c', 'copy',
+			'-disposition:v:0', '0', '-disposition:v:1', 'default',
+			'-f', 'matroska', output_path,
+		]
+		result = subprocess.run(cmd, capture_output=True)
+		if result.returncode != 0:
+			raise ValueError(f"ffmpeg remux failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+		# The first video track, which extraction reads, must decode to exactly the carrier frames
+		check = cv2.VideoCapture(output_path)
+		try:
+			ok, frame = check.read()
+		finally:
+			check.release()
+		if not ok or not np.array_equal(frame, first):
+			os.remove(output_path)
+			raise ValueError('Remuxed video does not keep the carrier frames intact')
+	finally:
+		if os.path.exists(carrier_path):
+			os.remove(carrier_path)
+
+	elapsed = time.perf_counter() - start
+	return {
+		'frames': needed_frames,
+		'carrier_frames': needed_frames,
+		'seconds': elapsed,
+		'fps': needed_frames / elapsed if elapsed > 0 else 0.0,
+		'codec': codec,
+	}
+
+
+def extract_from_video(video: Source, tmp_dir: Optional[str] = None, key: Optional[bytes] = None) -> bytes:
+	"""Read the payload; with ``key``, keyed placement is tried before the sequential layout."""
+	with source_path(video, dir=tmp_dir) as video_path:
+		return _extract_from_video_file(video_path, key)
+
+
+def _read_marker(flat: np.ndarray, key: Optional[bytes]) -> Optional[Tuple[int, Optional[int]]]:
+	"""``(depth, length)`` from frame 0's marker, or None for the legacy layout.
 
-	cap.release()
-	out.release()
+	``length`` is only known here for keyed placement, which is tried first when
+	``key`` is given; it is None for the sequential layout.
+	"""
+	if key is not None and flat.size >= KEYED_HEAD * 8:
+		head = read_lsb(flat[_scatter(flat, 0, key).head], KEYED_HEAD)
+		if head[:4] == DEPTH_MAGIC and 1 <= head[4] <= MAX_DEPTH:
+			return head[4], int.from_bytes(head[8:], 'big')
+	marker = read_lsb(flat, 5)
+	if marker[:4] == FRAME_MAGIC:
+		return 1, None
+	if marker[:4] == DEPTH_MAGIC:
+		if not 2 <= marker[4] <= MAX_DEPTH:
+			raise ValueError('Embedded data appears corrupted: invalid bit depth')
+		return marker[4], None
+	return None
 
 
-def extract_from_video(video_path: str) -> bytes:
+def _extract_from_video_file(video_path: str, key: Optional[bytes] = None) -> bytes:
 	cap = cv2.VideoCapture(video_path)
 	if not cap.isOpened():
 		raise ValueError('Cannot open video')
-	ok, frame = cap.read()
-	cap.release()
-	if not ok:
-		raise ValueError('Empty video')
-
-	flat = frame.reshape(-1, 3)
-	bits = []
-	for px in flat:
-		bits.extend([int(px[0] & 1), int(px[1] & 1), int(px[2] & 1)])
-
-	length_bits = bits[:32]
-	length = 0
-	for bit in length_bits:
-		length = (length << 1) | bit
-	
+	try:
+		ok, frame = cap.read()
+		if not ok:
+			raise ValueError('Empty video')
+
+		# Only the header and payload prefix of each frame is read back
+		flat = frame.reshape(-1)
+		found = _read_marker(flat, key)
+		if found is None:
+			return _extract_single_frame(flat)
+		depth, length = found
+		keyed = length is not None
+
+		height, width = frame.shape[:2]
+		first, other = _frame_layout(width, height, depth, keyed)
+		offset = len(_marker(depth)) * 8
+		# Sequential frame 0 has the length ahead of its index; later frames start with the index
+		head = 0 if keyed else LENGTH_HEAD
+		if not keyed:
+			length = read_length(flat, offset, depth)
+		parts = []
+		received = 0
+		for index in range(_frames_needed(length, first, other)):
+			if index:
+				ok, frame = cap.read()
+				if not ok:
+					raise ValueError(f'Embedded data is truncated: video ends before carrier frame {index}')
+				flat = frame.reshape(-1)
+				head = offset = 0
+			take = min(length - received, first if index == 0 else other)
+			n = head + FRAME_HEAD + take
+			if keyed:
+				data = read_lsb(flat[_scatter(flat, index, key).data(-(-n * 8 // depth))], n, 0, depth)
+			else:
+				data = read_lsb(flat, n, offset, depth)
+			if int.from_bytes(data[head:head + FRAME_HEAD], 'big') != index:
+				raise ValueError(f'Embedded data appears corrupted or altered by compression (frame {index})')
+			parts.append(data[head + FRAME_HEAD:])
+			received += take
+		return b''.join(parts)
+	finally:
+		cap.release()
+
+
+def _extract_single_frame(flat) -> bytes:
+	length = read_length(flat)
+
 	# Ensure we have enough bits for the payload; if not, data is corrupted
-	if 32 + length * 8 > len(bits):
+	if 32 + length * 8 > flat.size:
 		raise ValueError('Embedded data appears corrupted or truncated in the first frame')
-	
-	payload_bits = bits[32:32 + length * 8]
-	payload_bytes = list(_bits_to_bytes(payload_bits))
-	
-	# Make sure we have the expected number of bytes
-	if len(payload_bytes) < length:
-		raise ValueError('Embedded data appears corrupted or altered by compression')
-	
-	payload = bytes(payload_bytes)
-	return payload
+
+	return read_lsb(flat, length, 32)
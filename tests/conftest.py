@@ -0,0 +1,48 @@
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from stegano.jobs import JobManager  # noqa: E402
+from stegano.reaper import Quota, Reaper  # noqa: E402
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+	"""The app's upload, output and temp directories, moved under ``tmp_path``."""
+	paths = {}
+	for attr in ('UPLOAD_DIR', 'OUTPUT_DIR', 'TEMP_DIR'):
+		path = tmp_path / attr[:-len('_DIR')].lower()
+		path.mkdir()
+		monkeypatch.setattr(app, attr, str(path))
+		paths[attr] = str(path)
+	# Never started; tests run reaper passes themselves
+	monkeypatch.setattr(app, 'reaper', Reaper({path: Quota() for path in paths.values()}))
+	return paths
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+	manager = JobManager(max_workers=1, max_queued=8)
+	monkeypatch.setattr(app, 'jobs', manager)
+	yield manager
+	manager.shutdown()
+
+
+@pytest.fixture
+def client(dirs, jobs):
+	return app.app.test_client()
+
+
+@pytest.fixture
+def cover_png():
+	pixels = np.random.default_rng(0).integers(0, 256, (48, 64, 3), dtype=np.uint8)
+	buf = io.BytesIO()
+	Image.fromarray(pixels).save(buf, 'PNG')
+	return buf.getvalue()
@@ -0,0 +1,36 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from stegano import audio_lsb
+
+
+def _wav(sampwidth: int, frames: int = 4000) -> bytes:
+	buf = io.BytesIO()
+	with wave.open(buf, 'wb') as w:
+		w.setnchannels(1)
+		w.setsampwidth(sampwidth)
+		w.setframerate(8000)
+		w.writeframes(np.random.default_rng(0).integers(0, 256, frames * sampwidth, dtype=np.uint8).tobytes())
+	return buf.getvalue()
+
+
+def test_depth_is_capped_per_sample_width():
+	assert audio_lsb.max_depth(1) == 7
+	assert audio_lsb.max_depth(2) == audio_lsb.MAX_DEPTH
+	with pytest.raises(ValueError, match='between 1 and 7'):
+		audio_lsb.wav_capacity(_wav(1), depth=8)
+	with pytest.raises(ValueError, match='between 1 and 7'):
+		audio_lsb.embed_in_wav(_wav(1), b'secret', depth=8)
+	assert audio_lsb.wav_capacity(_wav(1), depth=7)['capacity_bits'] == 4000 * 7
+	assert audio_lsb.wav_capacity(_wav(2), depth=8)['capacity_bits'] == 4000 * 8
+
+
+def test_capacity_endpoint_rejects_too_deep(client):
+	r = client.post('/api/capacity', data={'cover': (io.BytesIO(_wav(1)), 'a.wav'), 'depth': '8'})
+	assert r.status_code == 400
+	assert 'between 1 and 7' in r.get_json()['error']
+	r = client.post('/api/capacity', data={'cover': (io.BytesIO(_wav(2)), 'a.wav'), 'depth': '8'})
+	assert r.status_code == 200
@@ -0,0 +1,48 @@
+import io
+import json
+import os
+import zipfile
+
+
+def _covers(cover_png, n):
+	return [(io.BytesIO(cover_png), f'c{i}.png') for i in range(n)]
+
+
+def _empty(dirs):
+	return not any(os.listdir(path) for path in dirs.values())
+
+
+def test_batch_is_zipped_with_manifest(client, dirs, cover_png):
+	r = client.post('/api/embed/batch', data={'covers': _covers(cover_png, 2), 'secret_text': 'batch', 'password': 'pw'})
+	assert r.status_code == 200
+	with zipfile.ZipFile(io.BytesIO(r.data)) as zf:
+		assert sorted(zf.namelist()) == ['c0_stego.png', 'c1_stego.png', 'manifest.json']
+		manifest = json.loads(zf.read('manifest.json'))
+	assert [entry['status'] for entry in manifest] == ['done', 'done']
+	assert sorted(entry['cover'] for entry in manifest) == ['c0.png', 'c1.png']
+	assert _empty(dirs)
+
+
+def test_finished_jobs_keep_no_secrets(client, jobs, cover_png, monkeypatch):
+	r = client.post('/api/embed/batch', data={'covers': _covers(cover_png, 2), 'secret_text': 'batch', 'password': 'pw'})
+	assert r.status_code == 200
+	r.get_data()  # the ZIP streams as the jobs finish
+	finished = list(jobs._jobs.values())
+	assert len(finished) == 2
+	# The password's key and the secret went to the workers; only results and labels stay
+	assert all(job.fn is None and job.kwargs is None for job in finished)
+	# Finished jobs also expire when looked up, not only on the next submit
+	monkeypatch.setattr('stegano.jobs.JOB_TTL', -1)
+	assert jobs.get(finished[0].id) is None
+	assert not jobs._jobs
+
+
+def test_batch_over_queue_limit_is_refused_whole(client, jobs, dirs, cover_png):
+	jobs.max_queued = 2
+	r = client.post('/api/embed/batch', data={'covers': _covers(cover_png, 3), 'secret_text': 'batch', 'password': 'pw'})
+	assert r.status_code == 429
+	assert r.headers['Retry-After'] == '5'
+	# Nothing was queued, and the saved uploads and the batch directory are gone
+	assert jobs.stats()['queued'] == 0
+	assert jobs.stats()['kinds'] == {}
+	assert _empty(dirs)
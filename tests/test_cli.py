@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from stegano.cli import main
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def covers(tmp_path, cover_png):
+	folder = tmp_path / 'covers'
+	folder.mkdir()
+	for name in ('a.png', 'b.png'):
+		(folder / name).write_bytes(cover_png)
+	return str(folder)
+
+
+@pytest.fixture(autouse=True)
+def password(monkeypatch):
+	monkeypatch.setenv('STEGANO_PASSWORD', 'pw')
+
+
+def test_embed_then_extract(tmp_path, covers, capsys):
+	stego, plain = str(tmp_path / 'stego'), str(tmp_path / 'plain')
+	assert main(['embed', covers, '-t', 'from the cli', '-o', stego, '-j', '1']) == 0
+	assert sorted(os.listdir(stego)) == ['a_stego.png', 'b_stego.png']
+	assert main(['extract', stego, '-o', plain, '-j', '1']) == 0
+	assert sorted(os.listdir(plain)) == ['a_stego_secret.txt', 'b_stego_secret.txt']
+	with open(os.path.join(plain, 'a_stego_secret.txt'), 'rb') as f:
+		assert f.read() == b'from the cli'
+	assert '2 ok, 0 failed' in capsys.readouterr().out
+
+
+def test_failed_files_exit_1(tmp_path, covers, capsys):
+	# The covers carry no payload
+	assert main(['extract', covers, '-o', str(tmp_path / 'plain'), '-j', '1']) == 1
+	err = capsys.readouterr().err
+	assert err.count('FAIL') == 2
+	assert os.listdir(tmp_path / 'plain') == []
+
+
+def test_bad_input_exits_2(tmp_path, covers, capsys):
+	assert main(['embed', str(tmp_path / 'missing.png'), '-t', 'x', '-o', str(tmp_path / 'out')]) == 2
+	assert main(['embed', covers, '-t', 'x', '-o', str(tmp_path / 'out'), '--depth', '9']) == 2
+	assert 'error:' in capsys.readouterr().err
+	with pytest.raises(SystemExit) as exc:
+		main(['embed', covers, '-o', str(tmp_path / 'out')])
+	assert exc.value.code == 2
+
+
+def test_capacity(tmp_path, covers, capsys):
+	assert main(['capacity', covers, '--secret-size', '100']) == 0
+	assert capsys.readouterr().out.count('yes') == 2
+	(tmp_path / 'covers' / 'broken.png').write_bytes(b'not a png')
+	assert main(['capacity', os.path.join(covers, '*.png'), '--json']) == 1
+	out, err = capsys.readouterr()
+	assert out.count('"capacity_bytes"') == 2
+	assert 'FAIL' in err and 'broken.png' in err
+
+
+def test_module_entry_point(covers):
+	result = subprocess.run([sys.executable, '-m', 'stegano', 'capacity', covers, '--json'], cwd=ROOT, capture_output=True)
+	assert result.returncode == 0
+	assert result.stdout.count(b'"capacity_bytes"') == 2
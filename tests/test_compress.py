@@ -0,0 +1,58 @@
+import io
+import os
+
+import pytest
+
+from stegano.compress import CODEC_NAMES, CODEC_NONE, available_codecs, compress_stream, decompress_stream
+from stegano.container import open_payload, read_header
+from stegano.pipeline import build_container
+
+TEXT = b'The quick brown fox jumps over the lazy dog. ' * 20000
+
+
+def _chunks(f, size: int = 1000):
+	return iter(lambda: f.read(size), b'')
+
+
+@pytest.mark.parametrize('codec', available_codecs())
+def test_codecs_round_trip(codec):
+	cid, out, size = compress_stream(io.BytesIO(TEXT), len(TEXT), CODEC_NAMES[codec])
+	assert cid == codec
+	assert size < len(TEXT) // 10
+	assert b''.join(decompress_stream(_chunks(out), cid)) == TEXT
+
+
+def test_incompressible_data_is_stored():
+	data = os.urandom(100000)
+	src = io.BytesIO(data)
+	cid, out, size = compress_stream(src, len(data), 'zlib')
+	assert (cid, out, size) == (CODEC_NONE, src, len(data))
+	assert out.tell() == 0
+
+
+@pytest.mark.parametrize('compression, data, stored', [
+	('none', TEXT, False),
+	('auto', TEXT, True),
+	('auto', os.urandom(100000), False),
+])
+def test_selection_is_recorded_in_the_header(compression, data, stored):
+	container = build_container(io.BytesIO(data), len(data), 'data.bin', password='pw', compression=compression).read()
+	src = io.BytesIO(container)
+	header = read_header(src)
+	assert (header.codec != CODEC_NONE) == stored
+	assert (len(container) < len(data)) == stored
+	assert b''.join(decompress_stream(open_payload(header, src, password='pw'), header.codec)) == data
+
+
+@pytest.mark.parametrize('codec', available_codecs())
+def test_decompression_is_bounded(codec):
+	# 64 MiB of zeros compresses to a few KiB
+	bomb = b'\0' * (64 * 1024 * 1024)
+	cid, out, size = compress_stream(io.BytesIO(bomb), len(bomb), CODEC_NAMES[codec])
+	assert size < 1024 * 1024
+	pieces = decompress_stream(_chunks(out, 4096), cid, max_size=1024 * 1024)
+	with pytest.raises(ValueError, match='more than 1048576 bytes'):
+		for piece in pieces:
+			assert len(piece) <= 64 * 1024
+	out.seek(0)
+	assert sum(map(len, decompress_stream(_chunks(out), cid, max_size=len(bomb)))) == len(bomb)
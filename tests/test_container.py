@@ -0,0 +1,74 @@
+import io
+import json
+
+import pytest
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from stegano.container import MAGIC, ContainerError, open_payload, read_header, seal
+from stegano.crypto import encrypt_stream_aes, encrypt_with_aes
+from stegano.image_lsb import embed_in_image
+
+
+def _v1(secret: bytes, encrypted: bytes, scheme: str) -> bytes:
+	"""A container as the JSON framing wrote them before v2."""
+	head = {
+		'version': 1,
+		'ts': '2024-01-01T00:00:00Z',
+		'secret_meta': {'filename': 'notes.txt', 'type': 'text'},
+		'encryption': {'scheme': scheme},
+	}
+	return json.dumps(head).encode('utf-8') + b'\n\n' + encrypted
+
+
+def _open(container: bytes, **keys) -> bytes:
+	src = io.BytesIO(container)
+	header = read_header(src)
+	return b''.join(open_payload(header, src, **keys))
+
+
+def test_v1_json_containers_still_open():
+	secret = b'written before v2' * 100
+	stream = _v1(secret, encrypt_stream_aes(io.BytesIO(secret), len(secret), 'pw').read(), 'aes-gcm-stream')
+	oneshot = _v1(secret, encrypt_with_aes(secret, 'pw'), 'aes-gcm')
+	for container in (stream, oneshot):
+		header = read_header(io.BytesIO(container))
+		assert (header.version, header.filename, header.kind) == (1, 'notes.txt', 'text')
+		assert _open(container, password='pw') == secret
+
+
+def test_v1_container_extracts_through_the_api(client, cover_png):
+	secret = b'legacy stego file'
+	container = _v1(secret, encrypt_stream_aes(io.BytesIO(secret), len(secret), 'pw').read(), 'aes-gcm-stream')
+	stego = embed_in_image(io.BytesIO(cover_png), container)
+	r = client.post('/api/extract', data={'stego': (io.BytesIO(stego), 'old.png'), 'password': 'pw'})
+	assert r.status_code == 200
+	assert r.data == secret
+	assert 'notes.txt' in r.headers['Content-Disposition']
+
+
+def test_v2_round_trip_with_password():
+	secret = b'binary container' * 1000
+	container = seal(io.BytesIO(secret), len(secret), 'report.pdf', 'file', password='pw', chunk_size=4096).read()
+	assert container.startswith(MAGIC)
+	header = read_header(io.BytesIO(container))
+	assert (header.version, header.scheme, header.filename, header.kind) == (2, 'aes-gcm-stream', 'report.pdf', 'file')
+	assert _open(container, password='pw') == secret
+	with pytest.raises(InvalidTag):
+		_open(container, password='wrong')
+	with pytest.raises(ContainerError):
+		_open(container)
+
+
+def test_v2_round_trip_with_rsa():
+	private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+	public_pem = private.public_key().public_bytes(
+		serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo,
+	).decode()
+	private_pem = private.private_bytes(
+		serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+	).decode()
+	container = seal(io.BytesIO(b'for your eyes'), 13, 'secret.txt', 'text', public_pem=public_pem).read()
+	assert read_header(io.BytesIO(container)).is_rsa
+	assert _open(container, private_pem=private_pem) == b'for your eyes'
@@ -0,0 +1,54 @@
+import io
+import wave
+
+import numpy as np
+
+
+def _wav(frames: int = 20000) -> bytes:
+	buf = io.BytesIO()
+	with wave.open(buf, 'wb') as w:
+		w.setnchannels(2)
+		w.setsampwidth(2)
+		w.setframerate(44100)
+		w.writeframes(np.random.default_rng(0).integers(-2000, 2000, frames * 2, dtype=np.int16).tobytes())
+	return buf.getvalue()
+
+
+def _embed(client, cover: bytes, name: str, **form):
+	data = {'cover': (io.BytesIO(cover), name), 'secret_text': 'hello', 'password': 'pw', **form}
+	return client.post('/api/embed', data=data)
+
+
+def test_download_supports_range_and_etag(client, cover_png):
+	name = _embed(client, cover_png, 'c.png').get_json()['filename']
+	full = client.get(f'/download/{name}')
+	assert full.status_code == 200
+	assert full.headers['Accept-Ranges'] == 'bytes'
+
+	part = client.get(f'/download/{name}', headers={'Range': 'bytes=10-19'})
+	assert part.status_code == 206
+	assert part.headers['Content-Range'] == f'bytes 10-19/{len(full.data)}'
+	assert part.data == full.data[10:20]
+
+	cached = client.get(f'/download/{name}', headers={'If-None-Match': full.headers['ETag']})
+	assert cached.status_code == 304
+	assert cached.data == b''
+
+
+def test_streamed_audio_has_content_length(client):
+	cover = _wav()
+	r = _embed(client, cover, 'a.wav', delivery='stream')
+	assert r.status_code == 200
+	assert r.headers['Content-Length'] == str(len(cover))
+	assert len(r.data) == len(cover)
+
+
+def test_streamed_image_length_depends_on_format(client, cover_png):
+	r = _embed(client, cover_png, 'c.png', delivery='stream', image_format='bmp')
+	assert r.status_code == 200
+	assert r.headers['Content-Length'] == str(len(r.data))
+	# PNG is compressed while it is sent
+	r = _embed(client, cover_png, 'c.png', delivery='stream')
+	assert r.status_code == 200
+	assert 'Content-Length' not in r.headers
+	assert r.data.startswith(b'\x89PNG')
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from benchmarks.bench_image_lsb import legacy_embed
+from stegano.image_lsb import embed_in_image, extract_from_image
+
+
+@pytest.fixture
+def cover_path(tmp_path, cover_png):
+	path = tmp_path / 'cover.png'
+	path.write_bytes(cover_png)
+	return str(path)
+
+
+@pytest.mark.parametrize('size', [0, 1, 2, 100, 64 * 48 * 3 // 8 - 4])
+def test_png_matches_the_per_pixel_loop(cover_path, size):
+	# Sizes cover a payload ending mid-pixel and one filling the image
+	payload = os.urandom(size)
+	stego = embed_in_image(cover_path, payload)
+	assert stego == legacy_embed(cover_path, payload)
+	assert extract_from_image(stego) == payload
+
+
+def test_payload_too_large(cover_path):
+	with pytest.raises(ValueError):
+		embed_in_image(cover_path, os.urandom(64 * 48 * 3 // 8))
@@ -0,0 +1,54 @@
+import io
+import os
+import time
+
+
+def _wait_for(predicate, timeout: float = 60.0):
+	deadline = time.monotonic() + timeout
+	while True:
+		value = predicate()
+		if value or time.monotonic() > deadline:
+			return value
+		time.sleep(0.05)
+
+
+def _finished(client, job):
+	def poll():
+		body = client.get(job['status_url']).get_json()
+		return body if body['status'] in ('done', 'failed') else None
+	return _wait_for(poll)
+
+
+def test_job_embed_then_extract(client, dirs, cover_png):
+	r = client.post('/api/jobs/embed', data={'cover': (io.BytesIO(cover_png), 'photo.png'), 'secret_text': 'hello jobs', 'password': 'pw'})
+	assert r.status_code == 202
+	job = r.get_json()
+	assert _finished(client, job)['status'] == 'done'
+	result = client.get(job['result_url']).get_json()
+	assert result['filename'] == 'photo_stego.png'
+	stego = client.get(f"/download/{result['filename']}").data
+
+	r = client.post('/api/jobs/extract', data={'stego': (io.BytesIO(stego), 'photo_stego.png'), 'password': 'pw'})
+	assert r.status_code == 202
+	job = r.get_json()
+	assert _finished(client, job)['status'] == 'done'
+	r = client.get(job['result_url'])
+	assert r.data == b'hello jobs'
+	r.close()
+
+	# The plaintext is served once, and no job input or intermediate is left behind
+	assert client.get(job['result_url']).status_code == 410
+	assert _wait_for(lambda: not os.listdir(dirs['UPLOAD_DIR']) and not os.listdir(dirs['TEMP_DIR']))
+
+
+def test_failed_extract_job(client, dirs, cover_png):
+	r = client.post('/api/jobs/extract', data={'stego': (io.BytesIO(cover_png), 'plain.png'), 'password': 'pw'})
+	job = r.get_json()
+	assert _finished(client, job)['status'] == 'failed'
+	assert client.get(job['result_url']).status_code == 400
+	assert _wait_for(lambda: not os.listdir(dirs['UPLOAD_DIR']) and not os.listdir(dirs['TEMP_DIR']))
+
+
+def test_unknown_job(client):
+	assert client.get('/api/jobs/nope').status_code == 404
+	assert client.get('/api/jobs/nope/result').status_code == 404
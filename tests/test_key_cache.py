@@ -0,0 +1,27 @@
+import pytest
+
+from stegano import crypto
+from stegano.container import seal_key
+
+
+@pytest.fixture
+def key_cache():
+	cache = crypto.enable_key_cache(maxsize=8, ttl=300)
+	yield cache
+	crypto.disable_key_cache()
+
+
+def test_repeat_embeds_reuse_the_sealing_key(key_cache):
+	first, second = seal_key('pw'), seal_key('pw')
+	assert first.salt == second.salt and first.key == second.key
+	assert seal_key('other').salt != first.salt
+
+
+def test_sealing_salt_expires(key_cache):
+	first = seal_key('pw')
+	crypto.enable_key_cache(maxsize=8, ttl=0)
+	assert seal_key('pw').salt != first.salt != seal_key('pw').salt
+
+
+def test_salts_are_fresh_without_the_cache():
+	assert seal_key('pw').salt != seal_key('pw').salt
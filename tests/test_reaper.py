@@ -0,0 +1,112 @@
+import io
+import json
+import os
+import time
+import zipfile
+
+import app
+from stegano.reaper import Quota, Reaper, reap
+
+
+def _listdir(path):
+	"""Directory entries without the hold markers."""
+	return sorted(name for name in os.listdir(path) if not name.startswith('.'))
+
+
+def _touch(path, age: float = 0.0):
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with open(path, 'wb') as f:
+		f.write(b'x' * 100)
+	then = time.time() - age
+	os.utime(path, (then, then))
+
+
+def test_directories_go_by_age(tmp_path):
+	root = str(tmp_path)
+	os.mkdir(os.path.join(root, 'fresh'))
+	os.mkdir(os.path.join(root, 'old'))
+	then = time.time() - 7200
+	os.utime(os.path.join(root, 'old'), (then, then))
+	reap(root, Quota(max_age=3600))
+	assert sorted(os.listdir(root)) == ['fresh']
+
+
+def test_held_paths_are_skipped(tmp_path):
+	root = str(tmp_path)
+	_touch(os.path.join(root, 'old.bin'), age=7200)
+	_touch(os.path.join(root, 'held.bin'), age=7200)
+	_touch(os.path.join(root, 'work', 'spill.bin'), age=7200)
+	reaper = Reaper({root: Quota(max_age=3600, max_bytes=0)})
+	reaper.hold(os.path.join(root, 'held.bin'), os.path.join(root, 'work'))
+	reaper.run_once()
+	assert _listdir(root) == ['held.bin', 'work']
+	assert _listdir(os.path.join(root, 'work')) == ['spill.bin']
+	reaper.release(os.path.join(root, 'held.bin'), os.path.join(root, 'work'))
+	reaper.run_once()
+	assert os.listdir(root) == ['work']
+
+
+def test_holds_are_shared_between_reapers(tmp_path):
+	# Like two gunicorn workers: one holds, the other reaps
+	root = str(tmp_path)
+	_touch(os.path.join(root, 'upload.bin'), age=7200)
+	_touch(os.path.join(root, 'job', 'spill.bin'), age=7200)
+	worker = Reaper({root: Quota(max_age=3600, max_bytes=0)})
+	other = Reaper({root: Quota(max_age=3600, max_bytes=0)})
+	worker.hold(os.path.join(root, 'upload.bin'), os.path.join(root, 'job'))
+	other.run_once()
+	assert _listdir(root) == ['job', 'upload.bin']
+	assert _listdir(os.path.join(root, 'job')) == ['spill.bin']
+	worker.release(os.path.join(root, 'upload.bin'), os.path.join(root, 'job'))
+	other.run_once()
+	assert os.listdir(root) == ['job']
+
+
+def test_holds_of_dead_processes_lapse(tmp_path):
+	root = str(tmp_path)
+	_touch(os.path.join(root, 'upload.bin'), age=7200)
+	# No process has this pid (above the kernel's pid_max)
+	_touch(os.path.join(root, '.upload.bin.hold-99999999-0a1b2c3d'), age=7200)
+	reap(root, Quota(max_age=3600))
+	assert os.listdir(root) == []
+
+
+def test_reaper_pass_during_batch(client, dirs, cover_png, monkeypatch):
+	# The harshest quota: anything not in use goes
+	reaper = Reaper({path: Quota(max_age=0, max_bytes=0) for path in dirs.values()})
+	monkeypatch.setattr(app, 'reaper', reaper)
+	stale = os.path.join(dirs['UPLOAD_DIR'], 'stale.bin')
+	_touch(stale)
+
+	covers = [(io.BytesIO(cover_png), f'c{i}.png') for i in range(3)]
+	r = client.post('/api/embed/batch', data={'covers': covers, 'secret_text': 'batch', 'password': 'pw'}, buffered=False)
+	assert r.status_code == 200
+	# The jobs are queued or running and the ZIP hasn't been read yet
+	reaper.run_once()
+	assert not os.path.exists(stale)
+
+	body = b''.join(r.response)
+	r.close()
+	with zipfile.ZipFile(io.BytesIO(body)) as zf:
+		manifest = json.loads(zf.read('manifest.json'))
+	assert [entry['status'] for entry in manifest] == ['done'] * 3
+	assert not any(os.listdir(path) for path in dirs.values())
+
+
+def test_size_quota_spares_young_files(tmp_path):
+	root = str(tmp_path)
+	_touch(os.path.join(root, 'old.bin'), age=600)
+	_touch(os.path.join(root, 'new.bin'), age=5)
+	reap(root, Quota(max_age=None, max_bytes=0, min_age=60))
+	assert os.listdir(root) == ['new.bin']
+
+
+def test_sync_embed_output_survives_size_quota(client, dirs, cover_png, monkeypatch):
+	reaper = Reaper({path: Quota(max_age=None, max_bytes=0) for path in dirs.values()})
+	monkeypatch.setattr(app, 'reaper', reaper)
+	r = client.post('/api/embed', data={'cover': (io.BytesIO(cover_png), 'c.png'), 'secret_text': 'hi', 'password': 'pw'})
+	assert r.status_code == 200
+	reaper.run_once()
+	assert _listdir(dirs['OUTPUT_DIR']) == [r.get_json()['filename']]
+	assert not any(os.listdir(path) for path in (dirs['UPLOAD_DIR'], dirs['TEMP_DIR']))
+	assert client.get(f"/download/{r.get_json()['filename']}").status_code == 200
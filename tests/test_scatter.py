@@ -0,0 +1,59 @@
+import io
+import os
+import wave
+
+import numpy as np
+import pytest
+
+from stegano.audio_lsb import embed_in_wav, extract_from_wav
+from stegano.image_lsb import embed_in_image, extract_from_image
+
+KEY = bytes(range(32))
+WRONG = bytes(range(1, 33))
+
+
+def _wav() -> bytes:
+	buf = io.BytesIO()
+	with wave.open(buf, 'wb') as w:
+		w.setnchannels(2)
+		w.setsampwidth(2)
+		w.setframerate(44100)
+		w.writeframes(np.random.default_rng(0).integers(-2000, 2000, 40000, dtype=np.int16).tobytes())
+	return buf.getvalue()
+
+
+def _differs(extract, stego, payload) -> bool:
+	try:
+		return extract(stego, key=WRONG) != payload
+	except ValueError:
+		return True
+
+
+@pytest.mark.parametrize('depth', [1, 2])
+def test_image_round_trip(cover_png, depth):
+	payload = os.urandom(300)
+	stego = embed_in_image(cover_png, payload, depth=depth, key=KEY)
+	# The bits are spread over the image, not packed at the start
+	assert embed_in_image(cover_png, payload, depth=depth) != stego
+	assert extract_from_image(stego, key=KEY) == payload
+	assert _differs(extract_from_image, stego, payload)
+
+
+@pytest.mark.parametrize('depth', [1, 3])
+def test_audio_round_trip(depth):
+	payload = os.urandom(2000)
+	stego = bytes(embed_in_wav(_wav(), payload, depth=depth, key=KEY))
+	assert extract_from_wav(stego, key=KEY) == payload
+	assert _differs(extract_from_wav, stego, payload)
+
+
+def test_api_round_trip_and_wrong_password(client, cover_png):
+	r = client.post('/api/embed', data={'cover': (io.BytesIO(cover_png), 'c.png'), 'secret_text': 'scattered', 'password': 'pw', 'scatter': '1'})
+	assert r.status_code == 200
+	stego = client.get(f"/download/{r.get_json()['filename']}").data
+
+	r = client.post('/api/extract', data={'stego': (io.BytesIO(stego), 'c_stego.png'), 'password': 'pw'})
+	assert r.status_code == 200
+	assert r.data == b'scattered'
+	r = client.post('/api/extract', data={'stego': (io.BytesIO(stego), 'c_stego.png'), 'password': 'wrong'})
+	assert r.status_code == 400
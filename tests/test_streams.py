@@ -0,0 +1,29 @@
+import io
+import os
+import tempfile
+
+from stegano.streams import source_path
+
+
+def test_spooled_upload_on_disk_is_used_in_place(tmp_path):
+	spool = tempfile.SpooledTemporaryFile(max_size=16, dir=tmp_path)
+	spool.write(b'x' * 100)
+	assert spool._rolled
+	scratch = tmp_path / 'scratch'
+	scratch.mkdir()
+	with source_path(spool, dir=str(scratch)) as path:
+		assert os.listdir(scratch) == []
+		with open(path, 'rb') as f:
+			assert f.read() == b'x' * 100
+
+
+def test_in_memory_sources_are_copied(tmp_path):
+	spool = tempfile.SpooledTemporaryFile(max_size=1024)
+	spool.write(b'small')
+	for src in (spool, io.BytesIO(b'small'), b'small'):
+		with source_path(src, dir=str(tmp_path)) as path:
+			assert os.path.dirname(path) == str(tmp_path)
+			with open(path, 'rb') as f:
+				assert f.read() == b'small'
+		assert os.listdir(tmp_path) == []
+	assert not spool._rolled
@@ -0,0 +1,39 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from stegano import video_lsb
+from stegano.media import find_ffmpeg
+
+
+def _cover(path, frames=12, width=64, height=48):
+	rng = np.random.default_rng(0)
+	out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'FFV1'), 25.0, (width, height))
+	assert out.isOpened()
+	for _ in range(frames):
+		out.write(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+	out.release()
+	return path
+
+
+@pytest.mark.skipif(find_ffmpeg() is None, reason='needs ffmpeg on PATH or STEGANO_FFMPEG')
+@pytest.mark.parametrize('key', [None, b'k' * 32])
+def test_remux_round_trip(tmp_path, key):
+	cover = _cover(str(tmp_path / 'cover.avi'))
+	payload = os.urandom(2000)
+	output = str(tmp_path / 'stego.mkv')
+	stats = video_lsb.embed_in_video_remux(cover, payload, output, depth=2, key=key)
+	assert stats['codec'] in video_lsb.LOSSLESS_CODECS
+	assert video_lsb.extract_from_video(output, key=key) == payload
+	assert sorted(os.listdir(tmp_path)) == ['cover.avi', 'stego.mkv']
+
+
+def test_remux_refuses_lossy_codecs(tmp_path, monkeypatch):
+	cover = _cover(str(tmp_path / 'cover.avi'))
+	monkeypatch.setattr(video_lsb, 'LOSSLESS_CODECS', [])
+	monkeypatch.setattr(video_lsb, '_codec_cache', {})
+	with pytest.raises(ValueError, match='lossless'):
+		video_lsb.embed_in_video_remux(cover, b'secret', str(tmp_path / 'stego.mkv'), ffmpeg='ffmpeg')
+	assert os.listdir(tmp_path) == ['cover.avi']